@@ -282,7 +282,7 @@ async def {bot_name}(params):
         self.output += "\nOpening Shared Knowledge Viewer..."
         try:
             # Retrieve intent logs
-            intent_logs = self.main_brain.shared_knowledge.get_entry("intent_logs")
+            intent_logs = self.main_brain.shared_knowledge.get_intent_logs()
             if not intent_logs:
                 self.output += "\nNo intents logged yet."
                 return
@@ -122,10 +122,10 @@ class NexusMonitorApp(App):
                 # Add logic to train AI models
             elif action == 2:
                 self.output += "\nViewing AI Model Progress..."
-                # Add logic to view AI model progress
+                await self.show_inference_stats()
             elif action == 3:
                 self.output += "\nPerforming Inference..."
-                # Add logic to perform inference
+                await self.perform_inference()
             elif action == 4:
                 self.output += "\nPerforming AI-Driven Decision Making..."
                 await self.ai_decision_making()
@@ -249,6 +249,37 @@ def custom_algorithm(data):
         except Exception as e:
             self.output += f"\nError performing AI decision making: {e}"
 
+    async def perform_inference(self, prompt: str = "Summarize the current system status."):
+        """
+        Run inference and render the reply as it is generated.
+        """
+        try:
+            self.output += f"\n> {prompt}\n"
+            async for piece in self.main_brain.stream_response(prompt):
+                self.output += piece
+                self.refresh()
+        except Exception as e:
+            self.output += f"\nError performing inference: {e}"
+
+    async def show_inference_stats(self):
+        """
+        Display loaded models, request batching and response cache statistics.
+        """
+        try:
+            stats = await self.main_brain.get_inference_stats()
+            models = stats["models"]
+            self.output += f"\nLoaded Models: {', '.join(models['loaded']) or 'none'} ({models['loaded_bytes'] / (1024 * 1024):.1f} MiB)"
+            batching = stats["batching"]
+            self.output += f"\nBatching: {batching['requests']} requests in {batching['batches']} batches (avg size {batching['avg_batch_size']:.1f})"
+            cache = stats["response_cache"]
+            self.output += (
+                f"\nResponse Cache: {cache['entries']}/{cache['max_entries']} entries, "
+                f"{cache['hits']} hits, {cache['disk_hits']} disk hits, {cache['misses']} misses "
+                f"(hit rate {cache['hit_rate']:.0%})"
+            )
+        except Exception as e:
+            self.output += f"\nError displaying inference stats: {e}"
+
     async def create_ai_workflow(self):
         """
         Create an AI-assisted workflow.
@@ -1,10 +1,10 @@
 import grpc
 from protos import stats_pb2, stats_pb2_grpc
-from nexus_seed.utils.event_bus import InternalEventBus
+from nexus_seed.utils.event_bus import EventBus
 from nexus_seed.interfaces.events import EventTypes
 
 class GRPCAdapter:
-    def __init__(self, grpc_server_url: str, event_bus: InternalEventBus):
+    def __init__(self, grpc_server_url: str, event_bus: EventBus):
         self.grpc_server_url = grpc_server_url
         self.event_bus = event_bus
 
@@ -1,14 +1,24 @@
 import asyncio
+import itertools
+import json
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
 from nats.aio.client import Client as NATS
 from nats.aio.errors import ErrConnectionClosed, ErrTimeout, ErrNoServers
-from nexus_seed.utils.event_bus import InternalEventBus
+from nexus_seed.utils.event_bus import EventBus, MULTI_WILDCARD, TOPIC_SEPARATOR
+from nexus_seed.utils.event_transports import EventTransport
 from nexus_seed.interfaces.events import EventTypes
 
 class NATSAdapter:
-    def __init__(self, nats_url: str, event_bus: InternalEventBus):
+    def __init__(self, nats_url: str, event_bus: EventBus, max_batch_size: int = 256, max_linger_sec: float = 0.02):
         self.nats_url = nats_url
         self.event_bus = event_bus
         self.nc = NATS()
+        self.max_batch_size = max_batch_size
+        self.max_linger_sec = max_linger_sec
+        self._pending: List[Dict] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
 
     async def connect(self):
         try:
@@ -21,15 +31,133 @@ class NATSAdapter:
 
     async def subscribe(self, subject: str):
         async def message_handler(msg):
-            data = msg.data.decode()
-            print(f"Received message on {subject}: {data}")
-            await self.event_bus.publish(EventTypes.SERVICE_STATE_UPDATED.value, {"subject": subject, "data": data})
+            self._pending.append({"subject": subject, "data": msg.data.decode()})
+            if len(self._pending) >= self.max_batch_size:
+                await self.flush()
+            elif self._flush_handle is None:
+                loop = asyncio.get_running_loop()
+                self._flush_handle = loop.call_later(self.max_linger_sec, lambda: asyncio.ensure_future(self.flush()))
 
         await self.nc.subscribe(subject, cb=message_handler)
 
+    async def flush(self):
+        """
+        Forward buffered NATS messages to the event bus in a single batch.
+        """
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        await self.event_bus.publish_many(EventTypes.SERVICE_STATE_UPDATED.value, batch)
+
     async def publish(self, subject: str, data: dict):
         try:
             await self.nc.publish(subject, str(data).encode())
             print(f"Published message to {subject}: {data}")
         except ErrConnectionClosed:
             print("Connection to NATS is closed.")
+
+
+class NATSTransport(EventTransport):
+    """
+    EventBus transport that mirrors events to other nodes through NATS.
+
+    Topics are published as `<subject_prefix>.<topic>`. Subscription patterns are
+    mapped to NATS subjects ("*" is the same in both; "#" becomes ">" plus the bare
+    prefix); any over-delivery is filtered by the bus when it resolves the topic.
+    Event data must be JSON-serializable.
+    """
+    remote = True
+
+    def __init__(self, nats_url: str, subject_prefix: str = "nexus"):
+        super().__init__()
+        self.nats_url = nats_url
+        self.subject_prefix = subject_prefix
+        self.node_id = uuid.uuid4().hex
+        self.nc = NATS()
+        self.subjects: Dict[str, Any] = {}
+        self.subject_refs: Dict[str, int] = {}
+        self.pending_patterns: List[str] = []
+        self._message_ids = itertools.count()
+        # Overlapping patterns produce overlapping NATS subscriptions; remember
+        # recently seen message ids so each event is dispatched once.
+        self._recent_ids: "OrderedDict[str, None]" = OrderedDict()
+
+    async def start(self, bus) -> None:
+        await super().start(bus)
+        try:
+            await self.nc.connect(servers=[self.nats_url], reconnect_time_wait=2)
+            print(f"NATS transport connected to {self.nats_url}")
+        except ErrNoServers as e:
+            print(f"Failed to connect NATS transport: {e}")
+            raise
+        for pattern in self.pending_patterns:
+            await self.on_subscribe(pattern)
+        self.pending_patterns.clear()
+
+    async def stop(self) -> None:
+        if self.nc.is_connected:
+            await self.nc.drain()
+
+    def peer_spec(self):
+        return ("nats", self.nats_url, self.subject_prefix)
+
+    def _subjects_for(self, pattern: str) -> List[str]:
+        segments = pattern.split(TOPIC_SEPARATOR)
+        if MULTI_WILDCARD not in segments:
+            return [f"{self.subject_prefix}.{pattern}"]
+        prefix = segments[:segments.index(MULTI_WILDCARD)]
+        base = TOPIC_SEPARATOR.join([self.subject_prefix] + prefix)
+        # "#" also matches zero segments, which NATS' ">" does not
+        return [base, f"{base}.>"] if prefix else [f"{base}.>"]
+
+    async def send(self, event_type: str, data: Any) -> None:
+        if not self.nc.is_connected:
+            return
+        envelope = {"origin": self.node_id, "id": next(self._message_ids), "data": data}
+        try:
+            await self.nc.publish(f"{self.subject_prefix}.{event_type}", json.dumps(envelope, default=str).encode())
+        except (ErrConnectionClosed, ErrTimeout) as e:
+            print(f"Error forwarding event '{event_type}' to NATS: {e}")
+
+    async def on_subscribe(self, pattern: str) -> None:
+        if not self.nc.is_connected:
+            self.pending_patterns.append(pattern)
+            return
+        for subject in self._subjects_for(pattern):
+            self.subject_refs[subject] = self.subject_refs.get(subject, 0) + 1
+            if subject not in self.subjects:
+                self.subjects[subject] = await self.nc.subscribe(subject, cb=self._on_message)
+
+    async def on_unsubscribe(self, pattern: str) -> None:
+        if pattern in self.pending_patterns:
+            self.pending_patterns.remove(pattern)
+            return
+        for subject in self._subjects_for(pattern):
+            refs = self.subject_refs.get(subject, 0) - 1
+            if refs > 0:
+                self.subject_refs[subject] = refs
+                continue
+            self.subject_refs.pop(subject, None)
+            subscription = self.subjects.pop(subject, None)
+            if subscription is not None:
+                await subscription.unsubscribe()
+
+    async def _on_message(self, msg) -> None:
+        try:
+            envelope = json.loads(msg.data.decode())
+        except ValueError as e:
+            print(f"Dropping malformed NATS event on {msg.subject}: {e}")
+            return
+        if envelope.get("origin") == self.node_id:
+            return
+        message_id = f"{envelope.get('origin')}:{envelope.get('id')}"
+        if message_id in self._recent_ids:
+            return
+        self._recent_ids[message_id] = None
+        if len(self._recent_ids) > 10000:
+            self._recent_ids.popitem(last=False)
+        topic = msg.subject[len(self.subject_prefix) + 1:]
+        await self.bus.dispatch(topic, envelope.get("data"))
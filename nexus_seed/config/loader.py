@@ -2,6 +2,24 @@ import os
 import json
 from typing import Dict
 
+def build_db_url(db_config: Dict) -> str:
+    """
+    Database URL for the configured `type`: "postgresql" (default) or "sqlite".
+    SQLite uses `path`, or the `db_url` as given when it is already a sqlite:/// URL.
+    """
+    db_type = str(db_config.get("type", "postgresql")).lower()
+    if db_type == "sqlite":
+        db_url = str(db_config.get("db_url", ""))
+        if db_url.startswith("sqlite:///"):
+            return db_url
+        return f"sqlite:///{db_config.get('path', 'nexusdb.sqlite')}"
+    if db_type not in ("postgresql", "postgres"):
+        raise ValueError(f"Unsupported database type '{db_type}'. Expected 'postgresql' or 'sqlite'.")
+    return (
+        f"postgresql://{db_config.get('username')}:{db_config.get('password')}"
+        f"@{db_config.get('host')}:{db_config.get('port')}/{db_config.get('database_name')}"
+    )
+
 def load_config(json_path: str) -> Dict:
     """
     Load configuration from a JSON file and override with environment variables.
@@ -19,12 +37,9 @@ def load_config(json_path: str) -> Dict:
                     current = current.setdefault(k, {})
                 current[nested_keys[-1]] = value
 
-        # Construct the database URL dynamically
-        db_config = config.get("database", {})
-        config["database"]["db_url"] = (
-            f"postgresql://{db_config.get('username')}:{db_config.get('password')}"
-            f"@{db_config.get('host')}:{db_config.get('port')}/{db_config.get('database_name')}"
-        )
+        # Construct the database URL dynamically; its scheme selects the persistence backend
+        config["database"] = db_config = config.get("database", {})
+        db_config["db_url"] = build_db_url(db_config)
 
         return config
     except Exception as e:
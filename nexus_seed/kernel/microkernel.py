@@ -1,8 +1,10 @@
 import asyncio
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from nexus_seed.utils.event_bus import EventBus
+from nexus_seed.utils.event_transports import EventTransport, InProcessTransport, SharedMemoryTransport
 from nexus_seed.services.persistence import PersistenceOverseer
 from nexus_seed.kernel.snapshot_manager import SnapshotManager
+from nexus_seed.kernel.service_host import ServiceSpec, ThreadServiceHost, ProcessServiceHost
 from nexus_seed.services.system_monitor_service import SystemMonitorService
 from nexus_seed.services.stats_aggregator_service import StatsAggregatorService
 from nexus_seed.services.main_brain import MainBrain
@@ -21,6 +23,7 @@ class Microkernel:
         self.persistence = None
         self.snapshot_manager = None
         self.goal_manager = GoalManagementOverseer()
+        self.specs: List[ServiceSpec] = []
         self.services = []
         self.tasks = []
 
@@ -29,38 +32,158 @@ class Microkernel:
         Initialize core components like persistence, snapshot manager, and goal manager.
         """
         print("Initializing core components...")
-        self.event_bus = EventBus()
+        self.event_bus = EventBus(transport=self.create_event_transport())
+        await self.event_bus.start()
         self.persistence = PersistenceOverseer(self.config["database"]["db_url"])
         await self.persistence.initialize()
         self.snapshot_manager = SnapshotManager(self.event_bus, self.persistence)
         self.goal_manager.set_goal("Resource Optimization", 90.0)
         self.goal_manager.set_goal("Intrinsic Resilience", 100.0)
 
-    async def load_services(self):
+    def create_event_transport(self) -> EventTransport:
         """
-        Dynamically load and initialize all services based on configuration.
+        Build the event bus transport selected by the `event_bus.transport` setting.
         """
-        print("Loading services...")
-        self.services = [
-            OrchestratorService(
-                self.event_bus,
-                self.persistence,
-                self.config["workflows_dir"]
+        bus_config = self.config.get("event_bus", {})
+        transport = bus_config.get("transport", "in_process")
+        if transport == "in_process" and self.uses_process_placement():
+            print("Process-placed services need a cross-process bus; using the shared_memory transport.")
+            transport = "shared_memory"
+        if transport == "in_process":
+            return InProcessTransport()
+        if transport == "shared_memory":
+            return SharedMemoryTransport(channel_capacity=bus_config.get("channel_capacity", 4 * 1024 * 1024))
+        if transport == "nats":
+            # Imported lazily so the NATS client is only required when it is used
+            from nexus_seed.adapters.nats_adapter import NATSTransport
+            nats_url = bus_config.get("nats_url") or self.config.get("nats", {}).get("url")
+            return NATSTransport(nats_url, subject_prefix=bus_config.get("subject_prefix", "nexus"))
+        raise ValueError(f"Unknown event bus transport: {transport}")
+
+    def service_placement(self, name: str) -> str:
+        """
+        Where a service runs: "in_loop" (default), "thread" or "process".
+
+        Process placement is opt-in (e.g. `"main_brain": {"placement": "process"}`
+        under `services`) for CPU-bound services; it switches the in-process bus
+        to the shared_memory transport, and every call to the service crosses a pipe.
+        """
+        return self.config.get("services", {}).get(name, {}).get("placement", "in_loop")
+
+    def uses_process_placement(self) -> bool:
+        return any(
+            isinstance(service_config, dict) and service_config.get("placement") == "process"
+            for service_config in self.config.get("services", {}).values()
+        )
+
+    def service_specs(self) -> List[ServiceSpec]:
+        """
+        Describe every service the kernel runs and where it should be placed.
+        """
+        services_config = self.config["services"]
+        return [
+            # The orchestrator shares the kernel's persistence pool, so it stays in the loop
+            ServiceSpec(
+                "orchestrator",
+                OrchestratorService,
+                {
+                    "persistence": self.persistence,
+                    "workflows_dir": self.config["workflows_dir"],
+                    "goal_manager": self.goal_manager,
+                    "workers": services_config.get("orchestrator", {}).get("workers", 4),
+                    "queue_maxsize": services_config.get("orchestrator", {}).get("queue_maxsize", 1000),
+                    "aging_sec": services_config.get("orchestrator", {}).get("aging_sec", 1.0),
+                    "resolve_service": self.get_service,
+                },
+                event_bus_arg="event_bus",
+            ),
+            ServiceSpec(
+                "system_monitor",
+                SystemMonitorService,
+                {"publish_interval_sec": services_config["system_monitor"]["publish_interval_sec"]},
+                event_bus_arg="event_bus",
+                placement=self.service_placement("system_monitor"),
             ),
-            SystemMonitorService(
-                publish_interval_sec=self.config["services"]["system_monitor"]["publish_interval_sec"]
+            ServiceSpec(
+                "stats_aggregator",
+                StatsAggregatorService,
+                {"aggregation_interval_sec": services_config["stats_aggregator"]["aggregation_interval_sec"]},
+                event_bus_arg="event_bus",
+                placement=self.service_placement("stats_aggregator"),
             ),
-            StatsAggregatorService(
-                aggregation_interval_sec=self.config["services"]["stats_aggregator"]["aggregation_interval_sec"]
+            ServiceSpec("main_brain", MainBrain, event_bus_arg="event_bus", placement=self.service_placement("main_brain")),
+            ServiceSpec("neuro_symbolic", NeuroSymbolicService, placement=self.service_placement("neuro_symbolic")),
+            ServiceSpec("task_domain", TaskDomainOverseer, placement=self.service_placement("task_domain")),
+            # Guidance is generated against the restored goals
+            ServiceSpec(
+                "hybrid_optimizer",
+                HybridOptimizerOverseer,
+                placement=self.service_placement("hybrid_optimizer"),
+                depends_on=("task_domain",),
+            ),
+            ServiceSpec("security", SecurityOverseer, placement=self.service_placement("security")),
+            # Fitness history grows without bound and is only read when evolving blueprints
+            ServiceSpec(
+                "blueprint_evolution",
+                BlueprintEvolutionOverseer,
+                placement=self.service_placement("blueprint_evolution"),
+                depends_on=("hybrid_optimizer",),
+                lazy_restore=True,
             ),
-            MainBrain(self.event_bus),
-            NeuroSymbolicService(),
-            TaskDomainOverseer(),
-            HybridOptimizerOverseer(),
-            SecurityOverseer(),
-            BlueprintEvolutionOverseer()
         ]
 
+    def get_service(self, name: str) -> Optional[Any]:
+        """
+        The running service (or its host) registered under `name`, if any.
+        """
+        for spec, service in zip(self.specs, self.services):
+            if spec.name == name:
+                return service
+        return None
+
+    def place_service(self, spec: ServiceSpec):
+        """
+        Build a service in the kernel's loop, or a host that runs it in a thread or process.
+        """
+        if spec.placement == "thread":
+            return ThreadServiceHost(spec, self.event_bus)
+        if spec.placement == "process":
+            return ProcessServiceHost(spec, self.event_bus)
+        return spec.build(self.event_bus)
+
+    async def load_services(self):
+        """
+        Dynamically load and initialize all services based on configuration.
+        """
+        print("Loading services...")
+        self.specs = self.service_specs()
+        self.services = [self.place_service(spec) for spec in self.specs]
+        for spec, service in zip(self.specs, self.services):
+            if callable(getattr(spec.cls, "get_snapshot_state", None)):
+                self.snapshot_manager.register_participant(
+                    spec.name, service, depends_on=spec.depends_on, lazy_restore=spec.lazy_restore
+                )
+
+    async def restore_services(self):
+        """
+        Restore in-loop services from the latest snapshot before they start.
+        Services in threads or processes are restored once their hosts are up
+        (see start_services).
+        """
+        await self.snapshot_manager.restore_seed_state(
+            [spec.name for spec in self.specs if spec.placement == "in_loop"]
+        )
+
+    async def restore_hosted_services(self):
+        """
+        Restore services in threads or processes, then start pruning old
+        snapshots: nothing is pruned while a restore may still need it.
+        """
+        hosted = [spec.name for spec in self.specs if spec.placement != "in_loop"]
+        if hosted:
+            await self.snapshot_manager.restore_seed_state(hosted)
+        self.persistence.start_retention()
+
     async def start_services(self):
         """
         Start all services and supervise their tasks in autopilot mode.
@@ -73,6 +196,8 @@ class Microkernel:
                 self.tasks.append(task)
             else:
                 print(f"Service {service.__class__.__name__} does not have a start method.")
+        # Calls to a host wait until it is running
+        self.tasks.append(asyncio.create_task(self.restore_hosted_services()))
         await asyncio.gather(*self.tasks)
 
         # Ensure Intrinsic Resilience: Monitor service health continuously
@@ -124,6 +249,18 @@ class Microkernel:
         except Exception as e:
             print(f"Failed to recover service {service.__class__.__name__}: {e}")
 
+    async def flush_services(self):
+        """
+        Ask services with buffered writes to make them durable before shutdown.
+        """
+        for service in self.services:
+            if hasattr(service, "flush") and callable(service.flush):
+                try:
+                    stats = await service.flush()
+                    print(f"Flushed {service.__class__.__name__}: {stats}")
+                except Exception as e:
+                    print(f"Failed to flush {service.__class__.__name__}: {e}")
+
     async def stop_services(self):
         """
         Stop all services gracefully.
@@ -135,6 +272,8 @@ class Microkernel:
         for task in self.tasks:
             task.cancel()
         await asyncio.gather(*self.tasks, return_exceptions=True)
+        if self.event_bus:
+            await self.event_bus.close()
         print("All services have been stopped.")
 
     def handle_task_completion(self, task):
@@ -152,6 +291,7 @@ class Microkernel:
         print("Starting Microkernel...")
         await self.initialize_core_components()
         await self.load_services()
+        await self.restore_services()
         await self.start_services()
 
     async def stop(self):
@@ -159,7 +299,10 @@ class Microkernel:
         Stop the Microkernel and all its components.
         """
         print("Stopping Microkernel...")
+        await self.flush_services()
         await self.stop_services()
+        if self.persistence:
+            await self.persistence.close()
         print("Microkernel stopped.")
 
 async def safe_task(task, task_name: str):
@@ -0,0 +1,349 @@
+import asyncio
+import itertools
+from abc import ABC, abstractmethod
+import multiprocessing
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+from nexus_seed.utils.event_bus import EventBus
+from nexus_seed.utils.event_transports import transport_from_peer_spec
+
+PLACEMENTS = ("in_loop", "thread", "process")
+
+
+class ServiceSpec:
+    """
+    Describes how to construct a service, so it can be built in the kernel's loop,
+    in a worker thread, or in a worker process.
+    """
+    def __init__(
+        self,
+        name: str,
+        cls: type,
+        kwargs: Optional[Dict[str, Any]] = None,
+        event_bus_arg: Optional[str] = None,
+        placement: str = "in_loop",
+        max_restarts: int = 5,
+        depends_on: Tuple[str, ...] = (),
+        lazy_restore: bool = False,
+    ):
+        if placement not in PLACEMENTS:
+            raise ValueError(f"Unknown placement '{placement}' for service '{name}'. Expected one of {PLACEMENTS}.")
+        self.name = name
+        self.cls = cls
+        self.kwargs = kwargs or {}
+        self.event_bus_arg = event_bus_arg
+        self.placement = placement
+        self.max_restarts = max_restarts
+        # Services whose snapshot state must be restored before this one's
+        self.depends_on = tuple(depends_on)
+        self.lazy_restore = lazy_restore
+
+    def build(self, event_bus) -> Any:
+        kwargs = dict(self.kwargs)
+        if self.event_bus_arg:
+            kwargs[self.event_bus_arg] = event_bus
+        return self.cls(**kwargs)
+
+
+class ThreadBoundEventBus:
+    """
+    Event bus handle for a service running on its own loop in a worker thread.
+
+    Subscriptions and publishes are registered on the kernel's bus in the kernel's
+    loop; callbacks are executed on the service's loop, so blocking work in a
+    handler never stalls the kernel's loop.
+    """
+    def __init__(self, bus: EventBus, bus_loop: asyncio.AbstractEventLoop):
+        self.bus = bus
+        self.bus_loop = bus_loop
+        self._forwarders: Dict[Tuple[str, Callable], Callable] = {}
+
+    async def _on_bus_loop(self, coro) -> Any:
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self.bus_loop))
+
+    async def subscribe(self, event_type: str, callback: Callable, **kwargs) -> None:
+        service_loop = asyncio.get_running_loop()
+
+        async def forward(data):
+            await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(callback(data), service_loop))
+
+        self._forwarders[(event_type, callback)] = forward
+        await self._on_bus_loop(self.bus.subscribe(event_type, forward, **kwargs))
+
+    async def unsubscribe(self, event_type: str, callback: Callable) -> None:
+        forward = self._forwarders.pop((event_type, callback), None)
+        if forward is not None:
+            await self._on_bus_loop(self.bus.unsubscribe(event_type, forward))
+
+    async def publish(self, event_type: str, data: Any) -> None:
+        await self._on_bus_loop(self.bus.publish(event_type, data))
+
+    async def publish_many(self, event_type: str, events) -> None:
+        await self._on_bus_loop(self.bus.publish_many(event_type, events))
+
+
+class ServiceHost(ABC):
+    """
+    Kernel-side handle for a service placed outside the kernel's loop.
+
+    Any coroutine method defined by the service class can be called on the host
+    (e.g. `get_snapshot_state`); the call is forwarded to wherever the service runs.
+    """
+    def __init__(self, spec: ServiceSpec, event_bus: EventBus):
+        self.spec = spec
+        self.event_bus = event_bus
+
+    @property
+    def name(self) -> str:
+        return self.spec.name
+
+    def __getattr__(self, name: str) -> Callable:
+        spec = self.__dict__.get("spec")
+        if spec is None or name.startswith("_") or not callable(getattr(spec.cls, name, None)):
+            raise AttributeError(name)
+
+        async def remote_method(*args, **kwargs):
+            return await self.call(name, *args, **kwargs)
+        remote_method.__name__ = name
+        return remote_method
+
+    @abstractmethod
+    async def call(self, method: str, *args, **kwargs) -> Any:
+        """
+        Run coroutine method `method` of the hosted service and return its result.
+        """
+
+
+class ThreadServiceHost(ServiceHost):
+    """
+    Runs a service on a private event loop in a dedicated thread.
+    """
+    def __init__(self, spec: ServiceSpec, event_bus: EventBus):
+        super().__init__(spec, event_bus)
+        self.service = None
+        self.thread: Optional[threading.Thread] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stop_event: Optional[asyncio.Event] = None
+        # Set while the service is running; calls made before it starts wait for it
+        self.ready = asyncio.Event()
+
+    async def start(self) -> None:
+        bus_loop = asyncio.get_running_loop()
+        started = bus_loop.create_future()
+
+        async def run():
+            self.loop = asyncio.get_running_loop()
+            self._stop_event = asyncio.Event()
+            try:
+                self.service = self.spec.build(ThreadBoundEventBus(self.event_bus, bus_loop))
+            except Exception as e:
+                bus_loop.call_soon_threadsafe(started.set_exception, e)
+                return
+            bus_loop.call_soon_threadsafe(started.set_result, None)
+            if hasattr(self.service, "start"):
+                # Some services' start() runs for their whole lifetime
+                asyncio.create_task(self.service.start())
+            await self._stop_event.wait()
+
+        self.thread = threading.Thread(target=asyncio.run, args=(run(),), name=f"service-{self.name}", daemon=True)
+        self.thread.start()
+        await started
+        self.ready.set()
+        print(f"Service {self.name} running in thread {self.thread.name}.")
+
+    async def call(self, method: str, *args, **kwargs) -> Any:
+        await self.ready.wait()
+        if self.loop is None:
+            raise RuntimeError(f"Service {self.name} is not running.")
+        coro = getattr(self.service, method)(*args, **kwargs)
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self.loop))
+
+    async def stop(self) -> None:
+        if self.loop is None:
+            return
+        if hasattr(self.service, "stop"):
+            await self.call("stop")
+        self.loop.call_soon_threadsafe(self._stop_event.set)
+        await asyncio.get_running_loop().run_in_executor(None, self.thread.join, 10)
+        self.loop = None
+
+
+def _rpc_topic(name: str) -> str:
+    return f"kernel.service.{name}.rpc"
+
+
+def _reply_topic(name: str) -> str:
+    return f"kernel.service.{name}.reply"
+
+
+def run_service_process(spec: ServiceSpec, transport_spec: Tuple) -> None:
+    """
+    Entry point of a service worker process.
+    """
+    async def main():
+        bus = EventBus(transport=transport_from_peer_spec(transport_spec))
+        await bus.start()
+        service = spec.build(bus)
+        stopped = asyncio.Event()
+
+        async def serve(request):
+            reply = {"id": request["id"]}
+            try:
+                if request["method"] == "__ping__":
+                    reply["result"] = "pong"
+                elif request["method"] == "stop" and not hasattr(service, "stop"):
+                    reply["result"] = None
+                else:
+                    method = getattr(service, request["method"])
+                    reply["result"] = await method(*request.get("args", ()), **request.get("kwargs", {}))
+            except Exception as e:
+                reply["error"] = f"{type(e).__name__}: {e}"
+            await bus.publish(_reply_topic(spec.name), reply)
+            if request["method"] == "stop":
+                stopped.set()
+
+        async def handle_rpc(request):
+            # Each call gets its own task so a slow call never holds up the transport reader
+            asyncio.create_task(serve(request))
+
+        await bus.subscribe(_rpc_topic(spec.name), handle_rpc)
+        if hasattr(service, "start"):
+            asyncio.create_task(service.start())
+        await stopped.wait()
+        await bus.close()
+
+    asyncio.run(main())
+
+
+class ProcessServiceHost(ServiceHost):
+    """
+    Runs a service in a supervised worker process connected to the kernel's bus.
+
+    Calls are sent as request/reply events on `kernel.service.<name>.*`, so
+    arguments and results must be serializable by the bus transport. If the
+    process dies unexpectedly it is restarted with exponential backoff, up to
+    `spec.max_restarts` times.
+    """
+    def __init__(self, spec: ServiceSpec, event_bus: EventBus, rpc_timeout_sec: float = 30.0):
+        super().__init__(spec, event_bus)
+        self.rpc_timeout_sec = rpc_timeout_sec
+        self.process: Optional[multiprocessing.Process] = None
+        self.restarts = 0
+        self.stopping = False
+        self._ids = itertools.count()
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._supervisor: Optional[asyncio.Task] = None
+        self._subscribed = False
+        # Set while a worker is answering calls; calls made during a restart wait for it
+        self.ready = asyncio.Event()
+
+    async def start(self) -> None:
+        if not self._subscribed:
+            await self.event_bus.subscribe(_reply_topic(self.name), self._on_reply)
+            self._subscribed = True
+        self.stopping = False
+        await self._spawn()
+        self._supervisor = asyncio.create_task(self._supervise())
+
+    async def _spawn(self) -> None:
+        transport = self.event_bus.transport
+        transport_spec = transport.peer_spec()
+        context = multiprocessing.get_context("spawn")
+        self.process = context.Process(
+            target=run_service_process,
+            args=(self.spec, transport_spec),
+            name=f"service-{self.name}",
+            daemon=True,
+        )
+        self.process.start()
+        transport.release_peer_spec(transport_spec)
+        await self._wait_ready()
+        self.ready.set()
+        print(f"Service {self.name} running in process {self.process.pid}.")
+
+    async def _wait_ready(self, timeout: float = 120.0) -> None:
+        """
+        Ping the worker until it answers; early pings are lost until the worker has
+        subscribed to its RPC topic.
+        """
+        deadline = asyncio.get_running_loop().time() + timeout
+        while True:
+            try:
+                await self.call("__ping__", timeout=0.5)
+                return
+            except asyncio.TimeoutError:
+                if not self.process.is_alive():
+                    raise RuntimeError(f"Service {self.name} exited during startup with code {self.process.exitcode}.")
+                if asyncio.get_running_loop().time() > deadline:
+                    raise
+
+    async def _wait_for_exit(self) -> None:
+        loop = asyncio.get_running_loop()
+        exited = loop.create_future()
+        sentinel = self.process.sentinel
+        loop.add_reader(sentinel, lambda: exited.done() or exited.set_result(None))
+        try:
+            await exited
+        finally:
+            loop.remove_reader(sentinel)
+        self.process.join()
+
+    async def _supervise(self) -> None:
+        while True:
+            await self._wait_for_exit()
+            self.ready.clear()
+            if self.stopping:
+                return
+            self.restarts += 1
+            print(f"Service {self.name} exited with code {self.process.exitcode}.")
+            if self.restarts > self.spec.max_restarts:
+                print(f"Service {self.name} exceeded {self.spec.max_restarts} restarts; giving up.")
+                return
+            delay = min(30, 2 ** (self.restarts - 1))
+            print(f"Restarting service {self.name} in {delay}s (attempt {self.restarts}).")
+            await asyncio.sleep(delay)
+            try:
+                await self._spawn()
+            except Exception as e:
+                print(f"Failed to restart service {self.name}: {e}")
+
+    async def _on_reply(self, reply: Dict[str, Any]) -> None:
+        future = self._pending.pop(reply.get("id"), None)
+        if future is None or future.done():
+            return
+        if "error" in reply:
+            future.set_exception(RuntimeError(f"{self.name}: {reply['error']}"))
+        else:
+            future.set_result(reply.get("result"))
+
+    async def call(self, method: str, *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        return await asyncio.wait_for(self._call(method, args, kwargs), timeout or self.rpc_timeout_sec)
+
+    async def _call(self, method: str, args: Tuple, kwargs: Dict[str, Any]) -> Any:
+        if method != "__ping__":
+            await self.ready.wait()
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            await self.event_bus.publish(
+                _rpc_topic(self.name),
+                {"id": request_id, "method": method, "args": args, "kwargs": kwargs},
+            )
+            return await future
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def stop(self) -> None:
+        self.stopping = True
+        if self.process is None or not self.process.is_alive():
+            return
+        try:
+            await self.call("stop", timeout=10)
+        except Exception as e:
+            print(f"Service {self.name} did not stop cleanly: {e}")
+        await asyncio.get_running_loop().run_in_executor(None, self.process.join, 10)
+        if self.process.is_alive():
+            self.process.terminate()
+        if self._supervisor is not None:
+            self._supervisor.cancel()
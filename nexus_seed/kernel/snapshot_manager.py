@@ -1,36 +1,511 @@
 import asyncio
+import time
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 from nexus_seed.interfaces.events import EventTypes
 from nexus_seed.services.persistence import PersistenceOverseer
+from nexus_seed.utils.snapshot_chunks import decode_state, encode_state, ref_hashes
 
 class SnapshotManager:
-    def __init__(self, event_bus, persistence: PersistenceOverseer):
+    """
+    Coordinates global snapshots in two phases.
+
+    Prepare: SNAPSHOT_REQUESTED announces the snapshot, and every participant's
+    state is collected concurrently, each under its own deadline. Registered
+    participants are asked directly through `get_snapshot_state()`; remote ones
+    (see `serve_snapshot_requests`) answer with SNAPSHOT_STATE_PROVIDED.
+    Commit: once every reply is in, the snapshot is saved and
+    SNAPSHOT_COMMIT_SIGNAL is published. If a participant fails or misses its
+    deadline, SNAPSHOT_ABORT_SIGNAL is published instead and nothing is saved.
+
+    States are stored as content-addressed chunks (see snapshot_chunks), and
+    each saved snapshot is a small manifest of chunk references: a "full" one
+    every `full_snapshot_every` snapshots (or once the last full one is older
+    than `full_snapshot_max_age_sec`), and otherwise a "delta" holding only the
+    services that changed since its base. Only chunks not already stored are
+    written. After each full snapshot, chunks no retained manifest refers to
+    are deleted, except those stored within `chunk_gc_grace_sec`: chunks are
+    committed before their manifest, so a snapshot another node is still
+    saving must not lose them. Persistence retention never prunes a snapshot that a retained
+    delta is based on, so delta chains stay complete whatever its settings.
+    """
+    def __init__(
+        self,
+        event_bus,
+        persistence: PersistenceOverseer,
+        service_deadline_sec: float = 5.0,
+        require_all: bool = True,
+        restore_deadline_sec: float = 30.0,
+        full_snapshot_every: int = 10,
+        full_snapshot_max_age_sec: Optional[float] = 24 * 3600,
+        list_chunk_size: int = 256,
+        chunk_gc_grace_sec: float = 300.0,
+    ):
         self.event_bus = event_bus
         self.persistence = persistence
+        self.service_deadline_sec = service_deadline_sec
+        self.require_all = require_all
+        self.restore_deadline_sec = restore_deadline_sec
+        self.full_snapshot_every = full_snapshot_every
+        self.full_snapshot_max_age_sec = full_snapshot_max_age_sec
+        self.list_chunk_size = list_chunk_size
+        self.chunk_gc_grace_sec = chunk_gc_grace_sec
+        # Resolved refs of the latest manifest, loaded lazily from persistence
+        self._head: Optional[Dict[str, Any]] = None
         self.snapshot_lock = asyncio.Lock()
+        self.participants: Dict[str, Any] = {}
+        self.remote_participants: Dict[str, float] = {}
+        # Replies expected from remote participants, by snapshot id and service name
+        self._replies: Dict[str, Dict[str, asyncio.Future]] = {}
+        self._listening = False
+        # Restore ordering: service -> services that must be restored first
+        self.restore_dependencies: Dict[str, Set[str]] = {}
+        self.lazy_restore: Set[str] = set()
+        # The latest snapshot as found at startup, fetched once and shared by all restores
+        self._restore_source: Optional[Dict[str, Any]] = None
+        self._restoring: Dict[str, asyncio.Future] = {}
+        # Restores in progress (eager and background), with the services each covers
+        self._restore_runs: List[Tuple[Set[str], asyncio.Future]] = []
+
+        self.committed = 0
+        self.aborted = 0
+        self.last_duration_sec = 0.0
+        self.full_snapshots = 0
+        self.delta_snapshots = 0
+        self.chunks_written = 0
+        self.chunk_bytes_written = 0
+        self.chunks_reused = 0
+        self.chunks_collected = 0
+        self.restored = 0
+        self.restore_failed = 0
+        self.last_restore_sec = 0.0
+
+    def register_participant(
+        self,
+        name: str,
+        service: Any,
+        depends_on: Iterable[str] = (),
+        lazy_restore: bool = False,
+    ) -> None:
+        """
+        Include a service whose `get_snapshot_state()` can be called directly.
+
+        On restore it waits for the services in `depends_on`. With `lazy_restore`
+        its state is restored in the background after startup, or on first
+        `restore_service(name)`, instead of holding up startup. The service is
+        then already running, so its `restore_snapshot_state()` must merge the
+        snapshot into whatever it has recorded since, not replace it.
+        """
+        self.participants[name] = service
+        self.restore_dependencies[name] = set(depends_on)
+        if lazy_restore:
+            self.lazy_restore.add(name)
+        else:
+            self.lazy_restore.discard(name)
+
+    def register_remote_participant(self, name: str, deadline_sec: Optional[float] = None) -> None:
+        """
+        Include a service that answers over the event bus, e.g. on another node.
+        """
+        self.remote_participants[name] = deadline_sec or self.service_deadline_sec
+
+    async def _listen(self) -> None:
+        if not self._listening:
+            self._listening = True
+            await self.event_bus.subscribe(EventTypes.SNAPSHOT_STATE_PROVIDED.value, self._on_state_provided)
+
+    async def _on_state_provided(self, data: Dict[str, Any]) -> None:
+        futures = self._replies.get(data.get("snapshot_id"), {})
+        future = futures.get(data.get("service"))
+        if future is None or future.done():
+            return
+        if data.get("error"):
+            future.set_exception(RuntimeError(data["error"]))
+        else:
+            future.set_result(data.get("state", {}))
+
+    async def _collect_local(self, service: Any) -> Dict[str, Any]:
+        return await asyncio.wait_for(service.get_snapshot_state(), self.service_deadline_sec)
+
+    async def _collect_remote(self, future: asyncio.Future, deadline_sec: float) -> Dict[str, Any]:
+        return await asyncio.wait_for(future, deadline_sec)
 
-    async def request_snapshot(self):
+    async def request_snapshot(self, participants: Optional[Iterable[str]] = None) -> Optional[Dict[str, Any]]:
         """
-        Initiate a snapshot request.
+        Take a snapshot of all (or the named) participants.
+
+        Returns the saved snapshot, or None if it was aborted. Takes as long as
+        the slowest participant, at most its deadline. Participants still being
+        restored are waited for first: their pre-restore state must not become
+        the latest snapshot.
         """
         async with self.snapshot_lock:
-            print("Requesting snapshot...")
-            await self.event_bus.publish(EventTypes.SNAPSHOT_REQUESTED.value, {})
-            # Wait for services to provide their states
-            await asyncio.sleep(2)  # Simulate waiting for responses
-            print("Aggregating snapshot states...")
-            # Aggregate states and save snapshot
-            snapshot = {"services": "aggregated_states"}  # Replace with actual aggregation logic
-            await self.persistence.save_global_snapshot(snapshot)
-            await self.event_bus.publish(EventTypes.SNAPSHOT_COMMIT_SIGNAL.value, {})
-            print("Snapshot committed.")
-
-    async def restore_seed_state(self):
-        """
-        Restore the system state from the latest snapshot.
-        """
-        snapshot = await self.persistence.load_global_snapshot()
-        if snapshot:
-            print(f"Restoring system state from snapshot: {snapshot}")
-            # Restore logic here
+            await self._listen()
+            names = set(participants) if participants is not None else None
+            local = {n: s for n, s in self.participants.items() if names is None or n in names}
+            remote = {n: d for n, d in self.remote_participants.items() if (names is None or n in names) and n not in local}
+            await self.wait_for_restores(set(local) | set(remote))
+            snapshot_id = uuid.uuid4().hex
+            started = time.monotonic()
+            self._replies[snapshot_id] = {name: asyncio.get_running_loop().create_future() for name in remote}
+            collectors: Dict[str, asyncio.Future] = {}
+            try:
+                print(f"Requesting snapshot {snapshot_id} from {len(local) + len(remote)} services...")
+                # Start collecting before announcing: publishing may wait on the bus's own subscribers
+                collectors.update({
+                    name: asyncio.ensure_future(self._collect_local(service)) for name, service in local.items()
+                })
+                collectors.update({
+                    name: asyncio.ensure_future(self._collect_remote(self._replies[snapshot_id][name], deadline))
+                    for name, deadline in remote.items()
+                })
+                await self.event_bus.publish(EventTypes.SNAPSHOT_REQUESTED.value, {
+                    "snapshot_id": snapshot_id,
+                    "participants": sorted(list(local) + list(remote)),
+                    "deadline_sec": self.service_deadline_sec,
+                })
+                results = await asyncio.gather(*collectors.values(), return_exceptions=True)
+            finally:
+                self._replies.pop(snapshot_id, None)
+                for collector in collectors.values():
+                    collector.cancel()
+
+            states: Dict[str, Any] = {}
+            failed: Dict[str, str] = {}
+            for name, result in zip(collectors, results):
+                if isinstance(result, BaseException):
+                    failed[name] = "deadline exceeded" if isinstance(result, asyncio.TimeoutError) else str(result)
+                else:
+                    states[name] = result
+
+            if failed and (self.require_all or not states):
+                self.aborted += 1
+                print(f"Snapshot {snapshot_id} aborted; no state from: {failed}")
+                await self.event_bus.publish(EventTypes.SNAPSHOT_ABORT_SIGNAL.value, {
+                    "snapshot_id": snapshot_id,
+                    "failed": failed,
+                })
+                return None
+
+            snapshot = {
+                "snapshot_id": snapshot_id,
+                "created_at": time.time(),
+                "services": states,
+                "missing": sorted(failed),
+            }
+            try:
+                await self._save(snapshot)
+            except Exception as e:
+                self.aborted += 1
+                self._head = None
+                print(f"Snapshot {snapshot_id} aborted; could not be saved: {e}")
+                await self.event_bus.publish(EventTypes.SNAPSHOT_ABORT_SIGNAL.value, {
+                    "snapshot_id": snapshot_id,
+                    "failed": {"persistence": str(e)},
+                })
+                return None
+            self.committed += 1
+            self.last_duration_sec = time.monotonic() - started
+            await self.event_bus.publish(EventTypes.SNAPSHOT_COMMIT_SIGNAL.value, {
+                "snapshot_id": snapshot_id,
+                "services": sorted(states),
+            })
+            print(f"Snapshot {snapshot_id} committed in {self.last_duration_sec:.3f}s.")
+            return snapshot
+
+    async def _save(self, snapshot: Dict[str, Any]) -> None:
+        head = await self._load_head()
+        refs: Dict[str, Any] = {}
+        chunks: Dict[str, str] = {}
+        for name, state in snapshot["services"].items():
+            refs[name], service_chunks = encode_state(state, self.list_chunk_size)
+            chunks.update(service_chunks)
+
+        full = head is None or head["depth"] + 1 >= self.full_snapshot_every or (
+            self.full_snapshot_max_age_sec is not None
+            and snapshot["created_at"] - head["full_created_at"] > self.full_snapshot_max_age_sec
+        )
+        manifest = {"snapshot_id": snapshot["snapshot_id"], "created_at": snapshot["created_at"], "missing": snapshot["missing"]}
+        if head is not None:
+            # Services not in this round keep their last stored state
+            refs = {**head["refs"], **refs}
+        if full:
+            manifest.update({"kind": "full", "services": refs})
+        else:
+            manifest.update({
+                "kind": "delta",
+                "base": head["snapshot_id"],
+                "depth": head["depth"] + 1,
+                "changed": {name: ref for name, ref in refs.items() if head["refs"].get(name) != ref},
+            })
+
+        known = head["hashes"] if head is not None else set()
+        new_chunks = {digest: text for digest, text in chunks.items() if digest not in known}
+        await self.persistence.save_snapshot_chunks(new_chunks)
+        await self.persistence.save_global_snapshot(manifest)
+        self.chunks_written += len(new_chunks)
+        self.chunk_bytes_written += sum(len(text) for text in new_chunks.values())
+        self.chunks_reused += len(chunks) - len(new_chunks)
+
+        self._head = {
+            "snapshot_id": manifest["snapshot_id"],
+            "refs": refs,
+            "depth": manifest.get("depth", 0),
+            "full_created_at": manifest["created_at"] if full else head["full_created_at"],
+            "hashes": {digest for ref in refs.values() for digest in ref_hashes(ref)},
+        }
+        if full:
+            self.full_snapshots += 1
+            if head is not None:
+                await self.collect_garbage()
+        else:
+            self.delta_snapshots += 1
+
+    async def _resolve(self, manifest: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Walk a manifest's delta chain back to its full base and merge the refs.
+        Returns None for legacy snapshots, or if part of the chain is gone.
+        """
+        chain = [manifest]
+        while chain[-1].get("kind") == "delta":
+            base = await self.persistence.load_global_snapshot_by_id(chain[-1]["base"])
+            if not base:
+                print(f"Snapshot {manifest.get('snapshot_id')} is missing its base {chain[-1]['base']}.")
+                return None
+            chain.append(base)
+        if chain[-1].get("kind") != "full":
+            return None
+        refs = dict(chain[-1]["services"])
+        for delta in reversed(chain[:-1]):
+            refs.update(delta["changed"])
+        return {
+            "snapshot_id": manifest["snapshot_id"],
+            "created_at": manifest["created_at"],
+            "missing": manifest.get("missing", []),
+            "refs": refs,
+            "depth": manifest.get("depth", 0),
+            "full_created_at": chain[-1]["created_at"],
+        }
+
+    async def _load_head(self) -> Optional[Dict[str, Any]]:
+        if self._head is None:
+            latest = await self.persistence.load_global_snapshot()
+            head = await self._resolve(latest) if latest else None
+            if head is not None:
+                head["hashes"] = {digest for ref in head["refs"].values() for digest in ref_hashes(ref)}
+            self._head = head
+        return self._head
+
+    async def _snapshot_source(self, manifest: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if "kind" not in manifest:
+            # Written before chunked snapshots: states are stored inline
+            return {**manifest, "states": manifest.get("services", {})}
+        return await self._resolve(manifest)
+
+    async def _load_states(self, source: Dict[str, Any], names: Iterable[str]) -> Dict[str, Any]:
+        """
+        Decode the named services' states, fetching all their chunks in one round trip.
+        """
+        if "states" in source:
+            return {name: source["states"][name] for name in names if name in source["states"]}
+        refs = {name: source["refs"][name] for name in names if name in source["refs"]}
+        hashes = sorted({digest for ref in refs.values() for digest in ref_hashes(ref)})
+        chunks = await self.persistence.load_snapshot_chunks(hashes)
+        return {name: decode_state(ref, chunks) for name, ref in refs.items()}
+
+    async def load_snapshot_view(self, snapshot_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Rebuild a point-in-time snapshot (the latest by default) from its base
+        and deltas, as {"snapshot_id", "created_at", "services", "missing"}.
+        """
+        if snapshot_id is None:
+            manifest = await self.persistence.load_global_snapshot()
         else:
+            manifest = await self.persistence.load_global_snapshot_by_id(snapshot_id)
+        source = await self._snapshot_source(manifest) if manifest else None
+        if source is None:
+            return None
+        if "states" in source:
+            return manifest
+        return {
+            "snapshot_id": source["snapshot_id"],
+            "created_at": source["created_at"],
+            "services": await self._load_states(source, source["refs"]),
+            "missing": source["missing"],
+        }
+
+    async def collect_garbage(self) -> int:
+        """
+        Delete chunks that no retained snapshot refers to and that are older
+        than the grace period.
+        """
+        await self.persistence.flush()
+        live: Set[str] = set()
+        for manifest in await self.persistence.load_global_snapshots():
+            refs: List[Dict[str, Any]] = []
+            if manifest.get("kind") == "full":
+                refs = list(manifest["services"].values())
+            elif manifest.get("kind") == "delta":
+                refs = list(manifest["changed"].values())
+            for ref in refs:
+                live.update(ref_hashes(ref))
+        removed = await self.persistence.delete_snapshot_chunks_except(live, self.chunk_gc_grace_sec)
+        self.chunks_collected += removed
+        if removed:
+            print(f"Snapshot compaction removed {removed} unreferenced chunks.")
+        return removed
+
+    def restore_levels(self, names: Iterable[str]) -> List[List[str]]:
+        """
+        Group services into levels that can be restored concurrently, each level
+        only depending on earlier ones (Kahn's algorithm). Dependencies outside
+        `names` are ignored; services in a cycle share the last level.
+        """
+        names = set(names)
+        pending = {name: self.restore_dependencies.get(name, set()) & names for name in names}
+        levels: List[List[str]] = []
+        while pending:
+            level = sorted(name for name, deps in pending.items() if not deps)
+            if not level:
+                print(f"Restore dependency cycle among {sorted(pending)}; restoring them together.")
+                level = sorted(pending)
+            levels.append(level)
+            for name in level:
+                pending.pop(name)
+            for deps in pending.values():
+                deps.difference_update(level)
+        return levels
+
+    async def _load_restore_source(self) -> Dict[str, Any]:
+        if self._restore_source is None:
+            manifest = await self.persistence.load_global_snapshot()
+            source = await self._snapshot_source(manifest) if manifest else None
+            self._restore_source = source or {}
+        return self._restore_source
+
+    async def _restore_one(self, name: str, states: Optional[Dict[str, Any]] = None) -> str:
+        service = self.participants[name]
+        restore = getattr(service, "restore_snapshot_state", None)
+        if not callable(restore):
+            return "not restorable"
+        try:
+            if states is None:
+                states = await self._load_states(await self._load_restore_source(), [name])
+            if name not in states:
+                return "no state"
+            await asyncio.wait_for(restore(states[name]), self.restore_deadline_sec)
+        except Exception as e:
+            self.restore_failed += 1
+            error = "deadline exceeded" if isinstance(e, asyncio.TimeoutError) else str(e) or e.__class__.__name__
+            print(f"Failed to restore {name}: {error}")
+            return error
+        self.restored += 1
+        return "restored"
+
+    def restore_service(self, name: str, states: Optional[Dict[str, Any]] = None) -> asyncio.Future:
+        """
+        Restore one participant from the startup snapshot, at most once; returns
+        a future with "restored", "no state", "not restorable" or the error.
+        """
+        future = self._restoring.get(name)
+        if future is None:
+            future = self._restoring[name] = asyncio.ensure_future(self._restore_one(name, states))
+        return future
+
+    def _track_restore(self, names: Iterable[str], task: asyncio.Future) -> None:
+        run = (set(names), task)
+        self._restore_runs.append(run)
+        task.add_done_callback(lambda _: self._restore_runs.remove(run))
+
+    async def wait_for_restores(self, names: Iterable[str]) -> None:
+        """
+        Wait until no restore of any of `names` is in progress or queued.
+        """
+        names = set(names)
+        pending = [task for covered, task in self._restore_runs if covered & names]
+        pending += [self._restoring[name] for name in names if name in self._restoring]
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    async def _restore_in_levels(self, names: Iterable[str], states: Optional[Dict[str, Any]] = None) -> Dict[str, str]:
+        results: Dict[str, str] = {}
+        for level in self.restore_levels(names):
+            outcomes = await asyncio.gather(*(self.restore_service(name, states) for name in level))
+            results.update(zip(level, outcomes))
+        return results
+
+    async def restore_seed_state(self, names: Optional[Iterable[str]] = None) -> Dict[str, str]:
+        """
+        Restore all (or the named) participants from the latest snapshot.
+
+        The snapshot is fetched once and every service's chunks come back in a
+        single batch; services then restore concurrently, level by level in
+        dependency order. Lazy participants are restored in the background
+        afterwards, unless an eager one depends on them. Returns each eagerly
+        restored service's outcome.
+        """
+        names = [name for name in (self.participants if names is None else names) if name in self.participants]
+        # Tracked from the start, so a snapshot requested meanwhile waits for it
+        task = asyncio.ensure_future(self._restore_seed_state(names))
+        self._track_restore(names, task)
+        return await task
+
+    async def _restore_seed_state(self, names: List[str]) -> Dict[str, str]:
+        started = time.monotonic()
+        source = await self._load_restore_source()
+        if not source:
             print("No snapshot available for restoration.")
+            return {}
+
+        eager = {name for name in names if name not in self.lazy_restore}
+        needed = list(eager)
+        while needed:
+            for dependency in self.restore_dependencies.get(needed.pop(), ()):
+                if dependency in names and dependency not in eager:
+                    eager.add(dependency)
+                    needed.append(dependency)
+        lazy = [name for name in names if name not in eager]
+
+        states = await self._load_states(source, [name for name in eager if name not in self._restoring])
+        results = await self._restore_in_levels(eager, states)
+        self.last_restore_sec = time.monotonic() - started
+        print(f"Restored {len(results)} services from snapshot {source.get('snapshot_id')} in {self.last_restore_sec:.3f}s.")
+        if lazy:
+            self._track_restore(lazy, asyncio.ensure_future(self._restore_in_levels(lazy)))
+        return results
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "participants": sorted(self.participants),
+            "remote_participants": sorted(self.remote_participants),
+            "committed": self.committed,
+            "aborted": self.aborted,
+            "last_duration_sec": self.last_duration_sec,
+            "full_snapshots": self.full_snapshots,
+            "delta_snapshots": self.delta_snapshots,
+            "chunks_written": self.chunks_written,
+            "chunk_bytes_written": self.chunk_bytes_written,
+            "chunks_reused": self.chunks_reused,
+            "chunks_collected": self.chunks_collected,
+            "restored": self.restored,
+            "restore_failed": self.restore_failed,
+            "last_restore_sec": self.last_restore_sec,
+        }
+
+
+async def serve_snapshot_requests(event_bus, name: str, service: Any) -> None:
+    """
+    Answer snapshot requests for `service` over the event bus, for services the
+    SnapshotManager cannot call directly (register them as remote participants).
+    """
+    async def on_request(data: Dict[str, Any]) -> None:
+        if name not in data.get("participants", []):
+            return
+        reply: Dict[str, Any] = {"snapshot_id": data.get("snapshot_id"), "service": name}
+        try:
+            reply["state"] = await asyncio.wait_for(service.get_snapshot_state(), data.get("deadline_sec"))
+        except Exception as e:
+            reply["error"] = str(e) or e.__class__.__name__
+        await event_bus.publish(EventTypes.SNAPSHOT_STATE_PROVIDED.value, reply)
+
+    await event_bus.subscribe(EventTypes.SNAPSHOT_REQUESTED.value, on_request, mode="task")
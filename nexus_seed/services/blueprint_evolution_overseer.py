@@ -36,7 +36,8 @@ class BlueprintEvolutionOverseer:
 
     async def restore_snapshot_state(self, state: Dict[str, Any]) -> None:
         """
-        Restore the overseer state from a snapshot.
+        Restore the overseer state from a snapshot. Restored lazily, after the
+        overseer has started: anything recorded since is kept, after the restored history.
         """
-        self.state = state.get("state", {})
-        self.historical_data = state.get("historical_data", [])
+        self.state = {**state.get("state", {}), **self.state}
+        self.historical_data = state.get("historical_data", []) + self.historical_data
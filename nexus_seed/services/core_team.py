@@ -1,3 +1,4 @@
+import asyncio
 import sys
 import os
 
@@ -64,6 +65,7 @@ class CoreTeamMember:
         Conduct 50 rounds of iterations for each Core Team Member on a given agenda.
         """
         print(f"Starting 50 rounds of iterations for Core Team on agenda: '{agenda}'")
+        responses = {}
         for round_num in range(1, 51):
             print(f"--- Round {round_num} ---")
             for member in self.core_team:
@@ -71,13 +73,12 @@ class CoreTeamMember:
                     print(f"{member.name} ({member.domain}): {member.persona}")
                     response = f"{member.name}: Here's my input on the agenda '{agenda}' for round {round_num}."
                     print(response)
-                    # Example: Log the response to shared knowledge
-                    await self.shared_knowledge.add_entry(
-                        key=f"round_{round_num}_{member.name}",
-                        value={"agenda": agenda, "response": response}
-                    )
+                    responses[f"round_{round_num}_{member.name}"] = {"agenda": agenda, "response": response}
                 except Exception as e:
                     print(f"Error during iteration for {member.name} in round {round_num}: {e}")
+        # Log all responses to shared knowledge in one transaction
+        # A blocking SQLite transaction, so it runs off the event loop
+        await asyncio.get_running_loop().run_in_executor(None, self.shared_knowledge.add_entries, responses)
         print("50 rounds of iterations completed.")
 
     async def propose_new_function(self, main_brain, function_name: str, function_code: str):
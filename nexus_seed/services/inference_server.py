@@ -0,0 +1,268 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+from nexus_seed.utils.model_registry import ModelRegistry
+from nexus_seed.utils.response_cache import ResponseCache, response_cache_key
+
+
+class GenerationRequest:
+    __slots__ = ("model_key", "prompt", "params", "future", "enqueued_at")
+
+    def __init__(self, model_key: str, prompt: str, params: Dict[str, Any], future: asyncio.Future):
+        self.model_key = model_key
+        self.prompt = prompt
+        self.params = params
+        self.future = future
+        self.enqueued_at = time.monotonic()
+
+    def group_key(self) -> Tuple:
+        # Only requests for the same model with the same settings can share a generate() call
+        return (self.model_key, tuple(sorted(self.params.items())))
+
+
+class InferenceServer:
+    """
+    Batches concurrent text-generation requests for causal language models.
+
+    Requests are queued and collected until `max_batch_size` are waiting or
+    `max_wait_sec` has passed since the first one; requests for the same model
+    and generation settings are then left-padded into a single `generate()`
+    call, and each output is cut to its own request's `max_length`, so it is
+    the same as if the request had run alone. Generation runs on a dedicated worker thread so the event loop stays
+    responsive; requests arriving meanwhile are picked up together as the next batch.
+
+    With a `cache`, deterministic requests are answered from it when possible;
+    sampling requests (`do_sample=True`) bypass it unless `use_cache=True`.
+    """
+    def __init__(
+        self,
+        model_registry: ModelRegistry,
+        max_batch_size: int = 8,
+        max_wait_sec: float = 0.02,
+        cache: Optional[ResponseCache] = None,
+    ):
+        self.model_registry = model_registry
+        self.cache = cache
+        self.max_batch_size = max_batch_size
+        self.max_wait_sec = max_wait_sec
+        self.queue: Optional[asyncio.Queue] = None
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self._batcher: Optional[asyncio.Task] = None
+
+        self.requests = 0
+        self.streams = 0
+        self.batches = 0
+        self.batched_requests = 0
+        self.max_observed_batch = 0
+        self.errors = 0
+        self.total_queue_wait_sec = 0.0
+
+    def _ensure_started(self) -> None:
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+        if self._batcher is None or self._batcher.done():
+            self.queue = asyncio.Queue()
+            self._batcher = asyncio.create_task(self._batch_loop())
+
+    async def generate(
+        self, model_key: str, prompt: str, max_length: int = 50, use_cache: Optional[bool] = None, **params
+    ) -> str:
+        """
+        Generate a completion for `prompt` and return the decoded text (prompt included).
+        """
+        params["max_length"] = max_length
+        if use_cache is None:
+            # Sampled outputs are meant to differ between calls
+            use_cache = not params.get("do_sample", False)
+        cache_key = None
+        if use_cache and self.cache is not None:
+            cache_key = response_cache_key(model_key, prompt, params)
+            cached = await self.cache.get_async(cache_key)
+            if cached is not None:
+                return cached
+
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put(GenerationRequest(model_key, prompt, params, future))
+        self.requests += 1
+        text = await future
+        if cache_key is not None:
+            await self.cache.put_async(cache_key, text)
+        return text
+
+    async def _collect_batch(self) -> List[GenerationRequest]:
+        batch = [await self.queue.get()]
+        deadline = time.monotonic() + self.max_wait_sec
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 and self.queue.empty():
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), max(remaining, 0)))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _batch_loop(self) -> None:
+        while True:
+            batch = await self._collect_batch()
+            groups: Dict[Tuple, List[GenerationRequest]] = {}
+            for request in batch:
+                if not request.future.done():
+                    groups.setdefault(request.group_key(), []).append(request)
+            try:
+                for group in groups.values():
+                    await self._run_group(group)
+            except asyncio.CancelledError:
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(RuntimeError("Inference server stopped."))
+                raise
+
+    async def _run_group(self, group: List[GenerationRequest]) -> None:
+        now = time.monotonic()
+        self.batches += 1
+        self.batched_requests += len(group)
+        self.max_observed_batch = max(self.max_observed_batch, len(group))
+        self.total_queue_wait_sec += sum(now - request.enqueued_at for request in group)
+        try:
+            tokenizer, model = await self.model_registry.load(group[0].model_key)
+            loop = asyncio.get_running_loop()
+            prompts = [request.prompt for request in group]
+            texts = await loop.run_in_executor(self.executor, self._generate_batch, tokenizer, model, prompts, group[0].params)
+        except Exception as e:
+            self.errors += 1
+            for request in group:
+                if not request.future.done():
+                    request.future.set_exception(e)
+            return
+        for request, text in zip(group, texts):
+            if not request.future.done():
+                request.future.set_result(text)
+
+    @staticmethod
+    def _generate_batch(tokenizer, model, prompts: List[str], params: Dict[str, Any]) -> List[str]:
+        import torch
+
+        params = dict(params)
+        max_length = params.pop("max_length")
+        pad_token_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else tokenizer.eos_token_id
+        encoded = [tokenizer(prompt, truncation=True)["input_ids"] for prompt in prompts]
+        width = max(len(input_ids) for input_ids in encoded)
+        # Decoder-only models continue from the last position, so pad on the left;
+        # padded here rather than through the tokenizer, which other callers share
+        input_ids = torch.tensor([[pad_token_id] * (width - len(ids)) + list(ids) for ids in encoded])
+        attention_mask = torch.tensor([[0] * (width - len(ids)) + [1] * len(ids) for ids in encoded])
+        # max_length counts the prompt, so each prompt has its own budget of new tokens
+        budgets = [max(1, max_length - len(ids)) for ids in encoded]
+        with torch.no_grad():
+            outputs = model.generate(
+                input_ids,
+                attention_mask=attention_mask,
+                max_new_tokens=max(budgets),
+                num_return_sequences=1,
+                pad_token_id=pad_token_id,
+                **params,
+            )
+        # Keep each prompt's own tokens and budget, so its text does not depend on the rest of the batch
+        rows = [
+            list(ids) + outputs[index, width:width + budget].tolist()
+            for index, (ids, budget) in enumerate(zip(encoded, budgets))
+        ]
+        return tokenizer.batch_decode(rows, skip_special_tokens=True)
+
+    async def stream(self, model_key: str, prompt: str, max_length: int = 50, **params) -> AsyncIterator[str]:
+        """
+        Yield the generated text piece by piece as tokens are produced (prompt excluded).
+
+        Streams are not batched: each runs its own generate() in a worker thread.
+        Leaving the loop early stops generation at the next token.
+        """
+        tokenizer, model = await self.model_registry.load(model_key)
+        loop = asyncio.get_running_loop()
+        pieces: asyncio.Queue = asyncio.Queue()
+        cancelled = threading.Event()
+        finished = object()
+
+        def push(item) -> None:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(pieces.put_nowait, item)
+
+        def run() -> None:
+            try:
+                self._generate_streaming(tokenizer, model, prompt, max_length, params, push, cancelled)
+                push(finished)
+            except Exception as e:
+                push(e)
+
+        self.streams += 1
+        threading.Thread(target=run, name="inference-stream", daemon=True).start()
+        try:
+            while True:
+                item = await pieces.get()
+                if item is finished:
+                    return
+                if isinstance(item, Exception):
+                    self.errors += 1
+                    raise item
+                yield item
+        finally:
+            cancelled.set()
+
+    @staticmethod
+    def _generate_streaming(
+        tokenizer, model, prompt: str, max_length: int, params: Dict[str, Any],
+        on_text: Callable[[str], None], cancelled: threading.Event,
+    ) -> None:
+        import torch
+        from transformers import StoppingCriteria, StoppingCriteriaList, TextStreamer
+
+        class CallbackStreamer(TextStreamer):
+            # TextStreamer already groups tokens into printable text; hand it on instead of printing
+            def on_finalized_text(self, text: str, stream_end: bool = False):
+                if text:
+                    on_text(text)
+
+        class StopWhenCancelled(StoppingCriteria):
+            def __call__(self, input_ids, scores, **kwargs):
+                return cancelled.is_set()
+
+        inputs = tokenizer(prompt, return_tensors="pt", truncation=True)
+        max_new_tokens = max(1, max_length - inputs["input_ids"].shape[1])
+        with torch.no_grad():
+            model.generate(
+                inputs["input_ids"],
+                attention_mask=inputs["attention_mask"],
+                max_new_tokens=max_new_tokens,
+                pad_token_id=tokenizer.pad_token_id if tokenizer.pad_token_id is not None else tokenizer.eos_token_id,
+                streamer=CallbackStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True),
+                stopping_criteria=StoppingCriteriaList([StopWhenCancelled()]),
+                **params,
+            )
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "streams": self.streams,
+            "batches": self.batches,
+            "avg_batch_size": self.batched_requests / self.batches if self.batches else 0.0,
+            "max_batch_size": self.max_observed_batch,
+            "avg_queue_wait_sec": self.total_queue_wait_sec / self.batched_requests if self.batched_requests else 0.0,
+            "queue_depth": self.queue.qsize() if self.queue else 0,
+            "errors": self.errors,
+        }
+
+    async def stop(self) -> None:
+        if self._batcher is not None:
+            self._batcher.cancel()
+            await asyncio.gather(self._batcher, return_exceptions=True)
+            self._batcher = None
+        while self.queue is not None and not self.queue.empty():
+            request = self.queue.get_nowait()
+            if not request.future.done():
+                request.future.set_exception(RuntimeError("Inference server stopped."))
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+            self.executor = None
@@ -1,17 +1,20 @@
 from typing import List, Dict
-from sklearn.feature_extraction.text import CountVectorizer
-from sklearn.decomposition import LatentDirichletAllocation
 
 class LanguageAdaptationModule:
     def __init__(self):
-        self.vectorizer = CountVectorizer()
-        self.lda_model = LatentDirichletAllocation(n_components=5, random_state=42)
+        # Built on first use so importing this module does not pull in scikit-learn
+        self.vectorizer = None
+        self.lda_model = None
 
     def learn_language(self, corpus: List[str]) -> None:
         """
         Learn patterns in a new language using unsupervised learning.
         """
         try:
+            from sklearn.feature_extraction.text import CountVectorizer
+            from sklearn.decomposition import LatentDirichletAllocation
+            self.vectorizer = CountVectorizer()
+            self.lda_model = LatentDirichletAllocation(n_components=5, random_state=42)
             vectorized_data = self.vectorizer.fit_transform(corpus)
             self.lda_model.fit(vectorized_data)
             print("Language patterns learned successfully.")
@@ -23,6 +26,8 @@ class LanguageAdaptationModule:
         Translate text using learned patterns.
         """
         try:
+            if self.vectorizer is None:
+                raise ValueError("No language has been learned yet.")
             vectorized_text = self.vectorizer.transform([text])
             topic_distribution = self.lda_model.transform(vectorized_text)
             return f"Translated text with topic distribution: {topic_distribution}"
@@ -2,20 +2,17 @@ import sys
 import os
 import asyncio
 import requests
-from bs4 import BeautifulSoup
-from typing import Dict, List, Any
-from transformers import AutoTokenizer, AutoModelForCausalLM
+from typing import AsyncIterator, Dict, List, Any, Optional
 from nexus_seed.utils.event_bus import EventBus
 from nexus_seed.utils.memory_manager import MemoryManager
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import accuracy_score
-import numpy as np
+from nexus_seed.utils.model_registry import ModelRegistry, model_registry as shared_model_registry
+from nexus_seed.services.inference_server import InferenceServer
+from nexus_seed.utils.response_cache import ResponseCache
 import shutil
 import platform
 import subprocess
-import tensorflow as tf
-from huggingface_hub import hf_hub_download
+import uuid
+from nexus_seed.utils.knowledge_search import TransformerEmbedder
 from nexus_seed.utils.shared_knowledge_base import SharedKnowledgeBase
 from nexus_seed.services.core_team import CoreTeamMember
 from nexus_seed.services.communication_hub import CommunicationHub
@@ -24,19 +21,31 @@ from nexus_seed.services.communication_hub import CommunicationHub
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
 
 class MainBrain:
-    def __init__(self, event_bus: EventBus):
+    def __init__(
+        self,
+        event_bus: EventBus,
+        model_registry: Optional[ModelRegistry] = None,
+        response_cache: Optional[ResponseCache] = None,
+    ):
         self.event_bus = event_bus
+        # Memory lives in an append-only journal and is streamed when analysed
         self.memory_manager = MemoryManager("/home/pong/Desktop/AIseed/nexus_seed/memory.json")
-        self.memory: List[Dict] = self.memory_manager.load_memory()
-        self.tokenizer = AutoTokenizer.from_pretrained("gpt2")
-        self.model = AutoModelForCausalLM.from_pretrained("gpt2")
+        # Models are loaded on first use and shared with other services through the registry
+        self.model_registry = model_registry or shared_model_registry
+        self.chat_model_key = self.model_registry.register_causal_lm("gpt2")
+        self.local_model_key = self.model_registry.register_causal_lm("gpt2")
+        # Concurrent generation requests are batched into shared generate() calls,
+        # and repeated deterministic prompts are answered from the cache
+        self.response_cache = response_cache or ResponseCache(max_entries=1024, ttl_sec=3600)
+        self.inference_server = InferenceServer(self.model_registry, cache=self.response_cache)
         self.random_forest_model = None  # Placeholder for Random Forest model
-        self.tensorflow_model = self.initialize_tensorflow_model()
+        self._tensorflow_model = None
         self.optimization_log = "/home/pong/Desktop/AIseed/logs/optimization.log"
-        self.local_tokenizer = None
-        self.local_model = None
-        self.initialize_local_model()
-        self.shared_knowledge = SharedKnowledgeBase()
+        # Semantic knowledge search embeds entries with the local model, so it is opt-in
+        embedder = None
+        if os.environ.get("NEXUS_KNOWLEDGE_EMBEDDINGS") == "1":
+            embedder = TransformerEmbedder(self.model_registry, self.local_model_key)
+        self.shared_knowledge = SharedKnowledgeBase(embedder=embedder)
         self.communication_hub = CommunicationHub()
         self.core_team = [
             CoreTeamMember("Tony Stark", "engineering", event_bus, self.shared_knowledge),
@@ -76,12 +85,26 @@ class MainBrain:
             "blah_blah_blah": self.blah_blah_blah,
             "mistral_inference": self.mistral_inference,
             "ai_decision_making": self.ai_decision_making,
+            "memory_stats": self.query_memory_stats,
+            "search_knowledge": self.search_knowledge,
+        }
+        # Functions that can also deliver their output incrementally
+        self.streaming_functions = {
+            "chat": self.stream_response,
+            "mistral_inference": self.stream_local_model_inference,
         }
         self.tasks = []
 
+    @property
+    def tensorflow_model(self):
+        if self._tensorflow_model is None:
+            self._tensorflow_model = self.initialize_tensorflow_model()
+        return self._tensorflow_model
+
     def initialize_tensorflow_model(self):
         # Example: Load or create a TensorFlow model
         try:
+            import tensorflow as tf
             model = tf.keras.Sequential([
                 tf.keras.layers.Dense(128, activation='relu'),
                 tf.keras.layers.Dense(64, activation='relu'),
@@ -94,23 +117,19 @@ class MainBrain:
             print(f"Error initializing TensorFlow model: {e}")
             return None
 
-    def initialize_local_model(self):
+    async def initialize_local_model(self):
         """
-        Initialize a small local model like GPT-2 or LLaMA.
+        Load the local model (GPT-2) ahead of its first use.
         """
         try:
-            print("Initializing local model (GPT-2)...")
-            self.local_tokenizer = AutoTokenizer.from_pretrained("gpt2")
-            self.local_model = AutoModelForCausalLM.from_pretrained("gpt2")
-            print("Local model initialized successfully.")
+            await self.model_registry.load(self.local_model_key)
         except Exception as e:
             print(f"Error initializing local model: {e}")
-            self.local_tokenizer = None
-            self.local_model = None
 
     async def process_event(self, event: Dict) -> None:
         """
         Process an incoming event and route it to the appropriate function.
+        Events with `"stream": True` are streamed when the function supports it.
         """
         try:
             print(f"Main Brain processing event: {event}")
@@ -121,6 +140,9 @@ class MainBrain:
             if not event_type:
                 raise ValueError("Event type is missing.")
 
+            if event.get("stream") and event_type in self.streaming_functions:
+                return await self.process_streaming_event(event_type, params, event.get("request_id"))
+
             # Route event to the appropriate function
             if event_type in self.functions:
                 # Explicitly pass parameters to the function
@@ -133,18 +155,47 @@ class MainBrain:
             print(f"Error processing event: {e}")
             return f"Error processing event: {e}"
 
+    async def process_streaming_event(self, event_type: str, params: Dict, request_id: Optional[str] = None) -> str:
+        """
+        Run a streaming function, publishing each piece on `main_brain.stream.<request_id>`
+        as it is produced. Returns the full text.
+        """
+        request_id = request_id or uuid.uuid4().hex
+        topic = f"main_brain.stream.{request_id}"
+        pieces = []
+        try:
+            async for piece in self.streaming_functions[event_type](**params):
+                pieces.append(piece)
+                await self.event_bus.publish(topic, {"request_id": request_id, "text": piece, "done": False})
+        finally:
+            await self.event_bus.publish(topic, {"request_id": request_id, "text": "", "done": True})
+        return "".join(pieces)
+
+    async def stream_response(self, message: str) -> AsyncIterator[str]:
+        """
+        Streaming variant of generate_response: yields the reply as it is generated.
+        """
+        try:
+            async for piece in self.inference_server.stream(self.chat_model_key, message, max_length=50):
+                yield piece
+        except Exception as e:
+            print(f"Error streaming response: {e}")
+            yield "I'm sorry, I encountered an error."
+
+    async def stream_local_model_inference(self, prompt: str) -> AsyncIterator[str]:
+        """
+        Streaming variant of local_model_inference.
+        """
+        try:
+            async for piece in self.inference_server.stream(self.local_model_key, prompt, max_length=100):
+                yield piece
+        except Exception as e:
+            print(f"Error during local model streaming: {e}")
+            yield f"Error: {e}"
+
     async def generate_response(self, message: str) -> str:
         try:
-            inputs = self.tokenizer(message, return_tensors="pt", padding=True, truncation=True)
-            outputs = self.model.generate(
-                inputs["input_ids"],
-                attention_mask=inputs["attention_mask"],
-                max_length=50,
-                num_return_sequences=1,
-                pad_token_id=self.tokenizer.eos_token_id  # Set pad_token_id to eos_token_id
-            )
-            response = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
-            return response
+            return await self.inference_server.generate(self.chat_model_key, message, max_length=50)
         except Exception as e:
             print(f"Error generating response: {e}")
             return "I'm sorry, I encountered an error."
@@ -154,23 +205,21 @@ class MainBrain:
         Perform inference using the local model.
         """
         try:
-            if not self.local_model or not self.local_tokenizer:
-                raise ValueError("Local model is not initialized.")
-
-            inputs = self.local_tokenizer(prompt, return_tensors="pt", padding=True, truncation=True)
-            outputs = self.local_model.generate(
-                inputs["input_ids"],
-                attention_mask=inputs["attention_mask"],
-                max_length=100,
-                num_return_sequences=1,
-                pad_token_id=self.local_tokenizer.eos_token_id  # Set pad_token_id to eos_token_id
-            )
-            response = self.local_tokenizer.decode(outputs[0], skip_special_tokens=True)
-            return response
+            return await self.inference_server.generate(self.local_model_key, prompt, max_length=100)
         except Exception as e:
             print(f"Error during local model inference: {e}")
             return f"Error: {e}"
 
+    async def get_inference_stats(self) -> Dict[str, Any]:
+        """
+        Model registry, batching and response cache statistics.
+        """
+        return {
+            "models": self.model_registry.get_stats(),
+            "batching": self.inference_server.get_stats(),
+            "response_cache": self.response_cache.get_stats(),
+        }
+
     async def mistral_inference(self, prompt: str) -> str:
         """
         Perform inference using the local model (replacing Mistral).
@@ -179,11 +228,11 @@ class MainBrain:
 
     async def web_scrape(self, url: str, element: str = "body") -> str:
         try:
+            from bs4 import BeautifulSoup
             response = requests.get(url)
             soup = BeautifulSoup(response.text, "html.parser")
             content = soup.select_one(element).get_text(strip=True)
-            self.memory.append({"type": "web_scrape", "url": url, "content": content})
-            self.memory_manager.save_memory(self.memory)
+            self.memory_manager.append({"type": "web_scrape", "url": url, "content": content})
             return content
         except Exception as e:
             print(f"Error during web scraping: {e}")
@@ -195,8 +244,7 @@ class MainBrain:
     async def execute_task(self, command: str) -> str:
         try:
             result = os.popen(command).read()
-            self.memory.append({"type": "execute_task", "command": command, "result": result})
-            self.memory_manager.save_memory(self.memory)
+            self.memory_manager.append({"type": "execute_task", "command": command, "result": result})
             return result
         except Exception as e:
             print(f"Error executing task: {e}")
@@ -207,6 +255,10 @@ class MainBrain:
         Train a Random Forest model using the provided data and labels.
         """
         try:
+            from sklearn.ensemble import RandomForestClassifier
+            from sklearn.model_selection import train_test_split
+            from sklearn.metrics import accuracy_score
+
             # Validate input data
             if not data or not labels:
                 raise ValueError("Data and labels must not be empty.")
@@ -272,8 +324,8 @@ class MainBrain:
             issues = []
             if not self.random_forest_model:
                 issues.append("Random Forest model is not trained.")
-            if not os.path.exists("/home/pong/Desktop/AIseed/nexus_seed/memory.json"):
-                issues.append("Memory file is missing.")
+            if not os.path.isdir(self.memory_manager.journal_dir):
+                issues.append("Memory journal is missing.")
             if issues:
                 return f"Self-Debugging found issues: {', '.join(issues)}"
             return "No issues found during self-debugging."
@@ -284,10 +336,10 @@ class MainBrain:
     async def self_heal(self) -> str:
         try:
             # Example: Attempt to resolve issues found during self-debugging
-            if not os.path.exists("/home/pong/Desktop/AIseed/nexus_seed/memory.json"):
-                with open("/home/pong/Desktop/AIseed/nexus_seed/memory.json", "w") as file:
-                    file.write("[]")
-                return "Self-Healing: Memory file recreated."
+            if not os.path.isdir(self.memory_manager.journal_dir):
+                self.memory_manager.journal.close()
+                self.memory_manager.journal.open()
+                return "Self-Healing: Memory journal recreated."
             return "No self-healing actions required."
         except Exception as e:
             print(f"Error during self-healing: {e}")
@@ -295,9 +347,7 @@ class MainBrain:
 
     async def generate_code(self, prompt: str) -> str:
         try:
-            inputs = self.tokenizer.encode(prompt, return_tensors="pt")
-            outputs = self.model.generate(inputs, max_length=100, num_return_sequences=1)
-            code = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
+            code = await self.inference_server.generate(self.chat_model_key, prompt, max_length=100)
             return f"Generated Code:\n{code}"
         except Exception as e:
             print(f"Error generating code: {e}")
@@ -380,8 +430,7 @@ class MainBrain:
                 agent_task = asyncio.create_task(self.functions[task](**params))
                 self.tasks.append(agent_task)
                 result = await agent_task
-                self.memory.append({"type": "ai_agent", "task": task, "result": result})
-                self.memory_manager.save_memory(self.memory)
+                self.memory_manager.append({"type": "ai_agent", "task": task, "result": result})
                 return f"AI agent completed task: {task} with result: {result}"
             else:
                 return f"Task '{task}' not found for AI agent."
@@ -438,7 +487,9 @@ class MainBrain:
             print("Executing Protocol Omnitide...")
             # Example functionality: Gather system status and core team readiness
             system_status = await self.get_os_info()
-            core_team_status = [f"{member['name']} ({member['domain']}) is ready." for member in self.memory if member.get("type") == "core_team"]
+            # Reading memory flushes buffered appends first; keep that off the event loop
+            memory = await asyncio.get_running_loop().run_in_executor(None, self.memory_manager.load_memory)
+            core_team_status = [f"{member['name']} ({member['domain']}) is ready." for member in memory if member.get("type") == "core_team"]
             return f"Protocol Omnitide executed.\nSystem Status: {system_status}\nCore Team Status: {', '.join(core_team_status)}"
         except Exception as e:
             print(f"Error executing Protocol Omnitide: {e}")
@@ -530,11 +581,7 @@ class MainBrain:
         try:
             # Example: Analyze memory for recurring tasks
             patterns = []
-            task_counts = {}
-            for entry in self.memory:
-                task = entry.get("type")
-                if task:
-                    task_counts[task] = task_counts.get(task, 0) + 1
+            task_counts = self.memory_manager.aggregates.type_counts()
 
             # Identify tasks with high frequency
             for task, count in task_counts.items():
@@ -563,13 +610,36 @@ class MainBrain:
         """
         try:
             # Example: Calculate efficiency and accuracy
-            efficiency = sum(entry.get("efficiency", 0) for entry in self.memory) / len(self.memory)
-            accuracy = sum(entry.get("accuracy", 0) for entry in self.memory) / len(self.memory)
+            aggregates = self.memory_manager.aggregates
+            efficiency = aggregates.mean("efficiency")
+            accuracy = aggregates.mean("accuracy")
             return {"efficiency": efficiency, "accuracy": accuracy}
         except Exception as e:
             print(f"Error evaluating system performance: {e}")
             return {"efficiency": 0.0, "accuracy": 0.0}
 
+    async def query_memory_stats(self, entry_type: Optional[str] = None, window_sec: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Entry count and average efficiency/accuracy, optionally for one entry type
+        and/or the last `window_sec` seconds.
+        """
+        try:
+            return self.memory_manager.aggregates.query(entry_type, window_sec)
+        except ValueError as e:
+            return {"error": str(e)}
+
+    async def search_knowledge(self, query: str, k: int = 10, mode: str = "bm25") -> List[Dict[str, Any]]:
+        """
+        Ranked search over the shared knowledge base (see SharedKnowledgeBase.search).
+        """
+        try:
+            # Searching flushes buffered writes, and embedding the query runs the model;
+            # keep both off the event loop
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, self.shared_knowledge.search, query, k, mode)
+        except ValueError as e:
+            return [{"error": str(e)}]
+
     async def get_live_updates(self) -> str:
         """
         Fetch live updates of system modules and workflows.
@@ -724,10 +794,12 @@ def dynamic_function():
         Expose all system capabilities to AI agents and models.
         """
         try:
+            # Listing flushes buffered writes first; keep that off the event loop
+            knowledge_keys = await asyncio.get_running_loop().run_in_executor(None, self.shared_knowledge.list_entries)
             capabilities = {
                 "functions": list(self.functions.keys()),
                 "core_team": [member.name for member in self.core_team],
-                "shared_knowledge": self.shared_knowledge.list_entries(),
+                "shared_knowledge": knowledge_keys,
                 "communication_channels": list(self.communication_hub.channels.keys())
             }
             print(f"Exposed capabilities: {capabilities}")
@@ -752,8 +824,12 @@ def dynamic_function():
 
     async def start(self) -> None:
         print("Main Brain started.")
+        idle_eviction = self.model_registry.start_idle_eviction()
+        if idle_eviction is not None:
+            self.tasks.append(idle_eviction)
         try:
-            await self.event_bus.subscribe("core_event", self.process_event)
+            # Generation is slow; a dedicated queue keeps it from stalling publishers
+            await self.event_bus.subscribe("core_event", self.process_event, mode="queued", queue_size=100)
         except Exception as e:
             print(f"Error subscribing to core_event: {e}")
 
@@ -762,13 +838,28 @@ def dynamic_function():
         for task in self.tasks:
             task.cancel()
         await asyncio.gather(*self.tasks, return_exceptions=True)
+        await self.inference_server.stop()
+        await self.flush()
         print("All MainBrain tasks have been stopped.")
 
+    async def flush(self) -> Dict[str, Any]:
+        """
+        Make buffered memory and knowledge writes durable; returns the write-behind counters.
+        """
+        loop = asyncio.get_running_loop()
+        memory_flushed = await loop.run_in_executor(None, self.memory_manager.flush)
+        knowledge_flushed = await loop.run_in_executor(None, self.shared_knowledge.flush)
+        return {
+            "memory": {**self.memory_manager.get_stats()["write_behind"], "flushed": memory_flushed},
+            "shared_knowledge": {**self.shared_knowledge.get_stats()["write_behind"], "flushed": knowledge_flushed},
+        }
+
 def download_model(repo_id: str, filename: str, force_download: bool = False):
     """
     Download a model file from Hugging Face Hub.
     """
     try:
+        from huggingface_hub import hf_hub_download
         model_path = hf_hub_download(repo_id=repo_id, filename=filename, force_download=force_download)
         print(f"Model downloaded to: {model_path}")
         return model_path
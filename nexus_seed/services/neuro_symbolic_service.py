@@ -1,9 +1,13 @@
-import torch
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+from nexus_seed.utils.model_registry import ModelRegistry, model_registry as shared_model_registry
 
 class NeuroSymbolicService:
-    def __init__(self):
-        self.model = self.initialize_model()
+    def __init__(self, model_registry: Optional[ModelRegistry] = None):
+        self.model_registry = model_registry or shared_model_registry
+        # Pinned: the weights are random, so a reloaded model would predict differently
+        self.model_key = self.model_registry.register(
+            "neuro_symbolic:mlp-10-50-1", self.initialize_model, pinned=True
+        )
         self.knowledge_base = {"rules": []}  # Example symbolic knowledge base
         self.state = {}
         self.running = False
@@ -12,6 +16,7 @@ class NeuroSymbolicService:
         """
         Initialize a PyTorch model for demonstration.
         """
+        import torch
         return torch.nn.Sequential(
             torch.nn.Linear(10, 50),
             torch.nn.ReLU(),
@@ -23,8 +28,10 @@ class NeuroSymbolicService:
         Perform analysis using the neural network and symbolic reasoning.
         """
         try:
+            import torch
+            model = await self.model_registry.load(self.model_key)
             tensor_input = torch.tensor(input_data["features"], dtype=torch.float32)
-            prediction = self.model(tensor_input).item()
+            prediction = model(tensor_input).item()
 
             # Symbolic reasoning example
             symbolic_reasoning = self.perform_symbolic_reasoning(input_data)
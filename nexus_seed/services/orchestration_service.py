@@ -1,69 +1,74 @@
 import asyncio
-import yaml
-import os
-from typing import Dict, Any
-from nexus_seed.utils.event_bus import InternalEventBus
+from typing import Dict, Any, Optional
+from nexus_seed.utils.event_bus import EventBus
 from nexus_seed.services.persistence import PersistenceOverseer
+from nexus_seed.utils.workflow_engine import WorkflowEngine, evaluate_rules
+from nexus_seed.utils.workflow_registry import WorkflowRegistry
 
 class OrchestratorService:
-    def __init__(self, event_bus: InternalEventBus, persistence: PersistenceOverseer, workflows_dir: str):
+    def __init__(
+        self,
+        event_bus: EventBus,
+        persistence: PersistenceOverseer,
+        workflows_dir: str,
+        workflow_poll_interval_sec: float = 2.0,
+    ):
         """
         Initialize the OrchestratorService with dependencies.
         """
         self.event_bus = event_bus
         self.persistence = persistence
         self.workflows_dir = workflows_dir
+        self.workflows = WorkflowRegistry(
+            workflows_dir,
+            resolve_service=lambda name: getattr(self, name, None),
+            poll_interval_sec=workflow_poll_interval_sec,
+        )
+        self.engine = WorkflowEngine(
+            event_bus,
+            decide=self.make_decision,
+            resolve_service=lambda name: getattr(self, name, None),
+            persistence=persistence,
+        )
         self.active_workflows = {}
+        self._resumed_tasks = []
         self.running = False
+        self._watch_task: Optional[asyncio.Task] = None
+        self._claim_task: Optional[asyncio.Task] = None
 
     async def load_workflows(self) -> Dict[str, Any]:
         """
-        Load declarative workflow definitions from the workflows directory.
+        Workflow definitions by name, from the compiled registry.
         """
-        workflows = {}
-        for filename in os.listdir(self.workflows_dir):
-            if filename.endswith(".yaml") or filename.endswith(".json"):
-                filepath = os.path.join(self.workflows_dir, filename)
-                with open(filepath, "r") as file:
-                    workflows[filename] = yaml.safe_load(file)
-        return workflows
+        return self.workflows.definitions()
 
     async def trigger_workflow(self, workflow_name: str, trigger_event: Dict[str, Any]) -> None:
         """
         Trigger a workflow based on its definition.
         """
         try:
-            workflows = await self.load_workflows()
-            workflow = workflows.get(workflow_name)
+            workflow = self.workflows.get(workflow_name)
             if not workflow:
                 raise ValueError(f"Workflow '{workflow_name}' not found.")
 
             print(f"Triggering workflow: {workflow_name}")
-            self.active_workflows[workflow_name] = {"state": "running", "steps": []}
-
-            for step in workflow.get("steps", []):
-                step_type = step.get("type")
-                step_params = step.get("params", {})
-                if step_type == "event":
-                    await self.event_bus.publish(step_params["event_type"], step_params["data"])
-                elif step_type == "service_call":
-                    service_name = step_params["service_name"]
-                    method_name = step_params["method_name"]
-                    service = getattr(self, service_name, None)
-                    if service:
-                        method = getattr(service, method_name, None)
-                        if method:
-                            await method(**step_params.get("args", {}))
-                elif step_type == "decision":
-                    decision_result = await self.make_decision(step_params)
-                    print(f"Decision result: {decision_result}")
-                self.active_workflows[workflow_name]["steps"].append(step)
-
-            self.active_workflows[workflow_name]["state"] = "completed"
-            print(f"Workflow '{workflow_name}' completed.")
+            await self._run_workflow(workflow, trigger_event)
         except Exception as e:
             print(f"Error triggering workflow '{workflow_name}': {e}")
-            self.active_workflows[workflow_name]["state"] = "failed"
+
+    async def _run_workflow(self, workflow, trigger_event: Optional[Dict[str, Any]] = None, resume: Optional[Dict[str, Any]] = None) -> None:
+        self.active_workflows[workflow.name] = {"state": "running", "steps": []}
+
+        async def record(step, result):
+            self.active_workflows[workflow.name]["steps"].append(workflow.definition["steps"][step.index])
+
+        try:
+            await self.engine.run(workflow, trigger_event, on_step_done=record, resume=resume)
+        except Exception:
+            self.active_workflows[workflow.name]["state"] = "failed"
+            raise
+        self.active_workflows[workflow.name]["state"] = "completed"
+        print(f"Workflow '{workflow.name}' completed.")
 
     async def make_decision(self, params: Dict[str, Any]) -> Any:
         """
@@ -77,11 +82,10 @@ class OrchestratorService:
                 decision = await self.event_bus.publish("ai_decision_request", input_data)
                 return decision
             elif decision_type == "rule_based":
-                # Example: Use predefined rules
-                rules = params.get("rules", [])
-                for rule in rules:
-                    if rule["condition"](params):
-                        return rule["action"]
+                # Rules compare fields of the step params, e.g. results passed in by reference
+                action = evaluate_rules(params.get("rules", []), params)
+                if action is not None:
+                    return action
             return "No decision made."
         except Exception as e:
             print(f"Error making decision: {e}")
@@ -89,22 +93,52 @@ class OrchestratorService:
 
     async def snapshot_workflow_states(self) -> None:
         """
-        Persist active workflow states.
+        Make sure every workflow checkpoint taken so far is committed.
         """
-        await self.persistence.save_global_snapshot(self.active_workflows)
+        await self.persistence.flush()
+
+    async def _resume_run(self, run: Dict[str, Any]) -> None:
+        try:
+            workflow = self.workflows.get(run["workflow"])
+            if not workflow:
+                raise ValueError(f"Workflow '{run['workflow']}' not found.")
+            await self._run_workflow(workflow, resume=run)
+        except Exception as e:
+            print(f"Error resuming workflow run {run['run_id']}: {e}")
+            if run.get("status") == "running":
+                try:
+                    await self.persistence.save_workflow_run(run["run_id"], {**run, "status": "failed", "error": str(e)})
+                except Exception as e:
+                    print(f"Failed to checkpoint workflow run {run['run_id']}: {e}")
 
     async def restore_workflow_states(self) -> None:
         """
-        Restore active workflow states from the latest snapshot.
+        Claim and resume the workflow runs no live node holds, e.g. those in
+        flight when this process, or another node, last stopped.
+        """
+        try:
+            runs = await self.persistence.claim_workflow_runs()
+        except Exception as e:
+            print(f"Error claiming workflow checkpoints: {e}")
+            return
+        self._resumed_tasks = [task for task in self._resumed_tasks if not task.done()]
+        for run in runs:
+            self._resumed_tasks.append(asyncio.create_task(self._resume_run(run)))
+
+    async def watch_workflow_runs(self) -> None:
+        """
+        Resume abandoned runs now, then whenever another node's leases run out.
         """
-        self.active_workflows = await self.persistence.load_global_snapshot() or {}
+        while True:
+            await self.restore_workflow_states()
+            await asyncio.sleep(self.persistence.run_lease_sec / 2)
 
     async def optimize_workflows(self):
         """
         Automatically optimize workflows for efficiency.
         """
         try:
-            workflows = await self.load_workflows()
+            workflows = self.workflows.definitions()
             for workflow_name, workflow in workflows.items():
                 # Example: Reorder steps based on priority
                 workflow["steps"] = sorted(workflow["steps"], key=lambda step: step.get("priority", 0), reverse=True)
@@ -116,9 +150,17 @@ class OrchestratorService:
     async def start(self):
         print("OrchestrationService started.")
         self.running = True
-        await self.restore_workflow_states()
+        self._claim_task = asyncio.create_task(self.watch_workflow_runs())
+        self._watch_task = asyncio.create_task(self.workflows.watch())
 
     async def stop(self):
         print("OrchestrationService stopped.")
         self.running = False
+        if self._watch_task:
+            self._watch_task.cancel()
+        if self._claim_task:
+            self._claim_task.cancel()
+        # Interrupted runs keep their checkpoints and resume on the next start
+        for task in self._resumed_tasks:
+            task.cancel()
         await self.snapshot_workflow_states()
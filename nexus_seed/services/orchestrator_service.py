@@ -1,19 +1,68 @@
 import asyncio
 import os
+import time
 import yaml
-from typing import Dict, Any
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+from nexus_seed.utils.event_scheduler import EventScheduler
+from nexus_seed.utils.workflow_engine import WorkflowEngine, evaluate_rules
+from nexus_seed.utils.workflow_registry import WorkflowRegistry
 
 class OrchestratorService:
-    def __init__(self, event_bus, persistence, workflows_dir):
+    def __init__(
+        self,
+        event_bus,
+        persistence,
+        workflows_dir,
+        goal_manager=None,
+        workflow_poll_interval_sec: float = 2.0,
+        workers: int = 4,
+        queue_maxsize: int = 1000,
+        throughput_window_sec: float = 10.0,
+        aging_sec: float = 1.0,
+        resolve_service: Optional[Callable[[str], Any]] = None,
+    ):
         """
         Initialize the OrchestratorService with dependencies.
+
+        Workflow service calls reach other services through `resolve_service`
+        (service name -> service), e.g. the kernel's service lookup.
+
+        Events are handled by `workers` concurrent consumers. The event queue
+        holds at most `queue_maxsize` events; publishers wait while it is full.
+        It is an EventScheduler: `core_*` control events are dispatched ahead
+        of `workflow_*` bulk traffic, with deadlines and aging (see there).
         """
         self.event_bus = event_bus
         self.persistence = persistence
         self.workflows_dir = workflows_dir
+        self.goal_manager = goal_manager
+        self.resolve_service = resolve_service or (lambda name: getattr(self, name, None))
+        self.workflows = WorkflowRegistry(
+            workflows_dir,
+            resolve_service=self.resolve_service,
+            poll_interval_sec=workflow_poll_interval_sec,
+        )
+        # Runs are checkpointed in persistence and resumed on restart
+        self.engine = WorkflowEngine(
+            event_bus, decide=self.make_decision, resolve_service=self.resolve_service, persistence=persistence
+        )
         self.active_workflows = {}
-        self.event_queue = asyncio.Queue()
+        self.event_queue = EventScheduler(maxsize=queue_maxsize, aging_sec=aging_sec)
+        self.workers = max(1, workers)
         self.running = False
+        self._watch_task: Optional[asyncio.Task] = None
+        self._worker_tasks: List[asyncio.Task] = []
+        self._resumed_tasks: List[asyncio.Task] = []
+        self._claim_task: Optional[asyncio.Task] = None
+
+        self.throughput_window_sec = throughput_window_sec
+        # Completion times of recently handled events, for the throughput metric
+        self._completed = deque()
+        self.events_processed = 0
+        self.events_failed = 0
+        self.busy_workers = 0
+        self.max_queue_depth = 0
 
     async def publish_event(self, event: Dict[str, Any]) -> None:
         """
@@ -27,11 +76,17 @@ class OrchestratorService:
                 event["params"] = {}  # Ensure params exist as an empty dictionary
 
             await self.event_queue.put(event)
-            print(f"Event published: {event}")
+            self.max_queue_depth = max(self.max_queue_depth, self.event_queue.qsize())
         except Exception as e:
             print(f"Error while publishing event: {e}")
             raise
 
+    async def load_workflows(self) -> Dict[str, Any]:
+        """
+        Workflow definitions by name, from the compiled registry.
+        """
+        return self.workflows.definitions()
+
     async def validate_workflow(self, workflow: Dict[str, Any]) -> bool:
         """
         Validate the structure of a workflow definition.
@@ -42,33 +97,86 @@ class OrchestratorService:
             return False
         return True
 
-    async def process_events(self) -> None:
+    async def make_decision(self, params: Dict[str, Any]) -> Any:
+        """
+        Decide a workflow's decision step. Only "rule_based" decisions are
+        supported: the action of the first matching rule (see evaluate_rules).
         """
-        Process events from the event queue with dynamic routing.
+        if params.get("type") != "rule_based":
+            print(f"Unsupported decision type: {params.get('type')}")
+            return None
+        action = evaluate_rules(params.get("rules", []), params)
+        return action if action is not None else "No decision made."
+
+    async def handle_event(self, event: Dict[str, Any]) -> None:
         """
+        Route one event by its type.
+        """
+        event_type = event.get("type")
+        params = event.get("params", {})
+        if not event_type:
+            raise ValueError("Event type is missing.")
+
+        # Dynamic routing based on event type
+        if event_type.startswith("core_"):
+            await self.event_bus.publish(event_type, params)
+        elif event_type.startswith("workflow_"):
+            await self.trigger_workflow(event_type.replace("workflow_", ""), params)
+        else:
+            print(f"Unhandled event type: {event_type}")
+
+    async def _consume_events(self) -> None:
         while self.running:
+            # Idle workers wait here until an event arrives
+            event = await self.event_queue.get()
+            self.busy_workers += 1
             try:
-                event = await self.event_queue.get()
-                print(f"Processing event: {event}")
-
-                # Validate event structure
-                event_type = event.get("type")
-                params = event.get("params", {})
-                if not event_type:
-                    raise ValueError("Event type is missing.")
-
-                # Dynamic routing based on event type
-                if event_type.startswith("core_"):
-                    await self.event_bus.publish(event_type, params)
-                elif event_type.startswith("workflow_"):
-                    await self.trigger_workflow(event_type.replace("workflow_", ""), params)
-                else:
-                    print(f"Unhandled event type: {event_type}")
-
-                self.event_queue.task_done()
+                await self.handle_event(event)
+                self.events_processed += 1
             except Exception as e:
+                self.events_failed += 1
                 print(f"Error while processing event: {e}")
-            await asyncio.sleep(1)
+            finally:
+                self.busy_workers -= 1
+                now = time.monotonic()
+                self._completed.append(now)
+                self._trim_completed(now)
+                self.event_queue.task_done()
+
+    def _trim_completed(self, now: float) -> None:
+        cutoff = now - self.throughput_window_sec
+        while self._completed and self._completed[0] < cutoff:
+            self._completed.popleft()
+
+    async def process_events(self) -> None:
+        """
+        Process events from the event queue with a pool of concurrent workers.
+        """
+        self._worker_tasks = [asyncio.create_task(self._consume_events()) for _ in range(self.workers)]
+        try:
+            await asyncio.gather(*self._worker_tasks)
+        finally:
+            for task in self._worker_tasks:
+                task.cancel()
+            await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+            self._worker_tasks = []
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Event pool metrics, for sizing `workers` and `queue_maxsize`.
+        """
+        self._trim_completed(time.monotonic())
+        return {
+            "workers": self.workers,
+            "busy_workers": self.busy_workers,
+            "queue_depth": self.event_queue.qsize(),
+            "queue_capacity": self.event_queue.maxsize,
+            "max_queue_depth": self.max_queue_depth,
+            "events_processed": self.events_processed,
+            "events_failed": self.events_failed,
+            "throughput_per_sec": len(self._completed) / self.throughput_window_sec,
+            "scheduler": self.event_queue.get_stats(),
+        }
 
     async def save_workflow(self, workflow_name: str, workflow: Dict[str, Any]) -> None:
         """
@@ -78,6 +186,7 @@ class OrchestratorService:
             filepath = os.path.join(self.workflows_dir, f"{workflow_name}.yaml")
             with open(filepath, "w") as file:
                 yaml.safe_dump(workflow, file)
+            self.workflows.refresh()
             print(f"Workflow '{workflow_name}' saved successfully.")
         except Exception as e:
             print(f"Error saving workflow '{workflow_name}': {e}")
@@ -87,8 +196,7 @@ class OrchestratorService:
         Evolve a workflow by applying mutations and evaluating fitness.
         """
         try:
-            workflows = await self.load_workflows()
-            workflow = workflows.get(workflow_name)
+            workflow = self.workflows.definitions().get(workflow_name)
             if not workflow:
                 raise ValueError(f"Workflow '{workflow_name}' not found.")
 
@@ -111,21 +219,68 @@ class OrchestratorService:
         Trigger a workflow and validate its alignment with principles.
         """
         try:
-            workflows = await self.load_workflows()
-            workflow = workflows.get(workflow_name)
+            workflow = self.workflows.get(workflow_name)
             if not workflow:
                 raise ValueError(f"Workflow '{workflow_name}' not found.")
 
             # Validate workflow alignment with principles
-            if not self.goal_manager.validate_principles({"name": workflow_name, "alignment": workflow.get("alignment", [])}):
+            if self.goal_manager and not self.goal_manager.validate_principles({"name": workflow_name, "alignment": workflow.alignment}):
                 print(f"Workflow '{workflow_name}' violates principles. Aborting.")
                 return
 
             print(f"Triggering workflow: {workflow_name}")
-            # ...existing code...
+            await self._run_workflow(workflow, trigger_event)
         except Exception as e:
             print(f"Error triggering workflow '{workflow_name}': {e}")
 
+    async def _run_workflow(self, workflow, trigger_event: Optional[Dict[str, Any]] = None, resume: Optional[Dict[str, Any]] = None) -> None:
+        self.active_workflows[workflow.name] = {"state": "running", "results": {}}
+        try:
+            results = await self.engine.run(workflow, trigger_event, resume=resume)
+        except Exception:
+            self.active_workflows[workflow.name]["state"] = "failed"
+            raise
+        self.active_workflows[workflow.name] = {"state": "completed", "results": results}
+        print(f"Workflow '{workflow.name}' completed.")
+
+    async def _resume_run(self, run: Dict[str, Any]) -> None:
+        try:
+            workflow = self.workflows.get(run["workflow"])
+            if not workflow:
+                raise ValueError(f"Workflow '{run['workflow']}' not found.")
+            await self._run_workflow(workflow, resume=run)
+        except Exception as e:
+            print(f"Error resuming workflow run {run['run_id']}: {e}")
+            if run.get("status") == "running":
+                try:
+                    await self.persistence.save_workflow_run(run["run_id"], {**run, "status": "failed", "error": str(e)})
+                except Exception as e:
+                    print(f"Failed to checkpoint workflow run {run['run_id']}: {e}")
+
+    async def resume_workflows(self) -> None:
+        """
+        Claim and resume the workflow runs no live orchestrator holds, e.g.
+        those in flight when this process, or another node, last stopped.
+        """
+        if self.persistence is None:
+            return
+        try:
+            runs = await self.persistence.claim_workflow_runs()
+        except Exception as e:
+            print(f"Error claiming workflow checkpoints: {e}")
+            return
+        self._resumed_tasks = [task for task in self._resumed_tasks if not task.done()]
+        for run in runs:
+            self._resumed_tasks.append(asyncio.create_task(self._resume_run(run)))
+
+    async def watch_workflow_runs(self) -> None:
+        """
+        Resume abandoned runs now, then whenever another node's leases run out.
+        """
+        while True:
+            await self.resume_workflows()
+            await asyncio.sleep(self.persistence.run_lease_sec / 2)
+
     async def create_workflow(self, workflow_name: str, workflow_definition: Dict[str, Any]) -> None:
         """
         Dynamically create a new workflow.
@@ -134,6 +289,7 @@ class OrchestratorService:
             filepath = os.path.join(self.workflows_dir, f"{workflow_name}.yaml")
             with open(filepath, "w") as file:
                 yaml.safe_dump(workflow_definition, file)
+            self.workflows.refresh()
             print(f"Workflow '{workflow_name}' created successfully.")
         except Exception as e:
             print(f"Error creating workflow '{workflow_name}': {e}")
@@ -151,8 +307,21 @@ class OrchestratorService:
     async def start(self):
         print("OrchestratorService started.")
         self.running = True
+        self._watch_task = asyncio.create_task(self.workflows.watch())
+        if self.persistence is not None:
+            self._claim_task = asyncio.create_task(self.watch_workflow_runs())
         try:
             await self.process_events()
         except asyncio.CancelledError:
             print("OrchestratorService stopped.")
             self.running = False
+        finally:
+            self._watch_task.cancel()
+            if self._claim_task is not None:
+                self._claim_task.cancel()
+
+    async def stop(self):
+        self.running = False
+        # Interrupted runs keep their checkpoints and resume on the next start
+        for task in self._worker_tasks + self._resumed_tasks + ([self._claim_task] if self._claim_task else []):
+            task.cancel()
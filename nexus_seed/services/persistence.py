@@ -1,51 +1,431 @@
-import asyncpg
-from typing import Dict, Any
+import asyncio
+import copy
+import json
+import time
+import uuid
+from typing import Dict, Any, List, Optional, Set, Tuple
+from nexus_seed.services.persistence_backends import PersistenceBackend, create_backend
+
+# Backends reject change notices much above this size (Postgres: 8000 bytes)
+MAX_NOTICE_BYTES = 7900
+
+_MISSING = object()
+
 
 class PersistenceOverseer:
-    def __init__(self, db_url: str):
+    """
+    Stores service states and global snapshots through a PersistenceBackend,
+    chosen from the `db_url` scheme (postgresql:// or sqlite:///) unless given.
+
+    Writes are group-committed: `save_service_state` and `save_global_snapshot`
+    queue the write and wait until a background writer has committed it, together
+    with everything else queued meanwhile, in one transaction using `executemany`.
+    Several saves of the same service in one group collapse into a single upsert
+    of the latest state; workflow-run checkpoints are batched and collapsed the
+    same way, per run. Runs are leased to this node (`node_id`) while it writes
+    their checkpoints; the leases are renewed every third of `run_lease_sec`
+    and released on close, and `claim_workflow_runs` takes over runs whose
+    owner stopped renewing, so no two nodes execute the same run.
+
+    Reads go through an in-process cache. Each committed group carries a change
+    notice (NOTIFY on Postgres, a notices table on SQLite), and every node
+    listens for them and drops the entries another node has changed. While the
+    listener is down the cache is bypassed. Once `start_retention()` is called,
+    snapshots older than `snapshot_max_age_sec`, or beyond the newest
+    `snapshot_keep_last`, are pruned every `retention_interval_sec`; the newest
+    snapshot is always kept, however old.
+    """
+    def __init__(
+        self,
+        db_url: str,
+        batch_max_size: int = 256,
+        batch_max_delay_sec: float = 0.005,
+        cache_enabled: bool = True,
+        snapshot_keep_last: Optional[int] = 100,
+        snapshot_max_age_sec: Optional[float] = 7 * 24 * 3600,
+        retention_interval_sec: float = 300.0,
+        run_lease_sec: float = 60.0,
+        backend: Optional[PersistenceBackend] = None,
+    ):
         self.db_url = db_url
-        self.pool = None
+        self.backend = backend or create_backend(db_url)
+        self.node_id = uuid.uuid4().hex
+        self.cache_enabled = cache_enabled
+        self.snapshot_keep_last = snapshot_keep_last
+        self.snapshot_max_age_sec = snapshot_max_age_sec
+        self.retention_interval_sec = retention_interval_sec
+        self.run_lease_sec = run_lease_sec
+        self._state_cache: Dict[str, Dict[str, Any]] = {}
+        self._snapshot_cache: Any = _MISSING
+        # Bumped on every invalidation so a read racing with one does not cache stale data
+        self._cache_generation = 0
+        self._cache_ready = False
+        self._listener_task: Optional[asyncio.Task] = None
+        self._retention_task: Optional[asyncio.Task] = None
+        self._lease_task: Optional[asyncio.Task] = None
+        self.batch_max_size = batch_max_size
+        self.batch_max_delay_sec = batch_max_delay_sec
+        # Latest pending state per service, and everyone waiting for it
+        self._pending_states: Dict[str, Tuple[Dict[str, Any], List[asyncio.Future]]] = {}
+        self._pending_snapshots: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+        # Latest pending checkpoint per workflow run (None deletes the run)
+        self._pending_runs: Dict[str, Tuple[Optional[Dict[str, Any]], List[asyncio.Future]]] = {}
+        self._in_flight: List[asyncio.Future] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._batch_full: Optional[asyncio.Event] = None
+        self._writer_task: Optional[asyncio.Task] = None
+
+        self.writes = 0
+        self.coalesced = 0
+        self.batches = 0
+        self.failed_batches = 0
+        self.last_batch_sec = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.invalidations = 0
+        self.pruned_snapshots = 0
 
     async def initialize(self):
         """
-        Initialize the connection pool.
+        Connect to the database and apply pending schema migrations.
+        """
+        await self.backend.connect()
+        self._wakeup = asyncio.Event()
+        self._batch_full = asyncio.Event()
+        self._writer_task = asyncio.create_task(self._write_batches())
+        print(f"Persistence backend {self.backend.__class__.__name__} initialized.")
+        await self.migrate()
+        if self.cache_enabled:
+            self._listener_task = asyncio.create_task(self._listen())
+        self._lease_task = asyncio.create_task(self._renew_run_leases())
+
+    def start_retention(self) -> None:
+        """
+        Start pruning old snapshots in the background. Call it once restore has
+        read what it needs, so a node that was down for a long time does not
+        prune the snapshots it is about to restore from.
+        """
+        if self._retention_task is None and (self.snapshot_keep_last is not None or self.snapshot_max_age_sec is not None):
+            self._retention_task = asyncio.create_task(self._run_retention())
+
+    async def migrate(self) -> None:
+        """
+        Apply pending schema migrations. Safe to run from several nodes at once.
+        """
+        for version in await self.backend.migrate():
+            print(f"Applied persistence schema migration {version}.")
+
+    async def _listen(self, retry_sec: float = 1.0) -> None:
+        """
+        Keep listening for change notices; reconnect if the listener drops.
         """
-        self.pool = await asyncpg.create_pool(self.db_url, min_size=1, max_size=10)
-        print("Database connection pool initialized.")
+        while True:
+            try:
+                await self.backend.listen(self._on_notice, self._on_listening)
+                print("Persistence invalidation listener disconnected; bypassing the cache.")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Persistence invalidation listener failed: {e}")
+            finally:
+                self._cache_ready = False
+                self._invalidate_all()
+            await asyncio.sleep(retry_sec)
+
+    def _on_listening(self) -> None:
+        # Anything may have changed while nobody was listening
+        self._invalidate_all()
+        self._cache_ready = True
+
+    def _on_notice(self, notice: str) -> None:
+        try:
+            message = json.loads(notice)
+        except ValueError:
+            self._invalidate_all()
+            return
+        if message.get("origin") == self.node_id:
+            return
+        if message.get("all"):
+            self._invalidate_all()
+            return
+        self._cache_generation += 1
+        self.invalidations += 1
+        for service_name in message.get("services", []):
+            self._state_cache.pop(service_name, None)
+        if message.get("snapshot"):
+            self._snapshot_cache = _MISSING
+
+    def _invalidate_all(self) -> None:
+        self._cache_generation += 1
+        self.invalidations += 1
+        self._state_cache.clear()
+        self._snapshot_cache = _MISSING
+
+    def _pending_count(self) -> int:
+        return len(self._pending_states) + len(self._pending_snapshots) + len(self._pending_runs)
+
+    def _enqueue(self) -> None:
+        if self._writer_task is None:
+            raise RuntimeError("PersistenceOverseer is not initialized.")
+        self._wakeup.set()
+        if self._pending_count() >= self.batch_max_size:
+            self._batch_full.set()
+
+    def _coalesce(self, pending: Dict[str, Tuple[Any, List[asyncio.Future]]], key: str, value: Any) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        entry = pending.get(key)
+        if entry is None:
+            pending[key] = (value, [future])
+        else:
+            entry[1].append(future)
+            pending[key] = (value, entry[1])
+            self.coalesced += 1
+        self._enqueue()
+        return future
 
     async def save_service_state(self, service_name: str, state: Dict[str, Any]) -> None:
         """
-        Save the state of a specific service.
+        Save the state of a specific service. Returns once it is committed.
+        """
+        await self._coalesce(self._pending_states, service_name, state)
+
+    async def save_workflow_run(self, run_id: str, run: Dict[str, Any]) -> None:
+        """
+        Checkpoint a workflow run (a dict with at least a "status"). Returns once it is committed.
+        """
+        await self._coalesce(self._pending_runs, run_id, run)
+
+    async def delete_workflow_run(self, run_id: str) -> None:
+        await self._coalesce(self._pending_runs, run_id, None)
+
+    async def load_workflow_runs(self, status: str = "running") -> List[Dict[str, Any]]:
+        """
+        Checkpointed workflow runs with the given status, whoever owns them.
         """
-        async with self.pool.acquire() as conn:
-            await conn.execute(
-                "INSERT INTO service_states (service_name, state) VALUES ($1, $2) "
-                "ON CONFLICT (service_name) DO UPDATE SET state = $2",
-                service_name, state
-            )
+        await self.flush()
+        return await self.backend.fetch_workflow_runs(status)
+
+    async def claim_workflow_runs(self) -> List[Dict[str, Any]]:
+        """
+        Take over the running workflow runs no live node holds, e.g. those to
+        resume after a restart. Each run is returned to one claimant only.
+        """
+        await self.flush()
+        return await self.backend.claim_workflow_runs(self.node_id, self.run_lease_sec)
+
+    async def _renew_run_leases(self) -> None:
+        while True:
+            await asyncio.sleep(self.run_lease_sec / 3)
+            try:
+                await self.backend.extend_workflow_leases(self.node_id, self.run_lease_sec)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error renewing workflow run leases: {e}")
 
     async def load_service_state(self, service_name: str) -> Dict[str, Any]:
         """
         Load the state of a specific service.
         """
-        async with self.pool.acquire() as conn:
-            row = await conn.fetchrow("SELECT state FROM service_states WHERE service_name = $1", service_name)
-            return row["state"] if row else {}
+        if self._cache_ready and service_name in self._state_cache:
+            self.cache_hits += 1
+            return copy.deepcopy(self._state_cache[service_name])
+        self.cache_misses += 1
+        generation = self._cache_generation
+        state = await self.backend.fetch_service_state(service_name)
+        if state is None:
+            state = {}
+        if self._cache_ready and generation == self._cache_generation:
+            self._state_cache[service_name] = copy.deepcopy(state)
+        return state
 
     async def save_global_snapshot(self, snapshot: Dict[str, Any]) -> None:
         """
-        Save a global snapshot of the system state.
+        Save a global snapshot of the system state. Returns once it is committed.
         """
-        async with self.pool.acquire() as conn:
-            await conn.execute(
-                "INSERT INTO global_snapshots (snapshot) VALUES ($1)",
-                snapshot
-            )
+        future = asyncio.get_running_loop().create_future()
+        self._pending_snapshots.append((snapshot, future))
+        self._enqueue()
+        await future
 
     async def load_global_snapshot(self) -> Dict[str, Any]:
         """
         Load the latest global snapshot.
         """
-        async with self.pool.acquire() as conn:
-            row = await conn.fetchrow("SELECT snapshot FROM global_snapshots ORDER BY created_at DESC LIMIT 1")
-            return row["snapshot"] if row else {}
+        if self._cache_ready and self._snapshot_cache is not _MISSING:
+            self.cache_hits += 1
+            return copy.deepcopy(self._snapshot_cache)
+        self.cache_misses += 1
+        generation = self._cache_generation
+        snapshot = await self.backend.fetch_latest_snapshot()
+        if snapshot is None:
+            snapshot = {}
+        if self._cache_ready and generation == self._cache_generation:
+            self._snapshot_cache = copy.deepcopy(snapshot)
+        return snapshot
+
+    async def load_global_snapshot_by_id(self, snapshot_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Load a specific global snapshot by its "snapshot_id" field.
+        """
+        return await self.backend.fetch_snapshot(snapshot_id)
+
+    async def load_global_snapshots(self) -> List[Dict[str, Any]]:
+        """
+        Load every retained global snapshot, oldest first.
+        """
+        return await self.backend.fetch_snapshots()
+
+    async def save_snapshot_chunks(self, chunks: Dict[str, str]) -> None:
+        """
+        Store content-addressed snapshot chunks (hash -> serialized data).
+        """
+        if chunks:
+            await self.backend.put_chunks(chunks)
+
+    async def load_snapshot_chunks(self, hashes: List[str]) -> Dict[str, str]:
+        return await self.backend.get_chunks(hashes) if hashes else {}
+
+    async def delete_snapshot_chunks_except(self, live: Set[str], grace_sec: float = 0.0) -> int:
+        """
+        Delete snapshot chunks no longer referenced by any snapshot in `live`,
+        sparing those stored within the last `grace_sec` seconds.
+        """
+        return await self.backend.delete_chunks_except(live, grace_sec)
+
+    async def _write_batches(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            # Give concurrent savers a moment to join the group
+            if self._pending_count() < self.batch_max_size:
+                try:
+                    await asyncio.wait_for(self._batch_full.wait(), self.batch_max_delay_sec)
+                except asyncio.TimeoutError:
+                    pass
+            self._wakeup.clear()
+            self._batch_full.clear()
+            states, self._pending_states = self._pending_states, {}
+            snapshots, self._pending_snapshots = self._pending_snapshots, []
+            runs, self._pending_runs = self._pending_runs, {}
+            if not states and not snapshots and not runs:
+                continue
+            futures = [future for _, waiters in states.values() for future in waiters]
+            futures += [future for _, future in snapshots]
+            futures += [future for _, waiters in runs.values() for future in waiters]
+            self._in_flight = futures
+            started = time.monotonic()
+            generation = self._cache_generation
+            try:
+                state_rows = [(name, state) for name, (state, _) in states.items()]
+                await self.backend.write_batch(
+                    state_rows,
+                    [snapshot for snapshot, _ in snapshots],
+                    self._notice(state_rows, bool(snapshots)),
+                    [(run_id, run) for run_id, (run, _) in runs.items()],
+                    owner=self.node_id,
+                    lease_sec=self.run_lease_sec,
+                )
+            except asyncio.CancelledError:
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(RuntimeError("Persistence writer stopped before the write was committed."))
+                raise
+            except Exception as e:
+                self._in_flight = []
+                self.failed_batches += 1
+                print(f"Failed to write a batch of {len(futures)} persistence writes: {e}")
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self._in_flight = []
+            # Our own writes are current unless another node's write landed meanwhile:
+            # then write them through to the cache, otherwise leave them to be re-read
+            if self._cache_ready and generation == self._cache_generation:
+                for name, (state, _) in states.items():
+                    self._state_cache[name] = copy.deepcopy(state)
+                if snapshots:
+                    self._snapshot_cache = copy.deepcopy(snapshots[-1][0])
+            else:
+                for name in states:
+                    self._state_cache.pop(name, None)
+                if snapshots:
+                    self._snapshot_cache = _MISSING
+            self.batches += 1
+            self.writes += len(states) + len(snapshots) + len(runs)
+            self.last_batch_sec = time.monotonic() - started
+            for future in futures:
+                if not future.done():
+                    future.set_result(None)
+
+    def _notice(self, states: List[Tuple[str, Dict[str, Any]]], snapshot: bool) -> str:
+        notice = json.dumps({"origin": self.node_id, "services": [name for name, _ in states], "snapshot": snapshot})
+        if len(notice.encode()) > MAX_NOTICE_BYTES:
+            notice = json.dumps({"origin": self.node_id, "all": True})
+        return notice
+
+    async def prune_snapshots(self) -> int:
+        """
+        Delete global snapshots outside the retention policy, always keeping the
+        newest. Returns how many were removed.
+        """
+        removed = await self.backend.prune_snapshots(self.snapshot_keep_last, self.snapshot_max_age_sec)
+        self.pruned_snapshots += removed
+        return removed
+
+    async def _run_retention(self) -> None:
+        while True:
+            try:
+                removed = await self.prune_snapshots()
+                if removed:
+                    print(f"Pruned {removed} old global snapshots.")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error pruning global snapshots: {e}")
+            await asyncio.sleep(self.retention_interval_sec)
+
+    async def flush(self) -> None:
+        """
+        Wait until every write queued so far has been committed.
+        """
+        waiters = list(self._in_flight)
+        waiters += [future for _, futures in self._pending_states.values() for future in futures]
+        waiters += [future for _, future in self._pending_snapshots]
+        waiters += [future for _, futures in self._pending_runs.values() for future in futures]
+        if waiters:
+            await asyncio.gather(*waiters, return_exceptions=True)
+
+    async def close(self) -> None:
+        await self.flush()
+        connected = self._writer_task is not None
+        for task in (self._writer_task, self._listener_task, self._retention_task, self._lease_task):
+            if task is not None:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+        self._writer_task = self._listener_task = self._retention_task = self._lease_task = None
+        self._cache_ready = False
+        if connected:
+            try:
+                # Interrupted runs can be claimed right away instead of once their leases expire
+                await self.backend.extend_workflow_leases(self.node_id, 0)
+            except Exception as e:
+                print(f"Error releasing workflow run leases: {e}")
+        await self.backend.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "pending": self._pending_count(),
+            "writes": self.writes,
+            "coalesced": self.coalesced,
+            "batches": self.batches,
+            "failed_batches": self.failed_batches,
+            "avg_batch_size": self.writes / self.batches if self.batches else 0.0,
+            "last_batch_sec": self.last_batch_sec,
+            "cache_ready": self._cache_ready,
+            "cached_states": len(self._state_cache),
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "invalidations": self.invalidations,
+            "pruned_snapshots": self.pruned_snapshots,
+        }
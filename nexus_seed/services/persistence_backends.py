@@ -0,0 +1,703 @@
+import asyncio
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+# Ordered schema migrations: (version, statements). Applied once each, tracked in schema_migrations
+POSTGRES_MIGRATIONS: List[Tuple[int, List[str]]] = [
+    (1, [
+        "CREATE TABLE IF NOT EXISTS service_states ("
+        " service_name TEXT PRIMARY KEY, state JSONB NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS global_snapshots ("
+        " id BIGSERIAL PRIMARY KEY, snapshot JSONB NOT NULL, created_at TIMESTAMPTZ NOT NULL DEFAULT now())",
+    ]),
+    # Serves the "latest snapshot" lookup and retention pruning without a table scan
+    (2, ["CREATE INDEX IF NOT EXISTS global_snapshots_created_at ON global_snapshots (created_at DESC, id DESC)"]),
+    # Content-addressed chunks of delta snapshots, and lookup of a snapshot by its id
+    (3, [
+        "CREATE TABLE IF NOT EXISTS snapshot_chunks (hash TEXT PRIMARY KEY, data TEXT NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS global_snapshots_snapshot_id ON global_snapshots ((snapshot->>'snapshot_id'))",
+    ]),
+    # Checkpoints of in-flight workflow runs
+    (4, [
+        "CREATE TABLE IF NOT EXISTS workflow_runs ("
+        " run_id TEXT PRIMARY KEY, status TEXT NOT NULL, run JSONB NOT NULL, updated_at TIMESTAMPTZ NOT NULL DEFAULT now())",
+    ]),
+    # The node executing each run, and until when its claim holds
+    (5, [
+        "ALTER TABLE workflow_runs ADD COLUMN IF NOT EXISTS owner TEXT",
+        "ALTER TABLE workflow_runs ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMPTZ",
+    ]),
+    # When each chunk was last written, so compaction can spare chunks of snapshots still being saved
+    (6, ["ALTER TABLE snapshot_chunks ADD COLUMN IF NOT EXISTS stored_at TIMESTAMPTZ NOT NULL DEFAULT now()"]),
+]
+
+SQLITE_MIGRATIONS: List[Tuple[int, List[str]]] = [
+    (1, [
+        "CREATE TABLE IF NOT EXISTS service_states (service_name TEXT PRIMARY KEY, state TEXT NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS global_snapshots ("
+        " id INTEGER PRIMARY KEY AUTOINCREMENT, snapshot TEXT NOT NULL, created_at REAL NOT NULL)",
+    ]),
+    (2, ["CREATE INDEX IF NOT EXISTS global_snapshots_created_at ON global_snapshots (created_at DESC, id DESC)"]),
+    # SQLite has no NOTIFY: committed change notices are read back from this table by every node
+    (3, ["CREATE TABLE IF NOT EXISTS change_notices (id INTEGER PRIMARY KEY AUTOINCREMENT, notice TEXT NOT NULL)"]),
+    (4, [
+        "CREATE TABLE IF NOT EXISTS snapshot_chunks (hash TEXT PRIMARY KEY, data TEXT NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS global_snapshots_snapshot_id ON global_snapshots (json_extract(snapshot, '$.snapshot_id'))",
+    ]),
+    (5, [
+        "CREATE TABLE IF NOT EXISTS workflow_runs ("
+        " run_id TEXT PRIMARY KEY, status TEXT NOT NULL, run TEXT NOT NULL, updated_at REAL NOT NULL)",
+    ]),
+    (6, [
+        "ALTER TABLE workflow_runs ADD COLUMN owner TEXT",
+        "ALTER TABLE workflow_runs ADD COLUMN lease_expires_at REAL",
+    ]),
+    (7, ["ALTER TABLE snapshot_chunks ADD COLUMN stored_at REAL NOT NULL DEFAULT 0"]),
+]
+
+# Arbitrary constant used as the advisory lock key while migrating
+MIGRATION_LOCK_ID = 7304112
+
+# Channel on which committed writes are announced to other nodes
+INVALIDATION_CHANNEL = "nexus_persistence"
+
+
+def prunable_snapshots(
+    rows: List[Tuple[int, bool, Optional[str], Optional[str]]], keep_last: Optional[int]
+) -> List[int]:
+    """
+    Row ids retention removes, given (id, expired, snapshot_id, base) rows newest
+    first: snapshots beyond the newest `keep_last` or past their maximum age. The
+    newest is always kept, so a node that was down for longer than the maximum
+    age still restores, and so is every snapshot a kept delta is based on.
+    """
+    doomed = []
+    needed: Set[str] = set()
+    for index, (row_id, expired, snapshot_id, base) in enumerate(rows):
+        if index > 0 and snapshot_id not in needed and (expired or (keep_last is not None and index >= keep_last)):
+            doomed.append(row_id)
+        elif base is not None:
+            needed.add(base)
+    return doomed
+
+
+class PersistenceBackend:
+    """
+    Storage engine behind PersistenceOverseer.
+
+    `write_batch` commits a group of service-state upserts, snapshot inserts and
+    workflow-run checkpoints in one transaction together with a change notice, and `listen` delivers the
+    notices committed by every node until its connection is lost.
+
+    Every workflow run is leased by the node executing it: checkpoints renew
+    the lease, and a node only takes over a run (`claim_workflow_runs`) once it
+    has no owner or its lease has expired.
+    """
+    async def connect(self) -> None:
+        raise NotImplementedError
+
+    async def migrate(self) -> List[int]:
+        """
+        Apply pending schema migrations; returns the versions applied.
+        """
+        raise NotImplementedError
+
+    async def write_batch(
+        self,
+        states: List[Tuple[str, Dict[str, Any]]],
+        snapshots: List[Dict[str, Any]],
+        notice: str,
+        runs: List[Tuple[str, Optional[Dict[str, Any]]]] = (),
+        owner: Optional[str] = None,
+        lease_sec: float = 60.0,
+    ) -> None:
+        """
+        `runs` upserts workflow-run checkpoints by run id; None deletes the run.
+        Checkpoints are written as `owner`, leased for `lease_sec`, and leave a
+        run owned by another node untouched.
+        """
+        raise NotImplementedError
+
+    async def fetch_workflow_runs(self, status: str) -> List[Dict[str, Any]]:
+        """
+        Checkpointed workflow runs with the given status, least recently updated first.
+        """
+        raise NotImplementedError
+
+    async def claim_workflow_runs(self, owner: str, lease_sec: float, status: str = "running") -> List[Dict[str, Any]]:
+        """
+        Atomically take over the runs with `status` that have no owner or whose
+        lease expired; returns them, least recently updated first.
+        """
+        raise NotImplementedError
+
+    async def extend_workflow_leases(self, owner: str, lease_sec: float) -> int:
+        """
+        Extend the leases of every run `owner` holds to `lease_sec` from now (0 releases them).
+        """
+        raise NotImplementedError
+
+    async def fetch_service_state(self, service_name: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    async def fetch_latest_snapshot(self) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    async def fetch_snapshot(self, snapshot_id: str) -> Optional[Dict[str, Any]]:
+        """
+        The snapshot whose "snapshot_id" field is `snapshot_id`.
+        """
+        raise NotImplementedError
+
+    async def fetch_snapshots(self) -> List[Dict[str, Any]]:
+        """
+        Every stored snapshot, oldest first.
+        """
+        raise NotImplementedError
+
+    async def prune_snapshots(self, keep_last: Optional[int], max_age_sec: Optional[float]) -> int:
+        raise NotImplementedError
+
+    async def put_chunks(self, chunks: Dict[str, str]) -> None:
+        """
+        Store snapshot chunks by hash. Chunks already present keep their data
+        but count as freshly stored.
+        """
+        raise NotImplementedError
+
+    async def get_chunks(self, hashes: List[str]) -> Dict[str, str]:
+        raise NotImplementedError
+
+    async def delete_chunks_except(self, live: Set[str], grace_sec: float = 0.0) -> int:
+        """
+        Delete every chunk whose hash is not in `live` and that was stored more
+        than `grace_sec` ago; returns how many were removed.
+        """
+        raise NotImplementedError
+
+    async def listen(self, on_notice: Callable[[str], None], on_ready: Callable[[], None]) -> None:
+        """
+        Call `on_ready` once listening, then `on_notice` for every committed
+        notice. Returns or raises when notices can no longer be received.
+        """
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        raise NotImplementedError
+
+
+class PostgresBackend(PersistenceBackend):
+    """
+    asyncpg connection pool; change notices travel over LISTEN/NOTIFY.
+    """
+    def __init__(self, db_url: str, min_size: int = 1, max_size: int = 10):
+        self.db_url = db_url
+        self.min_size = min_size
+        self.max_size = max_size
+        self.pool = None
+        self._listener = None
+
+    @staticmethod
+    async def _init_connection(conn) -> None:
+        # Exchange JSON columns as Python dicts
+        for type_name in ("json", "jsonb"):
+            await conn.set_type_codec(type_name, encoder=json.dumps, decoder=json.loads, schema="pg_catalog")
+
+    async def connect(self) -> None:
+        import asyncpg
+
+        self.pool = await asyncpg.create_pool(
+            self.db_url,
+            min_size=self.min_size,
+            max_size=self.max_size,
+            init=self._init_connection,
+            statement_cache_size=256,
+        )
+
+    async def migrate(self) -> List[int]:
+        applied_now = []
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                # Several nodes may start at once
+                await conn.execute("SELECT pg_advisory_xact_lock($1)", MIGRATION_LOCK_ID)
+                await conn.execute(
+                    "CREATE TABLE IF NOT EXISTS schema_migrations ("
+                    " version INTEGER PRIMARY KEY, applied_at TIMESTAMPTZ NOT NULL DEFAULT now())"
+                )
+                applied = {row["version"] for row in await conn.fetch("SELECT version FROM schema_migrations")}
+                for version, statements in POSTGRES_MIGRATIONS:
+                    if version in applied:
+                        continue
+                    for statement in statements:
+                        await conn.execute(statement)
+                    await conn.execute("INSERT INTO schema_migrations (version) VALUES ($1)", version)
+                    applied_now.append(version)
+        return applied_now
+
+    async def write_batch(
+        self,
+        states: List[Tuple[str, Dict[str, Any]]],
+        snapshots: List[Dict[str, Any]],
+        notice: str,
+        runs: List[Tuple[str, Optional[Dict[str, Any]]]] = (),
+        owner: Optional[str] = None,
+        lease_sec: float = 60.0,
+    ) -> None:
+        upserts = [(run_id, run["status"], run, owner, float(lease_sec)) for run_id, run in runs if run is not None]
+        deletes = [run_id for run_id, run in runs if run is None]
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                # executemany prepares each statement once per connection (kept in the statement cache)
+                # and pipelines the rows instead of a round trip per write
+                if states:
+                    await conn.executemany(
+                        "INSERT INTO service_states (service_name, state) VALUES ($1, $2) "
+                        "ON CONFLICT (service_name) DO UPDATE SET state = EXCLUDED.state",
+                        states,
+                    )
+                if snapshots:
+                    await conn.executemany(
+                        "INSERT INTO global_snapshots (snapshot) VALUES ($1)", [(snapshot,) for snapshot in snapshots]
+                    )
+                if upserts:
+                    await conn.executemany(
+                        "INSERT INTO workflow_runs (run_id, status, run, owner, lease_expires_at)"
+                        " VALUES ($1, $2, $3, $4, now() + make_interval(secs => $5)) "
+                        "ON CONFLICT (run_id) DO UPDATE SET status = EXCLUDED.status, run = EXCLUDED.run, updated_at = now(),"
+                        " owner = EXCLUDED.owner, lease_expires_at = EXCLUDED.lease_expires_at"
+                        # A run another node has taken over is no longer ours to write
+                        " WHERE workflow_runs.owner IS NULL OR workflow_runs.owner IS NOT DISTINCT FROM EXCLUDED.owner",
+                        upserts,
+                    )
+                if deletes:
+                    await conn.execute(
+                        "DELETE FROM workflow_runs WHERE run_id = ANY($1::text[]) AND (owner IS NULL OR owner IS NOT DISTINCT FROM $2)",
+                        deletes,
+                        owner,
+                    )
+                # Delivered to listeners when the transaction commits
+                await conn.execute("SELECT pg_notify($1, $2)", INVALIDATION_CHANNEL, notice)
+
+    async def fetch_service_state(self, service_name: str) -> Optional[Dict[str, Any]]:
+        async with self.pool.acquire() as conn:
+            row = await conn.fetchrow("SELECT state FROM service_states WHERE service_name = $1", service_name)
+        return row["state"] if row else None
+
+    async def fetch_workflow_runs(self, status: str) -> List[Dict[str, Any]]:
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch("SELECT run FROM workflow_runs WHERE status = $1 ORDER BY updated_at", status)
+        return [row["run"] for row in rows]
+
+    async def claim_workflow_runs(self, owner: str, lease_sec: float, status: str = "running") -> List[Dict[str, Any]]:
+        async with self.pool.acquire() as conn:
+            # Concurrent claims of the same row wait on its lock and then re-check the condition
+            rows = await conn.fetch(
+                "UPDATE workflow_runs SET owner = $1, lease_expires_at = now() + make_interval(secs => $2)"
+                " WHERE status = $3 AND (owner IS NULL OR lease_expires_at IS NULL OR lease_expires_at < now())"
+                " RETURNING run, updated_at",
+                owner,
+                float(lease_sec),
+                status,
+            )
+        return [row["run"] for row in sorted(rows, key=lambda row: row["updated_at"])]
+
+    async def extend_workflow_leases(self, owner: str, lease_sec: float) -> int:
+        async with self.pool.acquire() as conn:
+            result = await conn.execute(
+                "UPDATE workflow_runs SET lease_expires_at = now() + make_interval(secs => $2) WHERE owner = $1",
+                owner,
+                float(lease_sec),
+            )
+        return int(result.split()[-1])
+
+    async def fetch_latest_snapshot(self) -> Optional[Dict[str, Any]]:
+        async with self.pool.acquire() as conn:
+            # Snapshots committed together share created_at; id breaks the tie
+            row = await conn.fetchrow("SELECT snapshot FROM global_snapshots ORDER BY created_at DESC, id DESC LIMIT 1")
+        return row["snapshot"] if row else None
+
+    async def fetch_snapshot(self, snapshot_id: str) -> Optional[Dict[str, Any]]:
+        async with self.pool.acquire() as conn:
+            row = await conn.fetchrow(
+                "SELECT snapshot FROM global_snapshots WHERE snapshot->>'snapshot_id' = $1 LIMIT 1", snapshot_id
+            )
+        return row["snapshot"] if row else None
+
+    async def fetch_snapshots(self) -> List[Dict[str, Any]]:
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch("SELECT snapshot FROM global_snapshots ORDER BY created_at, id")
+        return [row["snapshot"] for row in rows]
+
+    async def put_chunks(self, chunks: Dict[str, str]) -> None:
+        async with self.pool.acquire() as conn:
+            await conn.executemany(
+                "INSERT INTO snapshot_chunks (hash, data) VALUES ($1, $2) ON CONFLICT (hash) DO UPDATE SET stored_at = now()",
+                list(chunks.items()),
+            )
+
+    async def get_chunks(self, hashes: List[str]) -> Dict[str, str]:
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch("SELECT hash, data FROM snapshot_chunks WHERE hash = ANY($1::text[])", list(hashes))
+        return {row["hash"]: row["data"] for row in rows}
+
+    async def delete_chunks_except(self, live: Set[str], grace_sec: float = 0.0) -> int:
+        async with self.pool.acquire() as conn:
+            result = await conn.execute(
+                "DELETE FROM snapshot_chunks WHERE NOT (hash = ANY($1::text[]))"
+                " AND stored_at < now() - make_interval(secs => $2)",
+                list(live),
+                float(grace_sec),
+            )
+        return int(result.split()[-1])
+
+    async def prune_snapshots(self, keep_last: Optional[int], max_age_sec: Optional[float]) -> int:
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                rows = await conn.fetch(
+                    "SELECT id, ($1::float8 IS NOT NULL AND created_at < now() - make_interval(secs => $1::float8)) AS expired,"
+                    " snapshot->>'snapshot_id' AS snapshot_id, snapshot->>'base' AS base"
+                    " FROM global_snapshots ORDER BY created_at DESC, id DESC FOR UPDATE",
+                    float(max_age_sec) if max_age_sec is not None else None,
+                )
+                doomed = prunable_snapshots(
+                    [(row["id"], row["expired"], row["snapshot_id"], row["base"]) for row in rows], keep_last
+                )
+                if doomed:
+                    await conn.execute("DELETE FROM global_snapshots WHERE id = ANY($1::bigint[])", doomed)
+        return len(doomed)
+
+    async def listen(self, on_notice: Callable[[str], None], on_ready: Callable[[], None]) -> None:
+        import asyncpg
+
+        lost = asyncio.Event()
+        self._listener = await asyncpg.connect(self.db_url)
+        try:
+            self._listener.add_termination_listener(lambda _: lost.set())
+            await self._listener.add_listener(
+                INVALIDATION_CHANNEL, lambda connection, pid, channel, payload: on_notice(payload)
+            )
+            on_ready()
+            await lost.wait()
+        finally:
+            if not self._listener.is_closed():
+                await self._listener.close()
+            self._listener = None
+
+    async def close(self) -> None:
+        if self._listener is not None and not self._listener.is_closed():
+            await self._listener.close()
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+
+
+class SQLiteBackend(PersistenceBackend):
+    """
+    Embedded SQLite database in WAL mode, for single-node deployments and tests.
+
+    All statements run on one worker thread that owns the connection, so the
+    event loop never blocks on disk. Change notices are rows in `change_notices`;
+    listeners poll `PRAGMA data_version`, which changes whenever another
+    connection commits, and read the notices added since they last looked.
+    """
+    def __init__(self, path: str, poll_interval_sec: float = 0.2, keep_notices: int = 1000):
+        self.path = path
+        self.poll_interval_sec = poll_interval_sec
+        self.keep_notices = keep_notices
+        self.conn: Optional[sqlite3.Connection] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    async def _run(self, function: Callable, *args: Any) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+
+    def _open(self) -> sqlite3.Connection:
+        if self.path != ":memory:":
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    async def connect(self) -> None:
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-persistence")
+        self.conn = await self._run(self._open)
+
+    def _migrate(self) -> List[int]:
+        applied_now = []
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS schema_migrations (version INTEGER PRIMARY KEY, applied_at REAL NOT NULL)"
+            )
+            applied = {row[0] for row in self.conn.execute("SELECT version FROM schema_migrations")}
+            for version, statements in SQLITE_MIGRATIONS:
+                if version in applied:
+                    continue
+                for statement in statements:
+                    self.conn.execute(statement)
+                self.conn.execute("INSERT INTO schema_migrations (version, applied_at) VALUES (?, ?)", (version, time.time()))
+                applied_now.append(version)
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+        return applied_now
+
+    async def migrate(self) -> List[int]:
+        return await self._run(self._migrate)
+
+    def _write_batch(
+        self,
+        states: List[Tuple[str, Dict[str, Any]]],
+        snapshots: List[Dict[str, Any]],
+        notice: str,
+        runs: List[Tuple[str, Optional[Dict[str, Any]]]],
+        owner: Optional[str],
+        lease_sec: float,
+    ) -> None:
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            if states:
+                self.conn.executemany(
+                    "INSERT INTO service_states (service_name, state) VALUES (?, ?) "
+                    "ON CONFLICT (service_name) DO UPDATE SET state = excluded.state",
+                    [(name, json.dumps(state, default=str)) for name, state in states],
+                )
+            if snapshots:
+                self.conn.executemany(
+                    "INSERT INTO global_snapshots (snapshot, created_at) VALUES (?, ?)",
+                    [(json.dumps(snapshot, default=str), now) for snapshot in snapshots],
+                )
+            if runs:
+                self.conn.executemany(
+                    "INSERT INTO workflow_runs (run_id, status, run, updated_at, owner, lease_expires_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (run_id) DO UPDATE SET status = excluded.status, run = excluded.run, "
+                    "updated_at = excluded.updated_at, owner = excluded.owner, lease_expires_at = excluded.lease_expires_at "
+                    # A run another node has taken over is no longer ours to write
+                    "WHERE workflow_runs.owner IS NULL OR workflow_runs.owner IS excluded.owner",
+                    [
+                        (run_id, run["status"], json.dumps(run, default=str), now, owner, now + lease_sec)
+                        for run_id, run in runs if run is not None
+                    ],
+                )
+                self.conn.executemany(
+                    "DELETE FROM workflow_runs WHERE run_id = ? AND (owner IS NULL OR owner IS ?)",
+                    [(run_id, owner) for run_id, run in runs if run is None],
+                )
+            cursor = self.conn.execute("INSERT INTO change_notices (notice) VALUES (?)", (notice,))
+            if cursor.lastrowid % 100 == 0:
+                self.conn.execute("DELETE FROM change_notices WHERE id <= ?", (cursor.lastrowid - self.keep_notices,))
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    async def write_batch(
+        self,
+        states: List[Tuple[str, Dict[str, Any]]],
+        snapshots: List[Dict[str, Any]],
+        notice: str,
+        runs: List[Tuple[str, Optional[Dict[str, Any]]]] = (),
+        owner: Optional[str] = None,
+        lease_sec: float = 60.0,
+    ) -> None:
+        await self._run(self._write_batch, states, snapshots, notice, list(runs), owner, lease_sec)
+
+    def _fetch_workflow_runs(self, status: str) -> List[Dict[str, Any]]:
+        rows = self.conn.execute(
+            "SELECT run FROM workflow_runs WHERE status = ? ORDER BY updated_at", (status,)
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    async def fetch_workflow_runs(self, status: str) -> List[Dict[str, Any]]:
+        return await self._run(self._fetch_workflow_runs, status)
+
+    def _claim_workflow_runs(self, owner: str, lease_sec: float, status: str) -> List[Dict[str, Any]]:
+        now = time.time()
+        # BEGIN IMMEDIATE takes the write lock, so no other node can claim in between
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = self.conn.execute(
+                "SELECT run_id, run FROM workflow_runs"
+                " WHERE status = ? AND (owner IS NULL OR lease_expires_at IS NULL OR lease_expires_at < ?)"
+                " ORDER BY updated_at",
+                (status, now),
+            ).fetchall()
+            self.conn.executemany(
+                "UPDATE workflow_runs SET owner = ?, lease_expires_at = ? WHERE run_id = ?",
+                [(owner, now + lease_sec, run_id) for run_id, _ in rows],
+            )
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+        return [json.loads(run) for _, run in rows]
+
+    async def claim_workflow_runs(self, owner: str, lease_sec: float, status: str = "running") -> List[Dict[str, Any]]:
+        return await self._run(self._claim_workflow_runs, owner, lease_sec, status)
+
+    def _extend_workflow_leases(self, owner: str, lease_sec: float) -> int:
+        return self.conn.execute(
+            "UPDATE workflow_runs SET lease_expires_at = ? WHERE owner = ?", (time.time() + lease_sec, owner)
+        ).rowcount
+
+    async def extend_workflow_leases(self, owner: str, lease_sec: float) -> int:
+        return await self._run(self._extend_workflow_leases, owner, lease_sec)
+
+    def _fetch_one(self, query: str, params: Tuple = ()) -> Optional[Dict[str, Any]]:
+        row = self.conn.execute(query, params).fetchone()
+        return json.loads(row[0]) if row else None
+
+    async def fetch_service_state(self, service_name: str) -> Optional[Dict[str, Any]]:
+        return await self._run(self._fetch_one, "SELECT state FROM service_states WHERE service_name = ?", (service_name,))
+
+    async def fetch_latest_snapshot(self) -> Optional[Dict[str, Any]]:
+        return await self._run(
+            self._fetch_one, "SELECT snapshot FROM global_snapshots ORDER BY created_at DESC, id DESC LIMIT 1"
+        )
+
+    async def fetch_snapshot(self, snapshot_id: str) -> Optional[Dict[str, Any]]:
+        return await self._run(
+            self._fetch_one,
+            "SELECT snapshot FROM global_snapshots WHERE json_extract(snapshot, '$.snapshot_id') = ? LIMIT 1",
+            (snapshot_id,),
+        )
+
+    def _fetch_snapshots(self) -> List[Dict[str, Any]]:
+        rows = self.conn.execute("SELECT snapshot FROM global_snapshots ORDER BY created_at, id").fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    async def fetch_snapshots(self) -> List[Dict[str, Any]]:
+        return await self._run(self._fetch_snapshots)
+
+    def _put_chunks(self, chunks: Dict[str, str]) -> None:
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            self.conn.executemany(
+                "INSERT INTO snapshot_chunks (hash, data, stored_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (hash) DO UPDATE SET stored_at = excluded.stored_at",
+                [(digest, data, now) for digest, data in chunks.items()],
+            )
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    async def put_chunks(self, chunks: Dict[str, str]) -> None:
+        await self._run(self._put_chunks, chunks)
+
+    def _get_chunks(self, hashes: List[str]) -> Dict[str, str]:
+        found: Dict[str, str] = {}
+        hashes = list(hashes)
+        # Stay under SQLite's limit on bound parameters
+        for start in range(0, len(hashes), 500):
+            batch = hashes[start:start + 500]
+            rows = self.conn.execute(
+                f"SELECT hash, data FROM snapshot_chunks WHERE hash IN ({', '.join('?' for _ in batch)})", batch
+            ).fetchall()
+            found.update(rows)
+        return found
+
+    async def get_chunks(self, hashes: List[str]) -> Dict[str, str]:
+        return await self._run(self._get_chunks, hashes)
+
+    def _delete_chunks_except(self, live: Set[str], grace_sec: float) -> int:
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS live_chunks (hash TEXT PRIMARY KEY)")
+            self.conn.execute("DELETE FROM live_chunks")
+            self.conn.executemany("INSERT OR IGNORE INTO live_chunks (hash) VALUES (?)", [(digest,) for digest in live])
+            removed = self.conn.execute(
+                "DELETE FROM snapshot_chunks WHERE hash NOT IN (SELECT hash FROM live_chunks) AND stored_at < ?",
+                (time.time() - grace_sec,),
+            ).rowcount
+            self.conn.execute("DELETE FROM live_chunks")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+        return removed
+
+    async def delete_chunks_except(self, live: Set[str], grace_sec: float = 0.0) -> int:
+        return await self._run(self._delete_chunks_except, live, grace_sec)
+
+    def _prune_snapshots(self, keep_last: Optional[int], max_age_sec: Optional[float]) -> int:
+        cutoff = time.time() - max_age_sec if max_age_sec is not None else None
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = self.conn.execute(
+                "SELECT id, (? IS NOT NULL AND created_at < ?), json_extract(snapshot, '$.snapshot_id'),"
+                " json_extract(snapshot, '$.base') FROM global_snapshots ORDER BY created_at DESC, id DESC",
+                (cutoff, cutoff),
+            ).fetchall()
+            doomed = prunable_snapshots(rows, keep_last)
+            self.conn.executemany("DELETE FROM global_snapshots WHERE id = ?", [(row_id,) for row_id in doomed])
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+        return len(doomed)
+
+    async def prune_snapshots(self, keep_last: Optional[int], max_age_sec: Optional[float]) -> int:
+        return await self._run(self._prune_snapshots, keep_last, max_age_sec)
+
+    @staticmethod
+    def _poll(conn: sqlite3.Connection, version: int, last_id: int) -> Tuple[int, List[Tuple[int, str]]]:
+        current = conn.execute("PRAGMA data_version").fetchone()[0]
+        if current == version:
+            return current, []
+        return current, conn.execute("SELECT id, notice FROM change_notices WHERE id > ? ORDER BY id", (last_id,)).fetchall()
+
+    async def listen(self, on_notice: Callable[[str], None], on_ready: Callable[[], None]) -> None:
+        if self.path == ":memory:":
+            # Private to this process: no other node can change it
+            on_ready()
+            await asyncio.Event().wait()
+        # A connection of its own: data_version only reports commits made by other connections,
+        # and polling must not queue behind writes on the worker thread
+        conn = await asyncio.to_thread(self._open)
+        try:
+            last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM change_notices").fetchone()[0]
+            version = conn.execute("PRAGMA data_version").fetchone()[0]
+            on_ready()
+            while True:
+                await asyncio.sleep(self.poll_interval_sec)
+                version, rows = await asyncio.to_thread(self._poll, conn, version, last_id)
+                for notice_id, notice in rows:
+                    last_id = notice_id
+                    on_notice(notice)
+        finally:
+            conn.close()
+
+    async def close(self) -> None:
+        if self.conn is not None:
+            await self._run(self.conn.close)
+            self.conn = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+def create_backend(db_url: str) -> PersistenceBackend:
+    """
+    Pick a backend from the URL scheme: postgresql:// (or postgres://) or sqlite:///<path>.
+    """
+    scheme = urlparse(db_url).scheme.lower()
+    if scheme in ("postgresql", "postgres"):
+        return PostgresBackend(db_url)
+    if scheme == "sqlite":
+        # sqlite:///relative.db, sqlite:////absolute/path.db, sqlite:///:memory:
+        path = db_url.split(":///", 1)[1] if ":///" in db_url else ""
+        if not path:
+            raise ValueError(f"SQLite URL '{db_url}' has no database path.")
+        return SQLiteBackend(path)
+    raise ValueError(f"Unsupported database URL scheme '{scheme}'. Expected postgresql:// or sqlite:///.")
@@ -1,21 +1,45 @@
 import asyncio
 from collections import deque
-from typing import Deque
+from typing import Deque, Dict, List
 
 class StatsAggregatorService:
-    def __init__(self, aggregation_interval_sec: int = 10, max_samples: int = 10):
+    def __init__(self, aggregation_interval_sec: int = 10, max_samples: int = 10, event_bus=None):
         self.aggregation_interval_sec = aggregation_interval_sec
         self.samples: Deque[float] = deque(maxlen=max_samples)
+        self.event_bus = event_bus
         self.running = False
 
     def add_sample(self, sample: float) -> None:
         self.samples.append(sample)
 
+    def add_samples(self, samples: List[float]) -> None:
+        """
+        Ingest a batch of samples at once.
+        """
+        self.samples.extend(samples)
+
+    async def on_metrics_batch(self, events: List[Dict[str, float]]) -> None:
+        """
+        Consume a batch of `system.metrics` events from the event bus.
+        """
+        self.add_samples([event["cpu_percent"] for event in events if "cpu_percent" in event])
+
     def calculate_rolling_average(self) -> float:
         if not self.samples:
             return 0.0
         return sum(self.samples) / len(self.samples)
 
+    def current_stats(self) -> Dict[str, float]:
+        """
+        Rolling CPU statistics, e.g. for a workflow decision step.
+        """
+        recent = list(self.samples)[-3:]
+        return {
+            "cpu_percent": self.calculate_rolling_average(),
+            "predicted_cpu_percent": sum(recent) / len(recent) if recent else 0.0,
+            "samples": len(self.samples),
+        }
+
     def predict_future_load(self) -> float:
         """
         Predict future system load based on historical data.
@@ -31,8 +55,10 @@ class StatsAggregatorService:
         while self.running:
             try:
                 rolling_avg = self.calculate_rolling_average()
-                print(f"Rolling Average: {rolling_avg}")
-                # Example: Publish aggregated stats to event bus or external system
+                if self.event_bus:
+                    await self.event_bus.publish("system.stats", {"rolling_average": rolling_avg, "samples": len(self.samples)})
+                else:
+                    print(f"Rolling Average: {rolling_avg}")
             except Exception as e:
                 print(f"Error while aggregating stats: {e}")
             await asyncio.sleep(self.aggregation_interval_sec)
@@ -59,6 +85,8 @@ class StatsAggregatorService:
     async def start(self):
         print("StatsAggregatorService started.")
         self.running = True
+        if self.event_bus:
+            await self.event_bus.subscribe("system.metrics", self.on_metrics_batch, batch=True, max_batch_size=256, max_linger_sec=0.1)
         try:
             await self.aggregate_stats()
         except asyncio.CancelledError:
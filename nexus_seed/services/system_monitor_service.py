@@ -3,8 +3,9 @@ import asyncio
 from typing import Dict
 
 class SystemMonitorService:
-    def __init__(self, publish_interval_sec: int = 5):
+    def __init__(self, publish_interval_sec: int = 5, event_bus=None):
         self.publish_interval_sec = publish_interval_sec
+        self.event_bus = event_bus
         self.running = False
         self.goal_manager = None  # Placeholder for goal manager
 
@@ -52,7 +53,10 @@ class SystemMonitorService:
                 if self.goal_manager:
                     self.goal_manager.update_goal("Resource Optimization", metrics["cpu_percent"])
 
-                print(f"Publishing Metrics: {combined_metrics}")
+                if self.event_bus:
+                    await self.event_bus.publish("system.metrics", combined_metrics)
+                else:
+                    print(f"Publishing Metrics: {combined_metrics}")
             except Exception as e:
                 print(f"Error while fetching or publishing system metrics: {e}")
             await asyncio.sleep(self.publish_interval_sec)
@@ -1,57 +1,382 @@
 import asyncio
-from typing import Callable, Dict, List, Coroutine
+import itertools
+import time
+from typing import Any, Callable, Dict, List, Coroutine, Optional, Tuple
+from nexus_seed.utils.subscriber_queue import SubscriberQueue, CoalesceKey
+from nexus_seed.utils.event_transports import EventTransport, InProcessTransport
+
+# Topics are dot-separated ("core.cpu.high"). In subscription patterns "*"
+# matches exactly one segment and "#" matches zero or more segments.
+TOPIC_SEPARATOR = "."
+SINGLE_WILDCARD = "*"
+MULTI_WILDCARD = "#"
+
+DELIVERY_MODES = ("inline", "task", "queued")
+
+
+class Subscription:
+    """
+    A single callback registered against a topic pattern.
+    """
+    __slots__ = ("pattern", "callback", "mode", "seq", "queue", "worker", "max_batch_size", "max_linger_sec")
+
+    def __init__(self, pattern: str, callback: Callable[[Any], Coroutine], mode: str, seq: int):
+        self.pattern = pattern
+        self.callback = callback
+        self.mode = mode
+        self.seq = seq
+        self.queue: Optional[SubscriberQueue] = None
+        self.worker: Optional[asyncio.Task] = None
+        # A batch size of 0 means the callback receives single events
+        self.max_batch_size = 0
+        self.max_linger_sec = 0.0
+
+
+class _TrieNode:
+    __slots__ = ("children", "subscriptions")
 
-class EventBus:
     def __init__(self):
-        self.subscribers: Dict[str, List[Callable[[dict], Coroutine]]] = {}
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.subscriptions: List[Subscription] = []
 
-    async def subscribe(self, event_type: str, callback: Callable[[dict], Coroutine]) -> None:
+
+class TopicTrie:
+    """
+    Prefix tree of subscription patterns, one level per topic segment.
+    """
+    def __init__(self):
+        self.root = _TrieNode()
+
+    def insert(self, subscription: Subscription) -> None:
+        node = self.root
+        for segment in subscription.pattern.split(TOPIC_SEPARATOR):
+            node = node.children.setdefault(segment, _TrieNode())
+        node.subscriptions.append(subscription)
+
+    def remove(self, pattern: str, callback: Callable[[Any], Coroutine]) -> bool:
+        """
+        Remove the subscription of `callback` on `pattern`. Returns True if one was removed.
+        """
+        path = [self.root]
+        for segment in pattern.split(TOPIC_SEPARATOR):
+            node = path[-1].children.get(segment)
+            if node is None:
+                return False
+            path.append(node)
+
+        node = path[-1]
+        for index, subscription in enumerate(node.subscriptions):
+            if subscription.callback == callback:
+                del node.subscriptions[index]
+                break
+        else:
+            return False
+
+        # Prune branches that no longer lead to any subscription
+        segments = pattern.split(TOPIC_SEPARATOR)
+        for depth in range(len(segments), 0, -1):
+            child = path[depth]
+            if child.subscriptions or child.children:
+                break
+            del path[depth - 1].children[segments[depth - 1]]
+        return True
+
+    def match(self, topic: str) -> List[Subscription]:
+        """
+        Return every subscription whose pattern matches `topic`, in subscription order.
+        """
+        segments = topic.split(TOPIC_SEPARATOR)
+        matches: Dict[int, Subscription] = {}
+        self._match(self.root, segments, 0, matches)
+        return [matches[seq] for seq in sorted(matches)]
+
+    def _match(self, node: _TrieNode, segments: List[str], index: int, matches: Dict[int, Subscription]) -> None:
+        multi = node.children.get(MULTI_WILDCARD)
+        if multi is not None:
+            # "#" swallows any number of the remaining segments, including none
+            for rest in range(index, len(segments) + 1):
+                self._match(multi, segments, rest, matches)
+
+        if index == len(segments):
+            for subscription in node.subscriptions:
+                matches[subscription.seq] = subscription
+            return
+
+        exact = node.children.get(segments[index])
+        if exact is not None:
+            self._match(exact, segments, index + 1, matches)
+        single = node.children.get(SINGLE_WILDCARD)
+        if single is not None:
+            self._match(single, segments, index + 1, matches)
+
+
+class EventBus:
+    def __init__(self, transport: Optional[EventTransport] = None, resolution_cache_size: int = 4096):
+        self.transport = transport or InProcessTransport()
+        self.trie = TopicTrie()
+        self.subscriptions: Dict[str, List[Subscription]] = {}
+        self.resolution_cache_size = resolution_cache_size
+        self._resolution_cache: Dict[str, Tuple[Subscription, ...]] = {}
+        self._seq = itertools.count()
+
+    async def subscribe(
+        self,
+        event_type: str,
+        callback: Callable[[Any], Coroutine],
+        mode: str = "task",
+        queue_size: int = 1000,
+        overflow: str = "block",
+        coalesce_key: Optional[CoalesceKey] = None,
+        batch: bool = False,
+        max_batch_size: int = 100,
+        max_linger_sec: float = 0.05,
+    ) -> None:
+        """
+        Subscribe a callback to a topic or wildcard pattern.
+
+        In "task" mode (the default) the subscribers of an event run concurrently,
+        each in its own task, and the publisher waits for all of them; a lone
+        subscriber is awaited directly, without a task. "inline" mode is opt-in for
+        cheap handlers: the publisher awaits the callback directly, one subscriber
+        after another, so a slow one delays the rest. "queued" mode gives
+        the subscriber its own bounded queue and worker, so a slow subscriber never
+        stalls publishers; `overflow` selects what happens when the queue is full.
+
+        With `batch=True` the subscription is queued and the callback receives a list
+        of up to `max_batch_size` events, collected for at most `max_linger_sec` after
+        the first one arrives.
+        """
         try:
             if not event_type:
                 raise ValueError("Event type must not be empty.")
             if not callable(callback):
                 raise ValueError("Callback must be callable.")
+            if mode not in DELIVERY_MODES:
+                raise ValueError(f"Unknown delivery mode '{mode}'. Expected one of {DELIVERY_MODES}.")
+            if batch:
+                if max_batch_size < 1:
+                    raise ValueError("max_batch_size must be at least 1.")
+                mode = "queued"
 
-            if event_type not in self.subscribers:
-                self.subscribers[event_type] = []
-            self.subscribers[event_type].append(callback)
+            subscription = Subscription(event_type, callback, mode, next(self._seq))
+            if batch:
+                subscription.max_batch_size = max_batch_size
+                subscription.max_linger_sec = max_linger_sec
+            if mode == "queued":
+                subscription.queue = SubscriberQueue(queue_size, overflow, coalesce_key)
+                subscription.worker = asyncio.create_task(self._queue_worker(subscription))
+            self.trie.insert(subscription)
+            self.subscriptions.setdefault(event_type, []).append(subscription)
+            self._resolution_cache.clear()
+            await self.transport.on_subscribe(event_type)
             print(f"Subscribed to event type '{event_type}'")
         except Exception as e:
             print(f"Error subscribing to event type '{event_type}': {e}")
 
-    async def publish(self, event_type: str, data: dict) -> None:
+    async def unsubscribe(self, event_type: str, callback: Callable[[Any], Coroutine]) -> None:
+        """
+        Remove a callback previously registered with `subscribe`.
+        """
+        if not self.trie.remove(event_type, callback):
+            print(f"No subscription of {callback} on event type '{event_type}'")
+            return
+        remaining = list(self.subscriptions.get(event_type, []))
+        for index, subscription in enumerate(remaining):
+            if subscription.callback == callback:
+                del remaining[index]
+                if subscription.worker is not None:
+                    subscription.worker.cancel()
+                break
+        if remaining:
+            self.subscriptions[event_type] = remaining
+        else:
+            self.subscriptions.pop(event_type, None)
+        self._resolution_cache.clear()
+        await self.transport.on_unsubscribe(event_type)
+
+    async def start(self) -> None:
+        """
+        Start the transport so events can flow to and from peers.
+        """
+        await self.transport.start(self)
+
+    def resolve(self, event_type: str) -> Tuple[Subscription, ...]:
+        """
+        Resolve the subscriptions for a concrete topic, memoized per topic.
+        """
+        resolved = self._resolution_cache.get(event_type)
+        if resolved is None:
+            resolved = tuple(self.trie.match(event_type))
+            if len(self._resolution_cache) >= self.resolution_cache_size:
+                self._resolution_cache.clear()
+            self._resolution_cache[event_type] = resolved
+        return resolved
+
+    async def publish(self, event_type: str, data: Any) -> None:
         """
-        Publish an event to all subscribers of the given event type.
+        Publish an event to local subscribers, then to interested remote peers.
+
+        Data is handed to local subscribers by reference; it is neither copied nor
+        validated on this path.
         """
         try:
-            # Validate event type and data
-            if not event_type:
-                raise ValueError("Event type must not be empty.")
-            if not isinstance(data, dict):
-                raise ValueError("Event data must be a dictionary.")
-
-            if event_type in self.subscribers:
-                tasks = []
-                for callback in self.subscribers[event_type]:
-                    tasks.append(asyncio.create_task(self._safe_callback(callback, data)))
-                await asyncio.gather(*tasks)
-            else:
-                print(f"No subscribers for event type: {event_type}")
+            await self.dispatch(event_type, data)
+            if self.transport.remote:
+                await self.transport.send(event_type, data)
         except Exception as e:
             print(f"Error publishing event: {e}")
 
-    async def _safe_callback(self, callback: Callable[[dict], Coroutine], data: dict) -> None:
+    async def dispatch(self, event_type: str, data: Any) -> None:
+        """
+        Deliver an event to local subscribers only. Transports use this for events
+        that arrive from peers.
         """
-        Safely execute a callback with error handling and logging.
+        subscriptions = self.resolve(event_type)
+        if not subscriptions:
+            return
+
+        concurrent: Optional[List[Subscription]] = None
+        for subscription in subscriptions:
+            if subscription.mode == "inline":
+                await self._safe_callback(subscription.callback, event_type, data)
+            elif subscription.mode == "queued":
+                await subscription.queue.put(data)
+            else:
+                if concurrent is None:
+                    concurrent = []
+                concurrent.append(subscription)
+        if concurrent is None:
+            return
+        if len(concurrent) == 1:
+            # Nothing to overlap with, so skip creating a task
+            await self._safe_callback(concurrent[0].callback, event_type, data)
+            return
+        await asyncio.gather(*(
+            asyncio.create_task(self._safe_callback(subscription.callback, event_type, data))
+            for subscription in concurrent
+        ))
+
+    async def publish_many(self, event_type: str, events: List[Any]) -> None:
+        """
+        Publish several events of the same type, resolving subscribers once.
+
+        Batched subscribers receive the events as lists; task-mode subscribers get one
+        task for the whole batch rather than one per event.
         """
         try:
-            # Validate callback and data
-            if not callable(callback):
-                raise ValueError("Callback must be callable.")
-            if not isinstance(data, dict):
-                raise ValueError("Data must be a dictionary.")
+            concurrent: List[Subscription] = []
+            for subscription in self.resolve(event_type) if events else ():
+                if subscription.mode == "inline":
+                    for data in events:
+                        await self._safe_callback(subscription.callback, event_type, data)
+                elif subscription.mode == "queued":
+                    for data in events:
+                        await subscription.queue.put(data)
+                else:
+                    concurrent.append(subscription)
+            if len(concurrent) == 1:
+                await self._safe_callback_many(concurrent[0].callback, event_type, events)
+            elif concurrent:
+                await asyncio.gather(*(
+                    asyncio.create_task(self._safe_callback_many(subscription.callback, event_type, events))
+                    for subscription in concurrent
+                ))
 
+            if self.transport.remote:
+                for data in events:
+                    await self.transport.send(event_type, data)
+        except Exception as e:
+            print(f"Error publishing events: {e}")
+
+    async def _safe_callback_many(self, callback: Callable[[Any], Coroutine], event_type: str, events: List[dict]) -> None:
+        for data in events:
+            await self._safe_callback(callback, event_type, data)
+
+    async def _safe_callback(self, callback: Callable[[Any], Coroutine], event_type: str, data: Any) -> None:
+        """
+        Safely execute a callback, reporting failures without affecting other subscribers.
+        """
+        try:
             await callback(data)
-            print(f"Callback executed successfully for event: {data}")
         except Exception as e:
-            print(f"Error in callback execution for event: {data}. Error: {e}")
+            print(f"Error in callback execution for event type '{event_type}': {e}")
+
+    async def _queue_worker(self, subscription: Subscription) -> None:
+        """
+        Deliver events from a queued subscription's buffer, one at a time.
+        """
+        if subscription.max_batch_size:
+            await self._batch_worker(subscription)
+            return
+        queue = subscription.queue
+        while True:
+            _, data, enqueued_at = await queue.get()
+            started_at = time.monotonic()
+            try:
+                await subscription.callback(data)
+                queue.task_done(latency=started_at - enqueued_at)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                queue.task_done(latency=started_at - enqueued_at, failed=True)
+                print(f"Error in queued callback for event type '{subscription.pattern}': {e}")
+
+    async def _batch_worker(self, subscription: Subscription) -> None:
+        """
+        Deliver events from a batched subscription's buffer as lists.
+        """
+        queue = subscription.queue
+        while True:
+            entries = await queue.get_batch(subscription.max_batch_size, subscription.max_linger_sec)
+            started_at = time.monotonic()
+            failed = False
+            try:
+                await subscription.callback([entry[1] for entry in entries])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                failed = True
+                print(f"Error in batched callback for event type '{subscription.pattern}': {e}")
+            for entry in entries:
+                queue.task_done(latency=started_at - entry[2], failed=failed)
+
+    async def drain(self) -> None:
+        """
+        Wait until every queued subscriber has processed its pending events.
+        """
+        for subscriptions in list(self.subscriptions.values()):
+            for subscription in subscriptions:
+                if subscription.queue is not None:
+                    await subscription.queue.join()
+
+    def get_metrics(self) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Per-subscriber queue depth, drop counts and delivery lag for queued subscriptions.
+        """
+        metrics: Dict[str, List[Dict[str, Any]]] = {}
+        for pattern, subscriptions in self.subscriptions.items():
+            for subscription in subscriptions:
+                if subscription.queue is not None:
+                    entry = subscription.queue.get_metrics()
+                    entry["subscriber"] = getattr(subscription.callback, "__qualname__", repr(subscription.callback))
+                    metrics.setdefault(pattern, []).append(entry)
+        return metrics
+
+    async def close(self) -> None:
+        """
+        Stop the workers of all queued subscriptions and shut down the transport.
+        """
+        workers = [
+            subscription.worker
+            for subscriptions in self.subscriptions.values()
+            for subscription in subscriptions
+            if subscription.worker is not None
+        ]
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        await self.transport.stop()
+
+
+# Kept for modules written against the old services.internal_bus implementation
+InternalEventBus = EventBus
@@ -0,0 +1,190 @@
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+# Priority classes, most urgent first
+PRIORITY_CLASSES = ("control", "normal", "bulk")
+
+DEFAULT_CLASS_PREFIXES = {"core_": "control", "workflow_": "bulk"}
+
+# Relative deadline given to events that do not carry a `deadline_sec`
+DEFAULT_DEADLINES_SEC = {"control": 0.1, "normal": 1.0, "bulk": 10.0}
+
+
+class _ScheduledEvent:
+    __slots__ = ("event", "event_class", "enqueued_at", "deadline", "dispatched")
+
+    def __init__(self, event: Dict[str, Any], event_class: str, enqueued_at: float, deadline: float):
+        self.event = event
+        self.event_class = event_class
+        self.enqueued_at = enqueued_at
+        self.deadline = deadline
+        self.dispatched = False
+
+
+class _ClassQueue:
+    """
+    The events of one priority class: an earliest-deadline-first heap per
+    event type, served round-robin across types, plus the events in arrival
+    order so the longest-waiting one is known.
+    """
+    def __init__(self):
+        self.heaps: Dict[str, List[Tuple[float, int, _ScheduledEvent]]] = {}
+        self.turns: Deque[str] = deque()
+        self.arrivals: Deque[_ScheduledEvent] = deque()
+        self.size = 0
+
+    def push(self, event_type: str, item: _ScheduledEvent, key: float, seq: int) -> None:
+        heap = self.heaps.get(event_type)
+        if heap is None:
+            heap = self.heaps[event_type] = []
+            self.turns.append(event_type)
+        heapq.heappush(heap, (key, seq, item))
+        self.arrivals.append(item)
+        self.size += 1
+
+    def oldest(self) -> _ScheduledEvent:
+        while self.arrivals[0].dispatched:
+            self.arrivals.popleft()
+        return self.arrivals[0]
+
+    def pop(self) -> _ScheduledEvent:
+        event_type = self.turns.popleft()
+        heap = self.heaps[event_type]
+        item = heapq.heappop(heap)[2]
+        if heap:
+            self.turns.append(event_type)
+        else:
+            del self.heaps[event_type]
+        item.dispatched = True
+        self.size -= 1
+        return item
+
+
+class EventScheduler:
+    """
+    Bounded event queue that dispatches by priority class and deadline.
+
+    Events are classed as "control", "normal" or "bulk": by an explicit
+    `priority` field, else by type prefix (`core_*` is control, `workflow_*`
+    is bulk). A higher class is always served first, except that every
+    `aging_sec` an event waits counts as one class up, so bulk traffic is
+    never starved. Within a class, event types take turns, so one busy type
+    cannot crowd out the others; within a type, the earliest deadline goes
+    first. Deadlines come from the event's `deadline_sec` (relative to when it
+    was queued) or the class default. Aging applies within a type as well: an
+    event is ordered by its deadline or by `aging_sec` after it was queued,
+    whichever is earlier, so a far deadline cannot be overtaken indefinitely.
+
+    Drop-in for the asyncio.Queue the orchestrator used: put() waits while
+    `maxsize` events are queued, get() waits for an event, and task_done()/
+    join() behave the same.
+    """
+    def __init__(
+        self,
+        maxsize: int = 1000,
+        aging_sec: float = 1.0,
+        class_prefixes: Optional[Dict[str, str]] = None,
+        default_deadlines_sec: Optional[Dict[str, float]] = None,
+    ):
+        self.maxsize = maxsize
+        self.aging_sec = aging_sec
+        self.class_prefixes = class_prefixes or DEFAULT_CLASS_PREFIXES
+        self.default_deadlines_sec = {**DEFAULT_DEADLINES_SEC, **(default_deadlines_sec or {})}
+        self._classes = {name: _ClassQueue() for name in PRIORITY_CLASSES}
+        self._seq = itertools.count()
+        self._size = 0
+        self._slots = asyncio.Semaphore(maxsize) if maxsize > 0 else None
+        self._items = asyncio.Semaphore(0)
+        self._unfinished = 0
+        self._finished = asyncio.Event()
+        self._finished.set()
+
+        self.dispatched = {name: 0 for name in PRIORITY_CLASSES}
+        self.wait_sec_total = {name: 0.0 for name in PRIORITY_CLASSES}
+        self.deadline_misses = 0
+        self.aged_dispatches = 0
+
+    def classify(self, event: Dict[str, Any]) -> str:
+        priority = event.get("priority")
+        if priority in self._classes:
+            return priority
+        event_type = event.get("type", "")
+        for prefix, event_class in self.class_prefixes.items():
+            if event_type.startswith(prefix):
+                return event_class
+        return "normal"
+
+    def qsize(self) -> int:
+        return self._size
+
+    def empty(self) -> bool:
+        return self._size == 0
+
+    async def put(self, event: Dict[str, Any]) -> None:
+        # Parse before taking a slot, so a malformed event cannot leak one
+        event_class = self.classify(event)
+        deadline_sec = float(event.get("deadline_sec", self.default_deadlines_sec[event_class]))
+        if self._slots is not None:
+            await self._slots.acquire()
+        now = time.monotonic()
+        item = _ScheduledEvent(event, event_class, now, now + deadline_sec)
+        key = min(item.deadline, now + self.aging_sec)
+        self._classes[event_class].push(event.get("type", ""), item, key, next(self._seq))
+        self._size += 1
+        self._unfinished += 1
+        self._finished.clear()
+        self._items.release()
+
+    def _select(self, now: float) -> _ClassQueue:
+        best, best_score = None, None
+        for rank, name in enumerate(PRIORITY_CLASSES):
+            queue = self._classes[name]
+            if not queue.size:
+                continue
+            # Waiting `aging_sec` is worth one class of priority
+            score = rank - (now - queue.oldest().enqueued_at) / self.aging_sec
+            if best_score is None or score < best_score:
+                best, best_score = queue, score
+        return best
+
+    async def get(self) -> Dict[str, Any]:
+        await self._items.acquire()
+        now = time.monotonic()
+        queue = self._select(now)
+        item = queue.pop()
+        self._size -= 1
+        if self._slots is not None:
+            self._slots.release()
+        if any(self._classes[name].size for name in PRIORITY_CLASSES[:PRIORITY_CLASSES.index(item.event_class)]):
+            self.aged_dispatches += 1
+        if now > item.deadline:
+            self.deadline_misses += 1
+        self.dispatched[item.event_class] += 1
+        self.wait_sec_total[item.event_class] += now - item.enqueued_at
+        return item.event
+
+    def task_done(self) -> None:
+        if self._unfinished <= 0:
+            raise ValueError("task_done() called too many times")
+        self._unfinished -= 1
+        if self._unfinished == 0:
+            self._finished.set()
+
+    async def join(self) -> None:
+        await self._finished.wait()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "queued": {name: self._classes[name].size for name in PRIORITY_CLASSES},
+            "dispatched": dict(self.dispatched),
+            "mean_wait_sec": {
+                name: self.wait_sec_total[name] / self.dispatched[name] if self.dispatched[name] else 0.0
+                for name in PRIORITY_CLASSES
+            },
+            "deadline_misses": self.deadline_misses,
+            "aged_dispatches": self.aged_dispatches,
+        }
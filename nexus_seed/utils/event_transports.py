@@ -0,0 +1,440 @@
+import asyncio
+import os
+import pickle
+import struct
+from multiprocessing import Pipe
+from multiprocessing.connection import Connection
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+
+class EventTransport:
+    """
+    Carries events between an EventBus and its peers.
+
+    The bus always delivers to its own subscribers first; a transport with
+    `remote = True` is then asked to forward the event to peers that have
+    announced interest in it. Events arriving from peers are handed back to
+    the bus through `EventBus.dispatch`, which never re-forwards them.
+    """
+    remote = False
+
+    def __init__(self):
+        self.bus = None
+
+    async def start(self, bus) -> None:
+        self.bus = bus
+
+    async def stop(self) -> None:
+        pass
+
+    async def send(self, event_type: str, data: Any) -> None:
+        pass
+
+    async def on_subscribe(self, pattern: str) -> None:
+        pass
+
+    async def on_unsubscribe(self, pattern: str) -> None:
+        pass
+
+    def peer_spec(self) -> Tuple:
+        """
+        Describe how another process can connect a bus to this one. The result is
+        picklable and is turned back into a transport by `transport_from_peer_spec`.
+        """
+        raise RuntimeError(f"{self.__class__.__name__} cannot connect other processes.")
+
+    def release_peer_spec(self, spec: Tuple) -> None:
+        """
+        Release local resources held for a peer spec once the peer process has started.
+        """
+
+
+class InProcessTransport(EventTransport):
+    """
+    Local-only transport: events are handed to subscribers by reference, with no
+    serialization, copying or validation.
+    """
+
+
+class InterestSet:
+    """
+    Topic patterns a peer has subscribed to, with reference counts and a
+    per-topic match cache.
+    """
+    def __init__(self):
+        # Imported here to avoid a circular import with event_bus
+        from nexus_seed.utils.event_bus import Subscription, TopicTrie
+        self._subscription_cls = Subscription
+        self.trie = TopicTrie()
+        self.counts: Dict[str, int] = {}
+        self._cache: Dict[str, bool] = {}
+
+    def add(self, pattern: str) -> bool:
+        """
+        Register one more interest in `pattern`. Returns True if it is new.
+        """
+        self.counts[pattern] = self.counts.get(pattern, 0) + 1
+        if self.counts[pattern] > 1:
+            return False
+        self.trie.insert(self._subscription_cls(pattern, None, "inline", 0))
+        self._cache.clear()
+        return True
+
+    def discard(self, pattern: str) -> bool:
+        """
+        Drop one interest in `pattern`. Returns True if no interest remains.
+        """
+        count = self.counts.get(pattern, 0)
+        if count == 0:
+            return False
+        if count > 1:
+            self.counts[pattern] = count - 1
+            return False
+        del self.counts[pattern]
+        self.trie.remove(pattern, None)
+        self._cache.clear()
+        return True
+
+    def matches(self, topic: str) -> bool:
+        matched = self._cache.get(topic)
+        if matched is None:
+            matched = bool(self.trie.match(topic))
+            if len(self._cache) >= 4096:
+                self._cache.clear()
+            self._cache[topic] = matched
+        return matched
+
+    def count(self, pattern: str) -> int:
+        return self.counts.get(pattern, 0)
+
+
+class SharedMemoryRing:
+    """
+    Single-producer/single-consumer byte ring in a shared memory segment.
+
+    The segment starts with two little-endian u64 counters (bytes read, bytes
+    written) followed by the data area. Frames are a u32 length and a payload
+    and may wrap around the end of the data area.
+    """
+    HEADER = struct.Struct("<QQ")
+    LENGTH = struct.Struct("<I")
+
+    def __init__(self, shm: SharedMemory, owner: bool):
+        self.shm = shm
+        self.owner = owner
+        self.buf = shm.buf
+        self.capacity = shm.size - self.HEADER.size
+
+    @classmethod
+    def create(cls, capacity: int) -> "SharedMemoryRing":
+        shm = SharedMemory(create=True, size=cls.HEADER.size + capacity)
+        cls.HEADER.pack_into(shm.buf, 0, 0, 0)
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> "SharedMemoryRing":
+        # Peers are children of the hub and share its resource tracker, so the
+        # segment stays registered until the owning side unlinks it.
+        return cls(SharedMemory(name=name), owner=False)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def write(self, payload: bytes) -> bool:
+        """
+        Append one frame. Returns False if there is not enough free space.
+        """
+        head, tail = self.HEADER.unpack_from(self.buf, 0)
+        frame_size = self.LENGTH.size + len(payload)
+        if frame_size > self.capacity:
+            raise ValueError(f"Event of {len(payload)} bytes exceeds ring capacity of {self.capacity} bytes.")
+        if self.capacity - (tail - head) < frame_size:
+            return False
+        self._copy_in(tail, self.LENGTH.pack(len(payload)))
+        self._copy_in(tail + self.LENGTH.size, payload)
+        # Publish the frame only after its bytes are in place
+        struct.pack_into("<Q", self.buf, 8, tail + frame_size)
+        return True
+
+    def read(self) -> Optional[bytes]:
+        """
+        Remove and return the next frame, or None if the ring is empty.
+        """
+        head, tail = self.HEADER.unpack_from(self.buf, 0)
+        if head == tail:
+            return None
+        (length,) = self.LENGTH.unpack(self._copy_out(head, self.LENGTH.size))
+        payload = self._copy_out(head + self.LENGTH.size, length)
+        struct.pack_into("<Q", self.buf, 0, head + self.LENGTH.size + length)
+        return payload
+
+    def _copy_in(self, position: int, data: bytes) -> None:
+        offset = self.HEADER.size + position % self.capacity
+        first = min(len(data), self.HEADER.size + self.capacity - offset)
+        self.buf[offset:offset + first] = data[:first]
+        if first < len(data):
+            self.buf[self.HEADER.size:self.HEADER.size + len(data) - first] = data[first:]
+
+    def _copy_out(self, position: int, length: int) -> bytes:
+        offset = self.HEADER.size + position % self.capacity
+        first = min(length, self.HEADER.size + self.capacity - offset)
+        data = bytes(self.buf[offset:offset + first])
+        if first < length:
+            data += bytes(self.buf[self.HEADER.size:self.HEADER.size + length - first])
+        return data
+
+    def close(self) -> None:
+        self.buf = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class SharedMemoryChannel:
+    """
+    Bidirectional link between two processes: one ring per direction plus a
+    pipe used only as a doorbell so the reader can sleep in the event loop.
+    """
+    def __init__(self, rx_ring: SharedMemoryRing, tx_ring: SharedMemoryRing, rx_bell: Connection, tx_bell: Connection):
+        self.rx_ring = rx_ring
+        self.tx_ring = tx_ring
+        self.rx_bell = rx_bell
+        self.tx_bell = tx_bell
+        self.interest = InterestSet()
+        self.announced: Set[str] = set()
+        self._readable = asyncio.Event()
+        self._reader: Optional[asyncio.Task] = None
+        self.closed = False
+
+    @classmethod
+    def create_pair(cls, capacity: int = 4 * 1024 * 1024) -> Tuple["SharedMemoryChannel", Dict[str, Any]]:
+        """
+        Create the local end of a channel and a picklable endpoint for the remote end.
+        """
+        inbound = SharedMemoryRing.create(capacity)
+        outbound = SharedMemoryRing.create(capacity)
+        inbound_bell_rx, inbound_bell_tx = Pipe(duplex=False)
+        outbound_bell_rx, outbound_bell_tx = Pipe(duplex=False)
+        channel = cls(inbound, outbound, inbound_bell_rx, outbound_bell_tx)
+        endpoint = {
+            "rx_ring": outbound.name,
+            "tx_ring": inbound.name,
+            "rx_bell": outbound_bell_rx,
+            "tx_bell": inbound_bell_tx,
+        }
+        return channel, endpoint
+
+    @classmethod
+    def from_endpoint(cls, endpoint: Dict[str, Any]) -> "SharedMemoryChannel":
+        return cls(
+            SharedMemoryRing.attach(endpoint["rx_ring"]),
+            SharedMemoryRing.attach(endpoint["tx_ring"]),
+            endpoint["rx_bell"],
+            endpoint["tx_bell"],
+        )
+
+    def start(self, on_frame) -> None:
+        os.set_blocking(self.rx_bell.fileno(), False)
+        os.set_blocking(self.tx_bell.fileno(), False)
+        asyncio.get_running_loop().add_reader(self.rx_bell.fileno(), self._readable.set)
+        self._reader = asyncio.create_task(self._read_loop(on_frame))
+
+    async def _read_loop(self, on_frame) -> None:
+        while not self.closed:
+            await self._readable.wait()
+            self._readable.clear()
+            try:
+                if os.read(self.rx_bell.fileno(), 65536) == b"":
+                    # The peer closed its end of the doorbell
+                    await on_frame(None)
+                    return
+            except BlockingIOError:
+                pass
+            while True:
+                payload = self.rx_ring.read()
+                if payload is None:
+                    break
+                await on_frame(pickle.loads(payload))
+
+    async def send(self, frame: Tuple) -> None:
+        await self.send_bytes(pickle.dumps(frame, protocol=pickle.HIGHEST_PROTOCOL))
+
+    async def send_bytes(self, payload: bytes) -> None:
+        if self.closed:
+            return
+        # A full ring is backpressure: wait for the peer to drain it
+        while not self.tx_ring.write(payload):
+            await asyncio.sleep(0.001)
+        try:
+            os.write(self.tx_bell.fileno(), b"\0")
+        except BlockingIOError:
+            # The doorbell pipe is full, so a wake-up is already pending
+            pass
+        except (BrokenPipeError, OSError):
+            self.closed = True
+
+    async def close(self) -> None:
+        self.closed = True
+        try:
+            asyncio.get_running_loop().remove_reader(self.rx_bell.fileno())
+        except (ValueError, OSError):
+            pass
+        if self._reader is not None and self._reader is not asyncio.current_task():
+            self._reader.cancel()
+            await asyncio.gather(self._reader, return_exceptions=True)
+        self.rx_bell.close()
+        self.tx_bell.close()
+        self.rx_ring.close()
+        self.tx_ring.close()
+
+
+class SharedMemoryTransport(EventTransport):
+    """
+    Multiprocess transport over shared memory rings, in a hub-and-spoke layout.
+
+    The hub (normally the kernel process) owns one channel per peer process and
+    relays events between peers. Each side announces the topic patterns it
+    subscribes to, so events only cross a process boundary when someone on the
+    other side is listening. Event data must be picklable.
+    """
+    remote = True
+
+    def __init__(self, endpoint: Optional[Dict[str, Any]] = None, channel_capacity: int = 4 * 1024 * 1024):
+        super().__init__()
+        self.is_hub = endpoint is None
+        self.channel_capacity = channel_capacity
+        self.channels: List[SharedMemoryChannel] = []
+        self.local_interest = InterestSet()
+        if endpoint is not None:
+            self.channels.append(SharedMemoryChannel.from_endpoint(endpoint))
+
+    async def start(self, bus) -> None:
+        await super().start(bus)
+        for channel in self.channels:
+            self._start_channel(channel)
+
+    def add_peer(self) -> Dict[str, Any]:
+        """
+        Open a channel for a new peer process and return the endpoint to pass to it.
+        """
+        if not self.is_hub:
+            raise RuntimeError("Only the hub transport can accept peers.")
+        channel, endpoint = SharedMemoryChannel.create_pair(self.channel_capacity)
+        self.channels.append(channel)
+        if self.bus is not None:
+            self._start_channel(channel)
+        return endpoint
+
+    def peer_spec(self) -> Tuple:
+        return ("shared_memory", self.add_peer())
+
+    def release_peer_spec(self, spec: Tuple) -> None:
+        # Close this process's copies of the peer's doorbell pipes so the hub
+        # notices when the peer exits
+        spec[1]["rx_bell"].close()
+        spec[1]["tx_bell"].close()
+
+    def _start_channel(self, channel: SharedMemoryChannel) -> None:
+        async def on_frame(frame):
+            await self._handle_frame(channel, frame)
+        channel.start(on_frame)
+        asyncio.create_task(self._sync_announcements(channel))
+
+    async def remove_peer(self, endpoint_or_channel) -> None:
+        """
+        Close the channel to a peer and withdraw the interest it announced.
+        """
+        channel = endpoint_or_channel
+        if isinstance(endpoint_or_channel, dict):
+            channel = next((c for c in self.channels if c.rx_ring.name == endpoint_or_channel["tx_ring"]), None)
+        if channel not in self.channels:
+            return
+        self.channels.remove(channel)
+        patterns = list(channel.interest.counts)
+        await channel.close()
+        for pattern in patterns:
+            await self._sync_pattern(pattern)
+
+    async def stop(self) -> None:
+        for channel in list(self.channels):
+            await channel.close()
+        self.channels.clear()
+
+    async def send(self, event_type: str, data: Any) -> None:
+        await self._forward(event_type, data, exclude=None)
+
+    async def _forward(self, event_type: str, data: Any, exclude: Optional[SharedMemoryChannel]) -> None:
+        payload = None
+        for channel in self.channels:
+            if channel is exclude or channel.closed or not channel.interest.matches(event_type):
+                continue
+            if payload is None:
+                payload = pickle.dumps(("event", event_type, data), protocol=pickle.HIGHEST_PROTOCOL)
+            await channel.send_bytes(payload)
+
+    async def on_subscribe(self, pattern: str) -> None:
+        if self.local_interest.add(pattern):
+            await self._sync_pattern(pattern)
+
+    async def on_unsubscribe(self, pattern: str) -> None:
+        if self.local_interest.discard(pattern):
+            await self._sync_pattern(pattern)
+
+    def _interest_excluding(self, pattern: str, channel: SharedMemoryChannel) -> int:
+        total = self.local_interest.count(pattern)
+        if self.is_hub:
+            total += sum(other.interest.count(pattern) for other in self.channels if other is not channel)
+        return total
+
+    async def _sync_pattern(self, pattern: str) -> None:
+        """
+        Tell each peer whether anyone reachable through this side wants `pattern`.
+        """
+        for channel in self.channels:
+            wanted = self._interest_excluding(pattern, channel) > 0
+            if wanted and pattern not in channel.announced:
+                channel.announced.add(pattern)
+                await channel.send(("sub", pattern, None))
+            elif not wanted and pattern in channel.announced:
+                channel.announced.discard(pattern)
+                await channel.send(("unsub", pattern, None))
+
+    async def _sync_announcements(self, channel: SharedMemoryChannel) -> None:
+        patterns = set(self.local_interest.counts)
+        if self.is_hub:
+            for other in self.channels:
+                patterns.update(other.interest.counts)
+        for pattern in patterns:
+            await self._sync_pattern(pattern)
+
+    async def _handle_frame(self, channel: SharedMemoryChannel, frame: Optional[Tuple]) -> None:
+        if frame is None:
+            await self.remove_peer(channel)
+            return
+        kind, topic, data = frame
+        if kind == "event":
+            await self.bus.dispatch(topic, data)
+            if self.is_hub:
+                await self._forward(topic, data, exclude=channel)
+        elif kind == "sub":
+            if channel.interest.add(topic) and self.is_hub:
+                await self._sync_pattern(topic)
+        elif kind == "unsub":
+            if channel.interest.discard(topic) and self.is_hub:
+                await self._sync_pattern(topic)
+
+
+def transport_from_peer_spec(spec: Tuple) -> EventTransport:
+    """
+    Build the transport a worker process uses to join the bus described by `spec`.
+    """
+    kind = spec[0]
+    if kind == "shared_memory":
+        return SharedMemoryTransport(spec[1])
+    if kind == "nats":
+        # Imported lazily so the NATS client is only required when it is used
+        from nexus_seed.adapters.nats_adapter import NATSTransport
+        return NATSTransport(spec[1], subject_prefix=spec[2])
+    raise ValueError(f"Unknown peer transport: {kind}")
@@ -0,0 +1,237 @@
+import heapq
+import math
+import re
+import threading
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> Set[str]:
+    return set(TOKEN_PATTERN.findall(text.lower()))
+
+
+def term_counts(text: str) -> Dict[str, int]:
+    return dict(Counter(TOKEN_PATTERN.findall(text.lower())))
+
+
+class BM25Index:
+    """
+    In-memory inverted index with term frequencies, ranked by Okapi BM25.
+
+    Documents are added, replaced and removed one at a time, so the index is
+    kept current as entries are written; a query only touches the postings of
+    its own terms.
+    """
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.doc_terms: Dict[str, Dict[str, int]] = {}
+        self.doc_lengths: Dict[str, int] = {}
+        self.total_length = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def add(self, key: str, counts: Dict[str, int]) -> None:
+        with self._lock:
+            self.remove(key)
+            for term, tf in counts.items():
+                self.postings.setdefault(term, {})[key] = tf
+            self.doc_terms[key] = counts
+            length = sum(counts.values())
+            self.doc_lengths[key] = length
+            self.total_length += length
+
+    def remove(self, key: str) -> None:
+        with self._lock:
+            counts = self.doc_terms.pop(key, None)
+            if counts is None:
+                return
+            for term in counts:
+                posting = self.postings.get(term)
+                if posting is not None:
+                    posting.pop(key, None)
+                    if not posting:
+                        del self.postings[term]
+            self.total_length -= self.doc_lengths.pop(key)
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[str, float]]:
+        """
+        The `k` best matching keys with their scores, best first.
+        """
+        with self._lock:
+            count = len(self.doc_lengths)
+            if not count:
+                return []
+            average_length = self.total_length / count or 1.0
+            scores: Dict[str, float] = {}
+            for term in tokenize(query):
+                posting = self.postings.get(term)
+                if not posting:
+                    continue
+                idf = math.log(1 + (count - len(posting) + 0.5) / (len(posting) + 0.5))
+                for key, tf in posting.items():
+                    norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[key] / average_length)
+                    scores[key] = scores.get(key, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+
+class VectorIndex:
+    """
+    Cosine-similarity index over embedding vectors (requires NumPy).
+
+    Small indexes are searched exhaustively. Once `ivf_threshold` vectors are
+    stored, they are clustered with k-means into roughly sqrt(n) lists and a
+    query only scans the `nprobe` lists nearest to it; the clustering is redone
+    whenever the index has doubled in size since it was last trained.
+    """
+    def __init__(self, ivf_threshold: int = 4096, nprobe: int = 8, kmeans_iterations: int = 10):
+        import numpy as np
+
+        self.np = np
+        self.ivf_threshold = ivf_threshold
+        self.nprobe = nprobe
+        self.kmeans_iterations = kmeans_iterations
+        self.keys: List[str] = []
+        self.positions: Dict[str, int] = {}
+        self.vectors = None
+        self.centroids = None
+        self.assignments = None
+        self._trained_size = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _normalize(self, vector: Any):
+        vector = self.np.asarray(vector, dtype=self.np.float32).reshape(-1)
+        norm = float(self.np.linalg.norm(vector))
+        return vector / norm if norm else vector
+
+    def add(self, key: str, vector: Any) -> None:
+        np = self.np
+        vector = self._normalize(vector)
+        with self._lock:
+            if self.vectors is None:
+                self.vectors = np.zeros((64, vector.shape[0]), dtype=np.float32)
+                self.assignments = np.zeros(64, dtype=np.int64)
+            elif vector.shape[0] != self.vectors.shape[1]:
+                raise ValueError(f"Expected a {self.vectors.shape[1]}-dimensional vector, got {vector.shape[0]}.")
+            position = self.positions.get(key)
+            if position is None:
+                position = len(self.keys)
+                if position == self.vectors.shape[0]:
+                    self.vectors = np.concatenate([self.vectors, np.zeros_like(self.vectors)])
+                    self.assignments = np.concatenate([self.assignments, np.zeros_like(self.assignments)])
+                self.keys.append(key)
+                self.positions[key] = position
+            self.vectors[position] = vector
+            if self.centroids is not None:
+                self.assignments[position] = int(np.argmax(self.centroids @ vector))
+            size = len(self.keys)
+            if size >= self.ivf_threshold and size >= 2 * self._trained_size:
+                self._train()
+
+    def remove(self, key: str) -> None:
+        with self._lock:
+            position = self.positions.pop(key, None)
+            if position is None:
+                return
+            last = len(self.keys) - 1
+            if position != last:
+                # Move the last vector into the hole so storage stays dense
+                moved = self.keys[last]
+                self.keys[position] = moved
+                self.positions[moved] = position
+                self.vectors[position] = self.vectors[last]
+                self.assignments[position] = self.assignments[last]
+            self.keys.pop()
+
+    def _train(self) -> None:
+        np = self.np
+        size = len(self.keys)
+        data = self.vectors[:size]
+        nlist = max(1, int(math.sqrt(size)))
+        rng = np.random.default_rng(0)
+        centroids = data[rng.choice(size, nlist, replace=False)].copy()
+        for _ in range(self.kmeans_iterations):
+            assignments = np.argmax(data @ centroids.T, axis=1)
+            for cluster in range(nlist):
+                members = data[assignments == cluster]
+                if len(members):
+                    centroid = members.mean(axis=0)
+                    norm = float(np.linalg.norm(centroid))
+                    centroids[cluster] = centroid / norm if norm else centroid
+        self.centroids = centroids
+        self.assignments[:size] = np.argmax(data @ centroids.T, axis=1)
+        self._trained_size = size
+
+    def search(self, vector: Any, k: int = 10) -> List[Tuple[str, float]]:
+        """
+        The `k` nearest keys by cosine similarity, best first.
+        """
+        np = self.np
+        query = self._normalize(vector)
+        with self._lock:
+            size = len(self.keys)
+            if not size:
+                return []
+            if self.centroids is None:
+                candidates = np.arange(size)
+            else:
+                nprobe = min(self.nprobe, len(self.centroids))
+                probes = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+                candidates = np.nonzero(np.isin(self.assignments[:size], probes))[0]
+            scores = self.vectors[candidates] @ query
+            k = min(k, len(candidates))
+            if k == 0:
+                return []
+            best = np.argpartition(-scores, k - 1)[:k]
+            best = best[np.argsort(-scores[best])]
+            return [(self.keys[candidates[i]], float(scores[i])) for i in best]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "vectors": len(self.keys),
+            "dimensions": None if self.vectors is None else self.vectors.shape[1],
+            "lists": None if self.centroids is None else len(self.centroids),
+        }
+
+
+class TransformerEmbedder:
+    """
+    Sentence embeddings from a causal language model in the model registry:
+    the mean of the last hidden layer over each text's tokens.
+    """
+    def __init__(self, model_registry: Any, model_key: str, max_tokens: int = 256):
+        self.model_registry = model_registry
+        self.model_key = model_key
+        self.max_tokens = max_tokens
+
+    def __call__(self, texts: List[str]):
+        import torch
+
+        tokenizer, model = self.model_registry.get(self.model_key)
+        if tokenizer.pad_token is None:
+            tokenizer.pad_token = tokenizer.eos_token
+        inputs = tokenizer(texts, return_tensors="pt", padding=True, truncation=True, max_length=self.max_tokens)
+        with torch.no_grad():
+            hidden = model(**inputs, output_hidden_states=True).hidden_states[-1]
+        mask = inputs["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+        pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1)
+        return pooled.cpu().numpy()
+
+
+def reciprocal_rank_fusion(rankings: Iterable[List[Tuple[str, float]]], k: int, offset: int = 60) -> List[Tuple[str, float]]:
+    """
+    Merge several ranked lists into one by summing 1 / (offset + rank).
+    """
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, (key, _) in enumerate(ranking):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (offset + rank + 1)
+    return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
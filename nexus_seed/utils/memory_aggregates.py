@@ -0,0 +1,150 @@
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+
+class _Totals:
+    __slots__ = ("count", "type_counts", "sums", "type_sums")
+
+    def __init__(self):
+        self.count = 0
+        self.type_counts: Dict[str, int] = {}
+        # Sums of each tracked metric, overall and per entry type
+        self.sums: Dict[str, float] = {}
+        self.type_sums: Dict[Tuple[str, str], float] = {}
+
+    def add(self, entry_type: Optional[str], metrics: Dict[str, float]) -> None:
+        self.count += 1
+        if entry_type:
+            self.type_counts[entry_type] = self.type_counts.get(entry_type, 0) + 1
+        for metric, value in metrics.items():
+            self.sums[metric] = self.sums.get(metric, 0.0) + value
+            if entry_type:
+                self.type_sums[(entry_type, metric)] = self.type_sums.get((entry_type, metric), 0.0) + value
+
+
+class MemoryAggregates:
+    """
+    Running counts and metric sums over memory entries, updated as entries are
+    appended so queries never rescan the memory.
+
+    Totals cover all entries; time-windowed queries are answered from per-bucket
+    totals (`bucket_sec` wide, kept for `max_window_sec`), so their cost depends
+    on the window length rather than on how many entries exist.
+
+    Safe to use from several threads: entries are added on the caller's thread
+    while queries may run in an executor.
+    """
+    def __init__(
+        self,
+        metrics: Iterable[str] = ("efficiency", "accuracy"),
+        bucket_sec: float = 60.0,
+        max_window_sec: float = 24 * 3600,
+    ):
+        self.metrics = tuple(metrics)
+        self.bucket_sec = bucket_sec
+        self.max_window_sec = max_window_sec
+        self.totals = _Totals()
+        self.buckets: Dict[int, _Totals] = {}
+        self._lock = threading.Lock()
+
+    def add(self, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self._add(entry)
+
+    def add_many(self, entries: Iterable[Dict[str, Any]]) -> None:
+        with self._lock:
+            for entry in entries:
+                self._add(entry)
+
+    def _add(self, entry: Dict[str, Any]) -> None:
+        entry_type = entry.get("type")
+        metrics = {}
+        for metric in self.metrics:
+            value = entry.get(metric)
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                metrics[metric] = float(value)
+        self.totals.add(entry_type, metrics)
+
+        timestamp = entry.get("timestamp")
+        if not isinstance(timestamp, (int, float)):
+            return
+        if timestamp < time.time() - self.max_window_sec:
+            return
+        bucket = int(timestamp // self.bucket_sec)
+        totals = self.buckets.get(bucket)
+        if totals is None:
+            totals = self.buckets[bucket] = _Totals()
+            self._expire_buckets()
+        totals.add(entry_type, metrics)
+
+    def _expire_buckets(self) -> None:
+        oldest = int((time.time() - self.max_window_sec) // self.bucket_sec)
+        for bucket in [bucket for bucket in self.buckets if bucket < oldest]:
+            del self.buckets[bucket]
+
+    def _window(self, window_sec: float):
+        if window_sec > self.max_window_sec:
+            raise ValueError(f"Window of {window_sec}s exceeds the {self.max_window_sec}s that are tracked.")
+        first = int((time.time() - window_sec) // self.bucket_sec)
+        return [totals for bucket, totals in self.buckets.items() if bucket >= first]
+
+    def count(self, entry_type: Optional[str] = None, window_sec: Optional[float] = None) -> int:
+        """
+        Number of entries, optionally of one type and/or within the last `window_sec`.
+        """
+        with self._lock:
+            return self._count(entry_type, window_sec)
+
+    def _count(self, entry_type: Optional[str], window_sec: Optional[float]) -> int:
+        parts = [self.totals] if window_sec is None else self._window(window_sec)
+        if entry_type is None:
+            return sum(part.count for part in parts)
+        return sum(part.type_counts.get(entry_type, 0) for part in parts)
+
+    def total(self, metric: str, entry_type: Optional[str] = None, window_sec: Optional[float] = None) -> float:
+        with self._lock:
+            return self._total(metric, entry_type, window_sec)
+
+    def _total(self, metric: str, entry_type: Optional[str], window_sec: Optional[float]) -> float:
+        parts = [self.totals] if window_sec is None else self._window(window_sec)
+        if entry_type is None:
+            return sum(part.sums.get(metric, 0.0) for part in parts)
+        return sum(part.type_sums.get((entry_type, metric), 0.0) for part in parts)
+
+    def mean(self, metric: str, entry_type: Optional[str] = None, window_sec: Optional[float] = None) -> float:
+        """
+        Average of `metric` over the matching entries; entries without the metric count as 0.
+        Returns 0.0 when there are no entries.
+        """
+        with self._lock:
+            return self._mean(metric, entry_type, window_sec)
+
+    def _mean(self, metric: str, entry_type: Optional[str], window_sec: Optional[float]) -> float:
+        count = self._count(entry_type, window_sec)
+        return self._total(metric, entry_type, window_sec) / count if count else 0.0
+
+    def type_counts(self, window_sec: Optional[float] = None) -> Dict[str, int]:
+        with self._lock:
+            return self._type_counts(window_sec)
+
+    def _type_counts(self, window_sec: Optional[float]) -> Dict[str, int]:
+        if window_sec is None:
+            return dict(self.totals.type_counts)
+        counts: Dict[str, int] = {}
+        for part in self._window(window_sec):
+            for entry_type, count in part.type_counts.items():
+                counts[entry_type] = counts.get(entry_type, 0) + count
+        return counts
+
+    def query(self, entry_type: Optional[str] = None, window_sec: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Count and metric averages for the matching entries in one result.
+        """
+        with self._lock:
+            result: Dict[str, Any] = {"count": self._count(entry_type, window_sec)}
+            for metric in self.metrics:
+                result[metric] = self._mean(metric, entry_type, window_sec)
+            if entry_type is None:
+                result["types"] = self._type_counts(window_sec)
+        return result
@@ -0,0 +1,342 @@
+import json
+import os
+import re
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from nexus_seed.utils.write_behind import PartialWriteError
+
+FSYNC_POLICIES = ("always", "interval", "never")
+
+SEGMENT_PATTERN = re.compile(r"^segment-(\d{8})\.jsonl$")
+
+
+def _segment_name(number: int) -> str:
+    return f"segment-{number:08d}.jsonl"
+
+
+def _fsync_directory(directory: str) -> None:
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class MemoryJournal:
+    """
+    Append-only journal of JSON entries, stored as JSON-lines segment files.
+
+    Appends go to the active segment, which is sealed and replaced once it
+    reaches `segment_max_bytes`. When `compact_after_segments` sealed segments
+    have piled up, a background thread merges them into one (optionally
+    dropping entries rejected by `retain`). Durability is set by `fsync`:
+    - always: fsync after every append.
+    - interval: fsync at most every `fsync_interval_sec`, from a timer.
+    - never: leave flushing to the operating system.
+    A torn final line left by a crash is discarded when the journal is opened.
+    """
+    def __init__(
+        self,
+        directory: str,
+        segment_max_bytes: int = 8 * 1024 * 1024,
+        fsync: str = "interval",
+        fsync_interval_sec: float = 1.0,
+        compact_after_segments: int = 8,
+        retain: Optional[Callable[[Dict[str, Any]], bool]] = None,
+    ):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy '{fsync}'. Expected one of {FSYNC_POLICIES}.")
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self.fsync = fsync
+        self.fsync_interval_sec = fsync_interval_sec
+        self.compact_after_segments = compact_after_segments
+        self.retain = retain
+        self._lock = threading.RLock()
+        self._file = None
+        self._active_number = 0
+        self._active_size = 0
+        self._dirty = False
+        self._fsync_timer: Optional[threading.Timer] = None
+        self._compactor: Optional[threading.Thread] = None
+
+        self.appended = 0
+        self.fsyncs = 0
+        self.rotations = 0
+        self.compactions = 0
+        self.open()
+
+    def segment_numbers(self) -> List[int]:
+        numbers = []
+        for name in os.listdir(self.directory):
+            match = SEGMENT_PATTERN.match(name)
+            if match:
+                numbers.append(int(match.group(1)))
+        return sorted(numbers)
+
+    def _segment_path(self, number: int) -> str:
+        return os.path.join(self.directory, _segment_name(number))
+
+    def open(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            numbers = self.segment_numbers()
+            self._active_number = numbers[-1] if numbers else 1
+            path = self._segment_path(self._active_number)
+            self._repair_tail(path)
+            self._file = open(path, "ab")
+            self._active_size = self._file.tell()
+
+    @staticmethod
+    def _repair_tail(path: str) -> None:
+        """
+        Drop a partially written final line, as left by a crash mid-append.
+        """
+        if not os.path.exists(path):
+            return
+        with open(path, "rb+") as file:
+            file.seek(0, os.SEEK_END)
+            size = file.tell()
+            if size == 0:
+                return
+            # Scan back to the last complete line
+            position = size
+            while position > 0:
+                step = min(65536, position)
+                file.seek(position - step)
+                chunk = file.read(step)
+                newline = chunk.rfind(b"\n")
+                if newline != -1:
+                    position = position - step + newline + 1
+                    break
+                position -= step
+            if position < size:
+                print(f"Discarding {size - position} bytes of a torn journal entry in {path}.")
+                file.truncate(position)
+
+    def append(self, entry: Dict[str, Any]) -> None:
+        self.append_many([entry])
+
+    def append_many(self, entries: List[Dict[str, Any]]) -> None:
+        """
+        Append entries in order; with the "always" policy they are synced together.
+        """
+        if not entries:
+            return
+        lines = [json.dumps(entry, default=str, separators=(",", ":")).encode() + b"\n" for entry in entries]
+        data = b"".join(lines)
+        with self._lock:
+            if self._file is None:
+                raise RuntimeError("Journal is closed.")
+            if self._active_size and self._active_size + len(data) > self.segment_max_bytes:
+                self._rotate()
+            try:
+                self._file.write(data)
+                self._file.flush()
+            except OSError as e:
+                raise PartialWriteError(self._recover_append(lines), e) from e
+            self._active_size += len(data)
+            self.appended += len(entries)
+            self._dirty = True
+            if self.fsync == "always":
+                self._sync()
+            elif self.fsync == "interval" and self._fsync_timer is None:
+                self._fsync_timer = threading.Timer(self.fsync_interval_sec, self._timed_sync)
+                self._fsync_timer.daemon = True
+                self._fsync_timer.start()
+
+    def _recover_append(self, lines: List[bytes]) -> int:
+        """
+        After a failed append, keep the entries that reached the segment whole
+        and cut off a torn one; returns how many were kept.
+        """
+        start = self._active_size
+        try:
+            self._file.close()
+        except OSError:
+            pass
+        self._file = None
+        # Reopening drops a torn final line and picks up the segment's real size
+        self.open()
+        written, end = 0, start
+        for line in lines:
+            if end + len(line) > self._active_size:
+                break
+            end += len(line)
+            written += 1
+        self.appended += written
+        self._dirty = self._dirty or written > 0
+        return written
+
+    def _sync(self) -> None:
+        if self._file is not None and self._dirty:
+            os.fsync(self._file.fileno())
+            self._dirty = False
+            self.fsyncs += 1
+
+    def _timed_sync(self) -> None:
+        with self._lock:
+            self._fsync_timer = None
+            self._sync()
+
+    def sync(self) -> None:
+        """
+        Force everything appended so far to stable storage.
+        """
+        with self._lock:
+            self._sync()
+
+    def _rotate(self) -> None:
+        self._sync()
+        self._file.close()
+        self._active_number += 1
+        self._file = open(self._segment_path(self._active_number), "ab")
+        self._active_size = 0
+        self.rotations += 1
+        _fsync_directory(self.directory)
+        if len(self.segment_numbers()) - 1 >= self.compact_after_segments:
+            self.compact_in_background()
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return self.iter_entries()
+
+    def iter_entries(self) -> Iterator[Dict[str, Any]]:
+        """
+        Stream entries from oldest to newest without loading the journal into memory.
+        """
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+            # Open every segment up front: compaction may replace files while we read,
+            # and an open handle keeps seeing the segment it was opened on
+            files = []
+            for number in self.segment_numbers():
+                try:
+                    files.append(open(self._segment_path(number), "rb"))
+                except FileNotFoundError:
+                    continue
+            end_of_active = self._active_size
+        try:
+            for index, file in enumerate(files):
+                last = index == len(files) - 1
+                for line in file:
+                    if last and file.tell() > end_of_active:
+                        # Written after the iterator was created
+                        break
+                    if not line.strip():
+                        continue
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        print(f"Skipping unreadable journal entry in {file.name}.")
+        finally:
+            for file in files:
+                file.close()
+
+    def compact_in_background(self) -> None:
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        self._compactor = threading.Thread(target=self.compact, name="journal-compaction", daemon=True)
+        self._compactor.start()
+
+    def compact(self) -> None:
+        """
+        Merge all sealed segments into one, dropping entries rejected by `retain`.
+        """
+        with self._lock:
+            sealed = [number for number in self.segment_numbers() if number != self._active_number]
+        if len(sealed) < 2 and self.retain is None:
+            return
+        if not sealed:
+            return
+        target = self._segment_path(sealed[0])
+        temp_path = target + ".compacting"
+        kept = 0
+        with open(temp_path, "wb") as out:
+            for number in sealed:
+                with open(self._segment_path(number), "rb") as segment:
+                    for line in segment:
+                        if not line.strip():
+                            continue
+                        if self.retain is not None:
+                            try:
+                                if not self.retain(json.loads(line)):
+                                    continue
+                            except ValueError:
+                                continue
+                        out.write(line if line.endswith(b"\n") else line + b"\n")
+                        kept += 1
+            out.flush()
+            os.fsync(out.fileno())
+        with self._lock:
+            os.replace(temp_path, target)
+            for number in sealed[1:]:
+                try:
+                    os.remove(self._segment_path(number))
+                except FileNotFoundError:
+                    pass
+            _fsync_directory(self.directory)
+            self.compactions += 1
+        print(f"Compacted {len(sealed)} journal segments into {os.path.basename(target)} ({kept} entries).")
+
+    def rewrite(self, entries: List[Dict[str, Any]]) -> None:
+        """
+        Atomically replace the whole journal with `entries`.
+        """
+        if self._compactor is not None:
+            self._compactor.join()
+        with self._lock:
+            if self._fsync_timer is not None:
+                self._fsync_timer.cancel()
+                self._fsync_timer = None
+            old_numbers = self.segment_numbers()
+            new_number = (old_numbers[-1] if old_numbers else 0) + 1
+            path = self._segment_path(new_number)
+            temp_path = path + ".rewriting"
+            with open(temp_path, "wb") as out:
+                for entry in entries:
+                    out.write(json.dumps(entry, default=str, separators=(",", ":")).encode() + b"\n")
+                out.flush()
+                os.fsync(out.fileno())
+            self._file.close()
+            os.replace(temp_path, path)
+            for number in old_numbers:
+                os.remove(self._segment_path(number))
+            _fsync_directory(self.directory)
+            self._active_number = new_number
+            self._file = open(path, "ab")
+            self._active_size = self._file.tell()
+            self._dirty = False
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            numbers = self.segment_numbers()
+            size = sum(os.path.getsize(self._segment_path(number)) for number in numbers)
+        return {
+            "segments": len(numbers),
+            "bytes": size,
+            "appended": self.appended,
+            "fsyncs": self.fsyncs,
+            "rotations": self.rotations,
+            "compactions": self.compactions,
+            "fsync_policy": self.fsync,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._fsync_timer is not None:
+                self._fsync_timer.cancel()
+                self._fsync_timer = None
+            if self._file is not None:
+                self._sync()
+                self._file.close()
+                self._file = None
+        if self._compactor is not None:
+            self._compactor.join()
@@ -1,20 +1,95 @@
 import json
-from typing import List, Dict
+import os
+import time
+from typing import Any, Dict, Iterator, List, Optional
+from nexus_seed.utils.memory_aggregates import MemoryAggregates
+from nexus_seed.utils.memory_journal import MemoryJournal
+from nexus_seed.utils.write_behind import WriteBehindBuffer
 
 class MemoryManager:
-    def __init__(self, filepath: str):
+    """
+    Persistent memory of MainBrain. Entries are appended to a segmented journal
+    next to `filepath` (e.g. memory.json -> memory.journal/), so recording an
+    entry costs the same regardless of how much memory has accumulated.
+    `aggregates` holds running counts and sums that are kept current on append.
+
+    Appends are buffered and written to the journal in groups by a background
+    thread; reads flush the buffer first (they block, so call them off the
+    event loop), and `flush()` makes everything durable.
+    """
+    def __init__(self, filepath: str, flush_interval_sec: float = 0.5, max_pending: int = 256, **journal_options: Any):
         self.filepath = filepath
+        self.journal_dir = os.path.splitext(filepath)[0] + ".journal"
+        self.journal = MemoryJournal(self.journal_dir, **journal_options)
+        self.buffer = WriteBehindBuffer(
+            self.journal.append_many,
+            name="memory-write-behind",
+            max_pending=max_pending,
+            flush_interval_sec=flush_interval_sec,
+        )
+        self.migrate_legacy_memory()
+        self.aggregates = MemoryAggregates()
+        # One pass at startup; afterwards aggregates are updated per entry
+        self.aggregates.add_many(self.journal.iter_entries())
 
-    def load_memory(self) -> List[Dict]:
+    def migrate_legacy_memory(self) -> None:
+        """
+        Import a memory file written by the old whole-file format into an empty journal.
+        """
+        if not os.path.exists(self.filepath) or self.journal.get_stats()["bytes"] > 0:
+            return
         try:
             with open(self.filepath, "r") as file:
-                return json.load(file)
-        except FileNotFoundError:
-            return []
+                legacy = json.load(file)
+        except (ValueError, OSError) as e:
+            print(f"Could not read legacy memory file {self.filepath}: {e}")
+            return
+        if isinstance(legacy, list) and legacy:
+            self.journal.append_many(legacy)
+            self.journal.sync()
+            print(f"Migrated {len(legacy)} memory entries from {self.filepath} to {self.journal_dir}.")
+
+    def append(self, entry: Dict) -> None:
+        if "timestamp" not in entry:
+            entry = {**entry, "timestamp": time.time()}
+        self.buffer.submit(entry)
+        self.aggregates.add(entry)
+
+    def iter_memory(self) -> Iterator[Dict]:
+        """
+        Stream memory entries from oldest to newest.
+        """
+        self.buffer.flush()
+        return self.journal.iter_entries()
+
+    def load_memory(self) -> List[Dict]:
+        return list(self.iter_memory())
 
     def save_memory(self, memory: List[Dict]) -> None:
-        with open(self.filepath, "w") as file:
-            json.dump(memory, file, indent=4)
+        """
+        Replace the whole memory. Prefer append() for recording new entries.
+        """
+        self.buffer.flush()
+        self.journal.rewrite(memory)
+        self.aggregates = MemoryAggregates()
+        self.aggregates.add_many(memory)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Write buffered entries and force the journal to stable storage. Returns
+        False if the writes did not finish within `timeout`; raises
+        WriteBehindError if they failed.
+        """
+        flushed = self.buffer.flush(timeout)
+        self.journal.sync()
+        return flushed
+
+    def close(self) -> None:
+        self.buffer.close()
+        self.journal.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"journal": self.journal.get_stats(), "write_behind": self.buffer.get_stats()}
 
     def load_state(self) -> Dict:
         try:
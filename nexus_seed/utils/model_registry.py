@@ -0,0 +1,236 @@
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Set
+
+
+class ModelEntry:
+    __slots__ = ("key", "model", "size_bytes", "loaded_at", "last_used", "uses")
+
+    def __init__(self, key: str, model: Any, size_bytes: int):
+        self.key = key
+        self.model = model
+        self.size_bytes = size_bytes
+        self.loaded_at = time.monotonic()
+        self.last_used = self.loaded_at
+        self.uses = 0
+
+
+def estimate_size(model: Any) -> int:
+    """
+    Best-effort size in bytes of a loaded model (PyTorch modules, arrays, or tuples of them).
+    """
+    if isinstance(model, (tuple, list)):
+        return sum(estimate_size(part) for part in model)
+    if callable(getattr(model, "parameters", None)):
+        try:
+            size = sum(p.numel() * p.element_size() for p in model.parameters())
+            if callable(getattr(model, "buffers", None)):
+                size += sum(b.numel() * b.element_size() for b in model.buffers())
+            return size
+        except (TypeError, AttributeError):
+            pass
+    return int(getattr(model, "nbytes", 0) or 0)
+
+
+def load_causal_lm(checkpoint: str):
+    """
+    Load a Hugging Face causal language model and its tokenizer.
+    """
+    # Imported here so transformers is only loaded when a model is first needed
+    from transformers import AutoTokenizer, AutoModelForCausalLM
+
+    tokenizer = AutoTokenizer.from_pretrained(checkpoint)
+    model = AutoModelForCausalLM.from_pretrained(checkpoint)
+    model.eval()
+    return tokenizer, model
+
+
+class ModelRegistry:
+    """
+    Process-wide registry of models that are loaded on first use and shared.
+
+    Models are registered under a key (e.g. "causal_lm:gpt2") with a loader;
+    registering the same key twice keeps the first loader, so every service asking
+    for the same checkpoint gets the same instance. Loaded models are kept in LRU
+    order: when the memory budget is exceeded the least recently used ones are
+    evicted, and models unused for `max_idle_sec` are evicted by the idle sweep.
+    Pinned models (ones that cannot be reloaded as they were, such as untrained
+    ones built with random weights) are never evicted by either. Callers should ask the registry for a model on each use rather than keeping it.
+    """
+    def __init__(self, memory_budget_bytes: Optional[int] = None, max_idle_sec: Optional[float] = None):
+        self.memory_budget_bytes = memory_budget_bytes
+        self.max_idle_sec = max_idle_sec
+        self.loaders: Dict[str, Callable[[], Any]] = {}
+        self.size_hints: Dict[str, int] = {}
+        self.pinned: Set[str] = set()
+        self.entries: "OrderedDict[str, ModelEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._idle_task: Optional[asyncio.Task] = None
+
+        self.loads = 0
+        self.hits = 0
+        self.evictions = 0
+        self.load_time_sec = 0.0
+
+    def register(
+        self, key: str, loader: Callable[[], Any], size_bytes: Optional[int] = None, pinned: bool = False
+    ) -> str:
+        """
+        Register a loader for `key` without loading it. Returns the key.
+        A pinned model stays loaded once loaded, whatever the budget or idle limit.
+        """
+        with self._lock:
+            self.loaders.setdefault(key, loader)
+            if size_bytes is not None:
+                self.size_hints.setdefault(key, size_bytes)
+            if pinned:
+                self.pinned.add(key)
+        return key
+
+    def register_causal_lm(self, checkpoint: str) -> str:
+        return self.register(f"causal_lm:{checkpoint}", lambda: load_causal_lm(checkpoint))
+
+    def is_loaded(self, key: str) -> bool:
+        return key in self.entries
+
+    def _touch(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            self.entries.move_to_end(key)
+            entry.last_used = time.monotonic()
+            entry.uses += 1
+            self.hits += 1
+            return entry.model
+
+    def get(self, key: str) -> Any:
+        """
+        Return the model for `key`, loading it in the calling thread if needed.
+        """
+        model = self._touch(key)
+        if model is not None:
+            return model
+        if key not in self.loaders:
+            raise KeyError(f"No model registered under '{key}'.")
+
+        with self._lock:
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+        with load_lock:
+            # Another caller may have finished loading while we waited
+            model = self._touch(key)
+            if model is not None:
+                return model
+            print(f"Loading model '{key}'...")
+            started = time.monotonic()
+            model = self.loaders[key]()
+            elapsed = time.monotonic() - started
+            size = self.size_hints.get(key) or estimate_size(model)
+            with self._lock:
+                entry = ModelEntry(key, model, size)
+                entry.uses = 1
+                self.entries[key] = entry
+                self.loads += 1
+                self.load_time_sec += elapsed
+                self._enforce_budget(keep=key)
+            print(f"Model '{key}' loaded in {elapsed:.1f}s ({size / (1024 * 1024):.1f} MiB).")
+            return model
+
+    async def load(self, key: str) -> Any:
+        """
+        Return the model for `key`, loading it in a worker thread so the event loop keeps running.
+        """
+        model = self._touch(key)
+        if model is not None:
+            return model
+        return await asyncio.get_running_loop().run_in_executor(None, self.get, key)
+
+    def loaded_bytes(self) -> int:
+        return sum(entry.size_bytes for entry in self.entries.values())
+
+    def _enforce_budget(self, keep: str) -> None:
+        if self.memory_budget_bytes is None:
+            return
+        total = self.loaded_bytes()
+        for key in list(self.entries):
+            if total <= self.memory_budget_bytes:
+                break
+            if key == keep or key in self.pinned:
+                continue
+            total -= self.entries[key].size_bytes
+            self._evict(key)
+
+    def _evict(self, key: str) -> None:
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.evictions += 1
+            print(f"Evicted model '{key}' ({entry.size_bytes / (1024 * 1024):.1f} MiB).")
+
+    def evict(self, key: str) -> None:
+        with self._lock:
+            self._evict(key)
+
+    def evict_idle(self, max_idle_sec: Optional[float] = None) -> List[str]:
+        """
+        Evict models that have not been used for `max_idle_sec`. Returns the evicted keys.
+        """
+        max_idle_sec = self.max_idle_sec if max_idle_sec is None else max_idle_sec
+        if max_idle_sec is None:
+            return []
+        cutoff = time.monotonic() - max_idle_sec
+        with self._lock:
+            idle = [
+                key for key, entry in self.entries.items() if entry.last_used < cutoff and key not in self.pinned
+            ]
+            for key in idle:
+                self._evict(key)
+        return idle
+
+    async def run_idle_eviction(self, interval_sec: float = 60.0) -> None:
+        while True:
+            await asyncio.sleep(interval_sec)
+            self.evict_idle()
+
+    def start_idle_eviction(self, interval_sec: float = 60.0) -> Optional[asyncio.Task]:
+        """
+        Start the idle sweep unless one is already running. Returns the new task, if any.
+        """
+        if self.max_idle_sec is None or (self._idle_task is not None and not self._idle_task.done()):
+            return None
+        self._idle_task = asyncio.create_task(self.run_idle_eviction(interval_sec))
+        return self._idle_task
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            loaded = {
+                key: {"size_bytes": entry.size_bytes, "uses": entry.uses, "idle_sec": time.monotonic() - entry.last_used}
+                for key, entry in self.entries.items()
+            }
+        return {
+            "registered": list(self.loaders),
+            "pinned": sorted(self.pinned),
+            "loaded": loaded,
+            "loaded_bytes": sum(info["size_bytes"] for info in loaded.values()),
+            "memory_budget_bytes": self.memory_budget_bytes,
+            "loads": self.loads,
+            "hits": self.hits,
+            "evictions": self.evictions,
+            "load_time_sec": self.load_time_sec,
+        }
+
+
+def _env_budget_bytes() -> Optional[int]:
+    budget_mb = int(os.environ.get("NEXUS_MODEL_MEMORY_BUDGET_MB", "0") or 0)
+    return budget_mb * 1024 * 1024 if budget_mb > 0 else None
+
+
+# Shared by every service in the process; configured from the environment so
+# worker processes pick up the same limits as the kernel
+model_registry = ModelRegistry(
+    memory_budget_bytes=_env_budget_bytes(),
+    max_idle_sec=float(os.environ.get("NEXUS_MODEL_MAX_IDLE_SEC", "900")),
+)
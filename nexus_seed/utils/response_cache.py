@@ -0,0 +1,165 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+def response_cache_key(model_key: str, prompt: str, params: Dict[str, Any]) -> str:
+    """
+    Stable key for a generation request: model, prompt and generation settings.
+    """
+    payload = json.dumps([model_key, prompt, params], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class DiskResponseCache:
+    """
+    On-disk tier for ResponseCache, stored in a small SQLite database. When
+    `ttl_sec` is not given, the ResponseCache it backs sets its own TTL.
+    """
+    def __init__(self, path: str, ttl_sec: Optional[float] = None):
+        self.path = path
+        self.ttl_sec = ttl_sec
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self.conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self.conn.execute("SELECT value, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if self.ttl_sec is not None and time.time() - row[1] > self.ttl_sec:
+                self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.conn.commit()
+                return None
+            return row[0]
+
+    def put(self, key: str, value: str) -> None:
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created_at) VALUES (?, ?, ?)",
+                (key, value, time.time()),
+            )
+            self.conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self.conn.execute("DELETE FROM responses")
+            self.conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self.conn.close()
+
+
+class ResponseCache:
+    """
+    Cache of generated responses: an in-memory LRU with a TTL, optionally backed
+    by a disk tier that survives restarts. Memory misses fall through to disk,
+    and disk hits are promoted back into memory. The disk tier expires entries
+    after the same TTL unless it was given its own.
+
+    From async code use `get_async`/`put_async`, which do the disk I/O in a
+    worker thread instead of on the event loop.
+    """
+    def __init__(self, max_entries: int = 1024, ttl_sec: Optional[float] = 3600, disk: Optional[DiskResponseCache] = None):
+        self.max_entries = max_entries
+        self.ttl_sec = ttl_sec
+        self.disk = disk
+        if disk is not None and disk.ttl_sec is None:
+            disk.ttl_sec = ttl_sec
+        self.entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[str]:
+        value = self._get_memory(key)
+        if value is None and self.disk is not None:
+            value = self._promote(key, self.disk.get(key))
+        if value is None:
+            self.misses += 1
+        return value
+
+    async def get_async(self, key: str) -> Optional[str]:
+        value = self._get_memory(key)
+        if value is None and self.disk is not None:
+            value = self._promote(key, await asyncio.to_thread(self.disk.get, key))
+        if value is None:
+            self.misses += 1
+        return value
+
+    def put(self, key: str, value: str) -> None:
+        self._store(key, value)
+        if self.disk is not None:
+            self.disk.put(key, value)
+
+    async def put_async(self, key: str, value: str) -> None:
+        self._store(key, value)
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.put, key, value)
+
+    def _get_memory(self, key: str) -> Optional[str]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        value, stored_at = entry
+        if self.ttl_sec is None or time.monotonic() - stored_at <= self.ttl_sec:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+        del self.entries[key]
+        self.expirations += 1
+        return None
+
+    def _promote(self, key: str, value: Optional[str]) -> Optional[str]:
+        if value is not None:
+            self.disk_hits += 1
+            self._store(key, value)
+        return value
+
+    def _store(self, key: str, value: str) -> None:
+        self.entries[key] = (value, time.monotonic())
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self.entries.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "disk_entries": len(self.disk) if self.disk is not None else None,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
@@ -1,82 +1,503 @@
+import itertools
 import json
-from typing import Dict, List
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from nexus_seed.utils.knowledge_search import (
+    TOKEN_PATTERN,
+    BM25Index,
+    VectorIndex,
+    reciprocal_rank_fusion,
+    term_counts,
+)
+from nexus_seed.utils.write_behind import WriteBehindBuffer
+
+SEARCH_MODES = ("bm25", "semantic", "hybrid")
+
+# Upper bound for prefix range scans: every string starting with `p` sorts below p + PREFIX_END
+PREFIX_END = "\uffff"
+
+# Each logged intent is its own entry, "intent_logs/<seq>", so logging one does not rewrite the others
+INTENT_LOG_PREFIX = "intent_logs/"
+
+_MISSING = object()
+
 
 class SharedKnowledgeBase:
-    def __init__(self, filepath: str = "/home/pong/Desktop/AIseed/logs/shared_knowledge.json"):
+    """
+    Knowledge shared by MainBrain and the core team, stored in SQLite (WAL mode).
+
+    Entries are JSON values under string keys. An inverted index of the words in
+    each key and value serves `query_knowledge`, and keys can be listed by
+    prefix. Writes made together (`add_entries`, `merge_knowledge`, or anything
+    inside `transaction()`) are committed as one transaction.
+
+    With `write_behind` (the default), writes are buffered and committed in
+    groups by a background thread; lookups by key see buffered writes, while
+    listings and searches flush the buffer first, so they may block and belong
+    off the event loop. Call `flush()` before shutdown.
+
+    `search()` ranks entries with BM25 over the stored term frequencies, and,
+    when an `embedder` (texts -> vectors) is given, by embedding similarity.
+    Both indexes are held in memory, updated as writes commit, and rebuilt from
+    the database (terms and embeddings tables) when it is opened. Committed
+    entries are embedded by a background thread, so writers never wait on the
+    embedder; their vectors are stored in a short transaction of their own.
+    Semantic and hybrid searches wait for pending embeddings first, and
+    `close()` finishes them.
+    """
+    def __init__(
+        self,
+        filepath: str = "/home/pong/Desktop/AIseed/logs/shared_knowledge.json",
+        write_behind: bool = True,
+        flush_interval_sec: float = 0.5,
+        max_pending: int = 512,
+        embedder: Optional[Callable[[List[str]], Any]] = None,
+    ):
+        # `filepath` names the legacy JSON file; the database lives next to it
         self.filepath = filepath
-        self.knowledge = self.load_knowledge()
+        self.db_path = os.path.splitext(filepath)[0] + ".db"
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.RLock()
+        # Transaction nesting depth of the thread holding the lock
+        self._local = threading.local()
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value TEXT NOT NULL, length INTEGER NOT NULL DEFAULT 0)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS terms (term TEXT NOT NULL, key TEXT NOT NULL, tf INTEGER NOT NULL DEFAULT 1,"
+            " PRIMARY KEY (term, key)) WITHOUT ROWID"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS terms_by_key ON terms (key)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+        self.embedder = embedder
+        self.search_index = BM25Index()
+        self.vector_index = VectorIndex() if embedder is not None else None
+        # Committed entries waiting for the embedding thread, latest value per key
+        self._embed_pending: Dict[str, Tuple[Any, str]] = {}
+        self._embed_cond = threading.Condition()
+        self._embed_busy = False
+        self._embed_closed = False
+        self._embed_thread: Optional[threading.Thread] = None
+        self._upgrade_schema()
+        self._load_search_indexes()
+        self.buffer: Optional[WriteBehindBuffer] = None
+        if write_behind:
+            self.buffer = WriteBehindBuffer(
+                self._write_batch,
+                name="knowledge-write-behind",
+                max_pending=max_pending,
+                flush_interval_sec=flush_interval_sec,
+                coalesce_key=lambda item: item[0],
+            )
+        self.migrate_legacy_knowledge()
+        with self._lock:
+            last = self.conn.execute(
+                "SELECT key FROM entries WHERE key >= ? AND key < ? ORDER BY key DESC LIMIT 1",
+                (INTENT_LOG_PREFIX, INTENT_LOG_PREFIX + PREFIX_END),
+            ).fetchone()
+        self._intent_seq = itertools.count(int(last[0][len(INTENT_LOG_PREFIX):]) + 1 if last else 0)
+
+    def _in_transaction(self) -> bool:
+        return getattr(self._local, "depth", 0) > 0
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        staged = None
+        with self._lock:
+            depth = getattr(self._local, "depth", 0)
+            if depth == 0:
+                self.conn.execute("BEGIN IMMEDIATE")
+                # Index updates wait for the commit so a rollback leaves the indexes untouched
+                self._local.staged = {}
+            self._local.depth = depth + 1
+            try:
+                yield self.conn
+            except BaseException:
+                self._local.depth = depth
+                if depth == 0:
+                    self._local.staged = {}
+                    self.conn.execute("ROLLBACK")
+                raise
+            self._local.depth = depth
+            if depth == 0:
+                self.conn.execute("COMMIT")
+                staged, self._local.staged = self._local.staged, {}
+                for key, (counts, _) in staged.items():
+                    self.search_index.add(key, counts)
+        if staged:
+            self._queue_embeddings(staged)
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """
+        Group writes into one transaction; nested calls join the outer one.
+        Buffered writes are flushed first, and writes inside go straight to the database.
+        """
+        if not self._in_transaction():
+            self.flush()
+        with self._transaction() as conn:
+            yield conn
+
+    def _write_batch(self, items: List[Tuple[str, Any]]) -> None:
+        # Runs on the write-behind thread: one transaction per group
+        with self._transaction() as conn:
+            for key, value in items:
+                self._put(conn, key, value)
+
+    def _write(self, key: str, value: Any) -> None:
+        if self.buffer is None or self._in_transaction():
+            with self._transaction() as conn:
+                self._put(conn, key, value)
+        else:
+            self.buffer.submit((key, value))
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Write all buffered entries to the database and wait for them. Returns
+        False on timeout; raises WriteBehindError if the writes failed.
+        """
+        if self.buffer is None or self._in_transaction():
+            # The writer thread would wait for this thread's transaction
+            return True
+        return self.buffer.flush(timeout)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        return {
+            "entries": entries,
+            "indexed_terms": len(self.search_index.postings),
+            "vectors": self.vector_index.get_stats() if self.vector_index is not None else None,
+            "write_behind": self.buffer.get_stats() if self.buffer is not None else None,
+        }
+
+    def _upgrade_schema(self) -> None:
+        """
+        Add the term frequency and length columns used by BM25 to databases
+        created before ranking existed, and reindex their entries.
+        """
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(terms)")}
+        if "tf" in columns:
+            return
+        with self._transaction() as conn:
+            conn.execute("ALTER TABLE terms ADD COLUMN tf INTEGER NOT NULL DEFAULT 1")
+            conn.execute("ALTER TABLE entries ADD COLUMN length INTEGER NOT NULL DEFAULT 0")
+            for key, value in conn.execute("SELECT key, value FROM entries").fetchall():
+                self._put(conn, key, json.loads(value))
+
+    def _load_search_indexes(self) -> None:
+        with self._lock:
+            documents: Dict[str, Dict[str, int]] = {}
+            for term, key, tf in self.conn.execute("SELECT term, key, tf FROM terms"):
+                documents.setdefault(key, {})[term] = tf
+            for key, counts in documents.items():
+                self.search_index.add(key, counts)
+            if self.vector_index is None:
+                return
+            import numpy as np
+            for key, blob in self.conn.execute("SELECT key, vector FROM embeddings"):
+                self.vector_index.add(key, np.frombuffer(blob, dtype=np.float32))
+            missing = self.conn.execute(
+                "SELECT key, value FROM entries WHERE key NOT IN (SELECT key FROM embeddings)"
+            ).fetchall()
+        if missing:
+            print(f"Embedding {len(missing)} existing knowledge entries in the background.")
+            self._queue_embeddings({key: (None, value) for key, value in missing})
+
+    def _queue_embeddings(self, written: Dict[str, Tuple[Any, str]]) -> None:
+        if self.vector_index is None or not written:
+            return
+        with self._embed_cond:
+            self._embed_pending.update(written)
+            if self._embed_thread is None:
+                self._embed_thread = threading.Thread(
+                    target=self._embedding_worker, name="knowledge-embedder", daemon=True
+                )
+                self._embed_thread.start()
+            self._embed_cond.notify_all()
+
+    def _embedding_worker(self, batch_size: int = 32) -> None:
+        while True:
+            with self._embed_cond:
+                while not self._embed_pending and not self._embed_closed:
+                    self._embed_cond.wait()
+                if not self._embed_pending:
+                    return
+                batch = {key: self._embed_pending.pop(key) for key in list(self._embed_pending)[:batch_size]}
+                self._embed_busy = True
+            try:
+                self._embed(batch)
+            except sqlite3.ProgrammingError:
+                # Closed underneath us; entries without vectors are embedded when reopened
+                return
+            except Exception as e:
+                print(f"Error storing knowledge embeddings: {e}")
+            finally:
+                with self._embed_cond:
+                    self._embed_busy = False
+                    self._embed_cond.notify_all()
+
+    def wait_for_embeddings(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every committed entry is embedded; returns False on timeout.
+        """
+        with self._embed_cond:
+            return self._embed_cond.wait_for(
+                lambda: not (self._embed_pending or self._embed_busy) or not self._embed_thread.is_alive(), timeout
+            )
+
+    def _embed(self, written: Dict[str, Tuple[Any, str]], batch_size: int = 32) -> None:
+        """
+        Embed committed entries, then store the vectors of those whose value is
+        unchanged. Runs on the embedding thread, without the lock.
+        """
+        if self.vector_index is None or not written:
+            return
+        import numpy as np
+        keys = list(written)
+        vectors: Dict[str, Any] = {}
+        try:
+            for start in range(0, len(keys), batch_size):
+                batch = keys[start:start + batch_size]
+                for key, vector in zip(batch, self.embedder([f"{key} {written[key][1]}" for key in batch])):
+                    vectors[key] = np.asarray(vector, dtype=np.float32)
+        except Exception as e:
+            print(f"Could not embed {len(keys)} knowledge entries: {e}")
+            return
+        with self._transaction() as conn:
+            rows = conn.execute(
+                f"SELECT key, value FROM entries WHERE key IN ({', '.join('?' for _ in vectors)})", list(vectors)
+            ).fetchall()
+            # An entry rewritten meanwhile is embedded by that write instead
+            current = {key: vectors[key] for key, value in rows if value == written[key][1]}
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, vector.tobytes()) for key, vector in current.items()],
+            )
+        for key, vector in current.items():
+            self.vector_index.add(key, vector)
+
+    def migrate_legacy_knowledge(self) -> None:
+        """
+        Import the old whole-file JSON knowledge base into an empty database.
+        """
+        if not os.path.exists(self.filepath):
+            return
+        with self._lock:
+            if self.conn.execute("SELECT 1 FROM entries LIMIT 1").fetchone():
+                return
+        try:
+            with open(self.filepath, "r") as file:
+                legacy = json.load(file)
+        except (ValueError, OSError) as e:
+            print(f"Could not read legacy knowledge file {self.filepath}: {e}")
+            return
+        if isinstance(legacy, dict) and legacy:
+            self.add_entries(legacy)
+            print(f"Migrated {len(legacy)} entries from {self.filepath} to {self.db_path}.")
+
+    def _put(self, conn: sqlite3.Connection, key: str, value: Any) -> None:
+        text = json.dumps(value, default=str)
+        counts = term_counts(f"{key} {text}")
+        conn.execute(
+            "INSERT OR REPLACE INTO entries (key, value, length) VALUES (?, ?, ?)", (key, text, sum(counts.values()))
+        )
+        conn.execute("DELETE FROM terms WHERE key = ?", (key,))
+        conn.executemany(
+            "INSERT INTO terms (term, key, tf) VALUES (?, ?, ?)", [(term, key, tf) for term, tf in counts.items()]
+        )
+        if self.vector_index is not None:
+            # Until the new value is embedded; if that never happens, reopening backfills it
+            conn.execute("DELETE FROM embeddings WHERE key = ?", (key,))
+        self._local.staged[key] = (counts, text)
+
+    def _get(self, key: str) -> Optional[Any]:
+        if self.buffer is not None:
+            pending = self.buffer.pending_value(key, _MISSING)
+            if pending is not _MISSING:
+                return pending[1]
+        with self._lock:
+            row = self.conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
 
     def add_entry(self, key: str, value: dict) -> None:
         """
         Add an entry to the shared knowledge base.
         """
-        self.knowledge[key] = value
-        self.save_knowledge()
+        self._write(key, value)
         print(f"Added entry to Shared Knowledge Base: {key}")
 
+    def add_entries(self, entries: Dict[str, Any]) -> None:
+        """
+        Add many entries in a single transaction.
+        """
+        with self.transaction() as conn:
+            for key, value in entries.items():
+                self._put(conn, key, value)
+        print(f"Added {len(entries)} entries to Shared Knowledge Base.")
+
     def get_entry(self, key: str) -> dict:
         """
         Retrieve an entry from the shared knowledge base.
         """
-        return self.knowledge.get(key, {})
+        value = self._get(key)
+        return {} if value is None else value
+
+    def list_entries(self, prefix: Optional[str] = None) -> List[str]:
+        """
+        List all keys in the shared knowledge base, or only those starting with `prefix`.
+        """
+        self.flush()
+        with self._lock:
+            if prefix is None:
+                rows = self.conn.execute("SELECT key FROM entries ORDER BY key").fetchall()
+            else:
+                rows = self.conn.execute(
+                    "SELECT key FROM entries WHERE key >= ? AND key < ? ORDER BY key", (prefix, prefix + PREFIX_END)
+                ).fetchall()
+        return [row[0] for row in rows]
 
-    def list_entries(self) -> List[str]:
+    def query_prefix(self, prefix: str) -> List[dict]:
         """
-        List all keys in the shared knowledge base.
+        Retrieve all entries whose key starts with `prefix`.
         """
-        return list(self.knowledge.keys())
+        self.flush()
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT key, value FROM entries WHERE key >= ? AND key < ? ORDER BY key", (prefix, prefix + PREFIX_END)
+            ).fetchall()
+        return [{key: json.loads(value)} for key, value in rows]
 
     def log_intent(self, intent: str, task: str, outcome: str) -> None:
         """
         Log an intent, its mapped task, and the outcome.
         """
         log_entry = {"intent": intent, "task": task, "outcome": outcome}
-        self.knowledge.setdefault("intent_logs", []).append(log_entry)
-        self.save_knowledge()
+        self._write(f"{INTENT_LOG_PREFIX}{next(self._intent_seq):012d}", log_entry)
         print(f"Logged intent: {intent} -> Task: {task} -> Outcome: {outcome}")
 
+    def get_intent_logs(self) -> List[dict]:
+        """
+        Every logged intent, oldest first, including a list kept under the old
+        single "intent_logs" key.
+        """
+        legacy = self._get("intent_logs") or []
+        return list(legacy) + [value for entry in self.query_prefix(INTENT_LOG_PREFIX) for value in entry.values()]
+
+    def _candidates(self, needle: str) -> Optional[List[Tuple[str, str]]]:
+        """
+        Entries that may contain `needle`, via the inverted index. Every word of
+        the needle after the first starts a word of such an entry, so those are
+        looked up as prefixes; the first may begin mid-word, and is only looked
+        up (with LIKE) when it is the needle's one word.
+        """
+        words = TOKEN_PATTERN.findall(needle)
+        if not words:
+            return None
+        prefixes = sorted(set(words[1:] if TOKEN_PATTERN.match(needle) else words))
+        if prefixes:
+            clauses = " INTERSECT ".join("SELECT key FROM terms WHERE term >= ? AND term < ?" for _ in prefixes)
+            params = [bound for word in prefixes for bound in (word, word + PREFIX_END)]
+        else:
+            # Words only contain [a-z0-9], so they need no LIKE escaping
+            clauses, params = "SELECT key FROM terms WHERE term LIKE ?", [f"%{words[0]}%"]
+        with self._lock:
+            return self.conn.execute(
+                f"SELECT key, value FROM entries WHERE key IN ({clauses}) ORDER BY key", params
+            ).fetchall()
+
     def query_knowledge(self, query: str) -> List[dict]:
         """
         Query the shared knowledge base using a simple keyword search.
+
+        Matches entries whose key or value contains the query as a substring
+        (case-insensitive); the word index narrows the entries that are checked.
         """
-        results = []
-        for key, value in self.knowledge.items():
-            if query.lower() in key.lower() or query.lower() in json.dumps(value).lower():
-                results.append({key: value})
+        needle = query.lower()
+        self.flush()
+        rows = self._candidates(needle)
+        if rows is None:
+            with self._lock:
+                rows = self.conn.execute("SELECT key, value FROM entries ORDER BY key").fetchall()
+        results = [
+            {key: json.loads(value)}
+            for key, value in rows
+            if needle in key.lower() or needle in value.lower()
+        ]
         print(f"Query results for '{query}': {results}")
         return results
 
+    def search(self, query: str, k: int = 10, mode: str = "bm25") -> List[Dict[str, Any]]:
+        """
+        The `k` entries most relevant to `query`, best first, as
+        {"key", "score", "value"} dicts.
+
+        Modes: "bm25" ranks by keyword relevance, "semantic" by embedding
+        similarity (needs an embedder), and "hybrid" fuses both rankings.
+        """
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode '{mode}'. Expected one of {SEARCH_MODES}.")
+        if mode != "bm25" and self.vector_index is None:
+            raise ValueError(f"Search mode '{mode}' needs a knowledge base created with an embedder.")
+        self.flush()
+        if mode != "bm25":
+            self.wait_for_embeddings()
+        rankings = []
+        if mode in ("bm25", "hybrid"):
+            rankings.append(self.search_index.search(query, k))
+        if mode in ("semantic", "hybrid"):
+            rankings.append(self.vector_index.search(self.embedder([query])[0], k))
+        ranked = rankings[0] if len(rankings) == 1 else reciprocal_rank_fusion(rankings, k)
+        if not ranked:
+            return []
+        keys = [key for key, _ in ranked]
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT key, value FROM entries WHERE key IN ({', '.join('?' for _ in keys)})", keys
+            ).fetchall()
+        values = {key: json.loads(value) for key, value in rows}
+        return [{"key": key, "score": score, "value": values[key]} for key, score in ranked if key in values]
+
     def merge_knowledge(self, external_knowledge: Dict) -> None:
         """
         Merge external knowledge into the shared knowledge base.
         """
-        for key, value in external_knowledge.items():
-            if key in self.knowledge:
+        with self.transaction() as conn:
+            for key, value in external_knowledge.items():
+                current = self._get(key)
                 # Example: Merge dictionaries or append lists
-                if isinstance(self.knowledge[key], dict) and isinstance(value, dict):
-                    self.knowledge[key].update(value)
-                elif isinstance(self.knowledge[key], list) and isinstance(value, list):
-                    self.knowledge[key].extend(value)
-                else:
-                    self.knowledge[key] = value  # Overwrite if types differ
-            else:
-                self.knowledge[key] = value
-        self.save_knowledge()
+                if isinstance(current, dict) and isinstance(value, dict):
+                    current.update(value)
+                    value = current
+                elif isinstance(current, list) and isinstance(value, list):
+                    value = current + value
+                self._put(conn, key, value)  # Overwrite if types differ
         print(f"Merged external knowledge into Shared Knowledge Base.")
 
     def load_knowledge(self) -> Dict:
         """
-        Load the shared knowledge base from a file.
+        Load the whole shared knowledge base as a dictionary.
         """
-        try:
-            with open(self.filepath, "r") as file:
-                return json.load(file)
-        except FileNotFoundError:
-            return {}
+        self.flush()
+        with self._lock:
+            rows = self.conn.execute("SELECT key, value FROM entries").fetchall()
+        return {key: json.loads(value) for key, value in rows}
 
-    def save_knowledge(self) -> None:
-        """
-        Save the shared knowledge base to a file.
-        """
-        with open(self.filepath, "w") as file:
-            json.dump(self.knowledge, file, indent=4)
+    def close(self) -> None:
+        if self.buffer is not None:
+            self.buffer.close()
+        with self._embed_cond:
+            self._embed_closed = True
+            self._embed_cond.notify_all()
+        if self._embed_thread is not None:
+            self._embed_thread.join()
+        with self._lock:
+            self.conn.close()
@@ -0,0 +1,73 @@
+import hashlib
+import json
+from typing import Any, Dict, Iterator, List, Tuple
+
+
+def canonical_json(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def chunk_hash(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def _put(chunks: Dict[str, str], value: Any) -> str:
+    text = canonical_json(value)
+    digest = chunk_hash(text)
+    chunks[digest] = text
+    return digest
+
+
+def _encode_value(value: Any, chunks: Dict[str, str], list_chunk_size: int) -> Dict[str, Any]:
+    if isinstance(value, list) and len(value) > list_chunk_size:
+        # Fixed-size runs: appending to a long list only produces one new chunk
+        return {
+            "list": [_put(chunks, value[i:i + list_chunk_size]) for i in range(0, len(value), list_chunk_size)],
+        }
+    return {"chunk": _put(chunks, value)}
+
+
+def encode_state(state: Any, list_chunk_size: int = 256) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """
+    Split a service state into content-addressed chunks.
+
+    Dict states get one reference per top-level key, long lists are cut into
+    runs of `list_chunk_size` items, and anything else is a single chunk.
+    Returns the reference tree and the chunks it needs, by hash.
+    """
+    chunks: Dict[str, str] = {}
+    if isinstance(state, dict):
+        ref = {"keys": {str(key): _encode_value(value, chunks, list_chunk_size) for key, value in state.items()}}
+    else:
+        ref = {"value": _encode_value(state, chunks, list_chunk_size)}
+    return ref, chunks
+
+
+def _decode_value(ref: Dict[str, Any], chunks: Dict[str, str]) -> Any:
+    if "list" in ref:
+        items: List[Any] = []
+        for digest in ref["list"]:
+            items.extend(json.loads(chunks[digest]))
+        return items
+    return json.loads(chunks[ref["chunk"]])
+
+
+def decode_state(ref: Dict[str, Any], chunks: Dict[str, str]) -> Any:
+    """
+    Rebuild a state from its reference tree; `chunks` must hold every hash it uses.
+    """
+    if "keys" in ref:
+        return {key: _decode_value(value, chunks) for key, value in ref["keys"].items()}
+    return _decode_value(ref["value"], chunks)
+
+
+def ref_hashes(ref: Dict[str, Any]) -> Iterator[str]:
+    """
+    Every chunk hash a reference tree points to.
+    """
+    values = ref["keys"].values() if "keys" in ref else [ref["value"]]
+    for value in values:
+        if "list" in value:
+            yield from value["list"]
+        else:
+            yield value["chunk"]
@@ -0,0 +1,185 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional, Union
+
+OVERFLOW_POLICIES = ("block", "drop_oldest", "drop_newest", "coalesce")
+
+CoalesceKey = Union[str, Callable[[Any], Optional[Hashable]]]
+
+
+class SubscriberQueue:
+    """
+    Bounded queue feeding a single subscriber, with a configurable overflow policy.
+
+    - block: publishers wait until the subscriber frees a slot.
+    - drop_oldest: the oldest pending event is discarded to make room.
+    - drop_newest: the incoming event is discarded.
+    - coalesce: an event replaces the pending event with the same key; events with
+      a new key wait for a free slot like "block".
+    """
+    def __init__(self, maxsize: int = 1000, overflow: str = "block", coalesce_key: Optional[CoalesceKey] = None):
+        if maxsize < 1:
+            raise ValueError("Queue size must be at least 1.")
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy '{overflow}'. Expected one of {OVERFLOW_POLICIES}.")
+        if overflow == "coalesce" and coalesce_key is None:
+            raise ValueError("The 'coalesce' overflow policy requires a coalesce_key.")
+
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.coalesce_key = coalesce_key
+        # Entries are mutable [key, data, enqueued_at] lists so coalescing can update them in place
+        self._entries: Deque[List[Any]] = deque()
+        self._by_key: Dict[Hashable, List[Any]] = {}
+        self._not_empty = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self._not_full.set()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._unfinished = 0
+
+        self.enqueued = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.max_depth = 0
+        self.last_latency = 0.0
+        self.max_latency = 0.0
+        self.avg_latency = 0.0
+
+    def qsize(self) -> int:
+        return len(self._entries)
+
+    def full(self) -> bool:
+        return len(self._entries) >= self.maxsize
+
+    def _key_for(self, data: Any) -> Optional[Hashable]:
+        if self.overflow != "coalesce":
+            return None
+        if callable(self.coalesce_key):
+            return self.coalesce_key(data)
+        return data.get(self.coalesce_key) if isinstance(data, dict) else None
+
+    async def put(self, data: Any) -> bool:
+        """
+        Enqueue an event according to the overflow policy. Returns False if it was dropped.
+        """
+        key = self._key_for(data)
+        if key is not None:
+            pending = self._by_key.get(key)
+            if pending is not None:
+                # Keep the original enqueue time so lag reflects how long the slot has waited
+                pending[1] = data
+                self.coalesced += 1
+                return True
+
+        while self.full():
+            if self.overflow == "drop_newest":
+                self.dropped += 1
+                return False
+            if self.overflow == "drop_oldest":
+                self._discard(self._entries.popleft())
+                self.dropped += 1
+                continue
+            self._not_full.clear()
+            await self._not_full.wait()
+
+        entry = [key, data, time.monotonic()]
+        self._entries.append(entry)
+        if key is not None:
+            self._by_key[key] = entry
+        self._unfinished += 1
+        self._idle.clear()
+        self.enqueued += 1
+        self.max_depth = max(self.max_depth, len(self._entries))
+        self._not_empty.set()
+        return True
+
+    async def get(self) -> List[Any]:
+        """
+        Wait for and remove the next pending entry.
+        """
+        while not self._entries:
+            self._not_empty.clear()
+            await self._not_empty.wait()
+        return self._pop()
+
+    async def get_batch(self, max_items: int, linger_sec: float) -> List[List[Any]]:
+        """
+        Wait for the next entry, then keep collecting until `max_items` entries are
+        available or `linger_sec` has passed.
+        """
+        batch = [await self.get()]
+        deadline = time.monotonic() + linger_sec
+        while len(batch) < max_items:
+            if self._entries:
+                batch.append(self._pop())
+                continue
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            self._not_empty.clear()
+            try:
+                await asyncio.wait_for(self._not_empty.wait(), remaining)
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def _pop(self) -> List[Any]:
+        entry = self._entries.popleft()
+        if entry[0] is not None:
+            self._by_key.pop(entry[0], None)
+        self._not_full.set()
+        return entry
+
+    def _discard(self, entry: List[Any]) -> None:
+        if entry[0] is not None:
+            self._by_key.pop(entry[0], None)
+        self.task_done()
+
+    def task_done(self, latency: Optional[float] = None, failed: bool = False) -> None:
+        if latency is not None:
+            self.delivered += 1
+            self.last_latency = latency
+            self.max_latency = max(self.max_latency, latency)
+            # Exponentially weighted so the average tracks recent behaviour
+            self.avg_latency = latency if self.delivered == 1 else 0.9 * self.avg_latency + 0.1 * latency
+        if failed:
+            self.errors += 1
+        self._unfinished -= 1
+        if self._unfinished <= 0:
+            self._unfinished = 0
+            self._idle.set()
+
+    async def join(self) -> None:
+        """
+        Wait until every enqueued event has been delivered or dropped.
+        """
+        await self._idle.wait()
+
+    def lag(self) -> float:
+        """
+        Age in seconds of the oldest event still waiting for delivery.
+        """
+        if not self._entries:
+            return 0.0
+        return time.monotonic() - self._entries[0][2]
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "depth": len(self._entries),
+            "max_depth": self.max_depth,
+            "capacity": self.maxsize,
+            "overflow": self.overflow,
+            "enqueued": self.enqueued,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "lag_sec": self.lag(),
+            "last_latency_sec": self.last_latency,
+            "avg_latency_sec": self.avg_latency,
+            "max_latency_sec": self.max_latency,
+        }
@@ -0,0 +1,297 @@
+import asyncio
+import inspect
+import json
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from nexus_seed.utils.workflow_registry import REFERENCE_PATTERN, RULE_OPERATORS, CompiledStep, CompiledWorkflow
+
+
+class WorkflowStepError(Exception):
+    def __init__(self, step_id: str, cause: BaseException):
+        super().__init__(f"Step '{step_id}' failed: {cause!r}")
+        self.step_id = step_id
+        self.cause = cause
+
+
+def _lookup(path: str, results: Dict[str, Any], trigger: Dict[str, Any]) -> Any:
+    parts = path.split(".")
+    if parts[0] == "trigger":
+        value, keys = trigger, parts[1:]
+    else:
+        value, keys = results[parts[1]], parts[2:]
+    for key in keys:
+        if isinstance(value, list):
+            value = value[int(key)]
+        elif isinstance(value, dict):
+            value = value[key]
+        else:
+            value = getattr(value, key)
+    return value
+
+
+def _accepts_keyword(function: Callable, name: str) -> bool:
+    try:
+        parameters = inspect.signature(function).parameters.values()
+    except (TypeError, ValueError):
+        return False
+    return any(parameter.name == name or parameter.kind is inspect.Parameter.VAR_KEYWORD for parameter in parameters)
+
+
+def evaluate_rules(rules: List[Dict[str, Any]], params: Dict[str, Any]) -> Optional[Any]:
+    """
+    The action of the first rule whose condition holds, or None. A condition
+    compares the value at its dotted `field` path in `params` (e.g.
+    "stats.cpu_percent") with its `value`; a missing field never matches.
+    """
+    for rule in rules:
+        when = rule["when"]
+        value: Any = params
+        for key in when["field"].split("."):
+            if not isinstance(value, dict) or key not in value:
+                break
+            value = value[key]
+        else:
+            try:
+                if RULE_OPERATORS[when["op"]](value, when["value"]):
+                    return rule["action"]
+            except TypeError:
+                continue
+    return None
+
+
+def resolve_references(value: Any, results: Dict[str, Any], trigger: Dict[str, Any]) -> Any:
+    """
+    Substitute "${steps.<id>...}" and "${trigger...}" references in step params.
+    A string that is a single reference becomes the referenced value itself.
+    """
+    if isinstance(value, str):
+        match = REFERENCE_PATTERN.fullmatch(value)
+        if match:
+            return _lookup(match.group(1), results, trigger)
+        return REFERENCE_PATTERN.sub(lambda m: str(_lookup(m.group(1), results, trigger)), value)
+    if isinstance(value, dict):
+        return {key: resolve_references(item, results, trigger) for key, item in value.items()}
+    if isinstance(value, list):
+        return [resolve_references(item, results, trigger) for item in value]
+    return value
+
+
+class WorkflowEngine:
+    """
+    Runs compiled workflows as dependency graphs.
+
+    A step starts as soon as every step it depends on has completed, with at
+    most `workflow.concurrency` steps of a run in flight; among ready steps,
+    higher `priority` goes first, then list order. Each step's result is
+    available to later steps through references. A failing step is retried up
+    to `retries` times with exponential backoff, each attempt bounded by
+    `timeout_sec`; if it still fails, the run's other steps are cancelled and
+    WorkflowStepError is raised.
+
+    With `persistence`, every run is checkpointed as it goes: each step's
+    completion and result, and, before a non-idempotent step executes, a
+    "started" mark under the step's idempotency key (`<run_id>:<step_id>`).
+    Checkpoints of concurrent steps share one group-committed write. A run
+    passed back in as `resume` skips its completed steps; a non-idempotent
+    step that had started but never completed may already have taken effect,
+    so it is not executed again and the run fails instead. Finished runs are
+    deleted; failed ones are kept with status "failed".
+
+    Steps receive their idempotency key: event steps as `idempotency_key` in
+    the published data, service calls as an `idempotency_key` argument if the
+    method takes one. A step whose receiver dedupes on the key can safely be
+    marked `idempotent: true`, and is then repeated rather than failed.
+    """
+    def __init__(
+        self,
+        event_bus,
+        decide: Optional[Callable[[Dict[str, Any]], Awaitable[Any]]] = None,
+        resolve_service: Optional[Callable[[str], Any]] = None,
+        persistence=None,
+    ):
+        self.event_bus = event_bus
+        self.decide = decide
+        self.resolve_service = resolve_service
+        self.persistence = persistence
+        self.runs = 0
+        self.failed_runs = 0
+        self.steps_run = 0
+        self.step_retries = 0
+        self.step_timeouts = 0
+        self.resumed_runs = 0
+        self.steps_skipped = 0
+        self.checkpoints = 0
+
+    async def run_step(self, step: CompiledStep, params: Dict[str, Any], key: Optional[str] = None) -> Any:
+        """
+        Execute one step with its references already resolved; returns its result.
+        `key` is the step's idempotency key, passed on to its receiver.
+        """
+        if step.type == "event":
+            data = params.get("data", {})
+            if key is not None and isinstance(data, dict):
+                data = {**data, "idempotency_key": key}
+            await self.event_bus.publish(params["event_type"], data)
+            return data
+        if step.type == "service_call":
+            handle = step.handle
+            if handle is None and self.resolve_service is not None:
+                service = self.resolve_service(params["service_name"])
+                handle = getattr(service, params["method_name"], None) if service is not None else None
+            if handle is None:
+                print(f"Service call {params['service_name']}.{params['method_name']} is not available; skipping.")
+                return None
+            args = params.get("args", {})
+            if key is not None and _accepts_keyword(handle, "idempotency_key"):
+                args = {**args, "idempotency_key": key}
+            result = handle(**args)
+            return await result if inspect.isawaitable(result) else result
+        if step.type == "decision":
+            if self.decide is None:
+                print(f"No decision handler for step '{step.id}'; skipping.")
+                return None
+            result = await self.decide(params)
+            print(f"Decision result: {result}")
+            return result
+        message = params.get("message", "")
+        print(message)
+        return message
+
+    async def _execute(self, step: CompiledStep, results: Dict[str, Any], trigger: Dict[str, Any], key: str) -> Any:
+        try:
+            params = resolve_references(step.params, results, trigger)
+        except (KeyError, IndexError, ValueError, AttributeError) as e:
+            raise WorkflowStepError(step.id, e) from e
+        for attempt in range(step.retries + 1):
+            try:
+                if step.timeout_sec is not None:
+                    return await asyncio.wait_for(self.run_step(step, params, key), step.timeout_sec)
+                return await self.run_step(step, params, key)
+            except Exception as e:
+                if isinstance(e, asyncio.TimeoutError):
+                    self.step_timeouts += 1
+                if attempt == step.retries:
+                    raise WorkflowStepError(step.id, e) from e
+                self.step_retries += 1
+                print(f"Step '{step.id}' failed ({e!r}); retrying ({attempt + 1}/{step.retries}).")
+                await asyncio.sleep(step.retry_delay_sec * 2 ** attempt)
+
+    async def _checkpoint(self, run: Dict[str, Any]) -> None:
+        if self.persistence is not None:
+            self.checkpoints += 1
+            # Detached, JSON-safe copy: the run keeps changing while the write is queued
+            await self.persistence.save_workflow_run(run["run_id"], json.loads(json.dumps(run, default=str)))
+
+    async def _fail(self, run: Dict[str, Any], error: BaseException) -> None:
+        self.failed_runs += 1
+        run["status"] = "failed"
+        run["error"] = str(error)
+        try:
+            await self._checkpoint(run)
+        except Exception as e:
+            print(f"Failed to checkpoint workflow run {run['run_id']}: {e}")
+
+    async def run(
+        self,
+        workflow: CompiledWorkflow,
+        trigger: Optional[Dict[str, Any]] = None,
+        on_step_done: Optional[Callable[[CompiledStep, Any], Awaitable[None]]] = None,
+        run_id: Optional[str] = None,
+        resume: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Run every step of `workflow`, or the rest of the checkpointed run
+        `resume`; returns the step results by step id.
+        """
+        self.runs += 1
+        steps = {step.id: step for step in workflow.steps}
+        run = resume or {
+            "run_id": run_id or uuid.uuid4().hex,
+            "workflow": workflow.name,
+            "trigger": trigger or {},
+            "status": "running",
+            "steps": {},
+        }
+        run_id = run["run_id"]
+        trigger = run["trigger"]
+        checkpoints: Dict[str, Dict[str, Any]] = run["steps"]
+
+        results: Dict[str, Any] = {}
+        for step_id, checkpoint in checkpoints.items():
+            if step_id not in steps:
+                continue
+            if checkpoint["status"] == "completed":
+                results[step_id] = checkpoint.get("result")
+            elif not steps[step_id].idempotent:
+                error = WorkflowStepError(step_id, RuntimeError("interrupted while running; not repeated as it is not idempotent"))
+                await self._fail(run, error)
+                raise error
+        if resume is not None:
+            self.resumed_runs += 1
+            self.steps_skipped += len(results)
+            print(f"Resuming workflow run {run_id} ({workflow.name}); {len(results)} steps already completed.")
+        else:
+            await self._checkpoint(run)
+
+        waiting = {step.id: set(step.depends_on) - set(results) for step in workflow.steps if step.id not in results}
+        dependents: Dict[str, List[str]] = {step.id: [] for step in workflow.steps}
+        for step in workflow.steps:
+            for dependency in step.depends_on:
+                dependents[dependency].append(step.id)
+
+        ready = [step_id for step_id, deps in waiting.items() if not deps]
+        running: Dict[asyncio.Future, str] = {}
+        limit = max(1, workflow.concurrency)
+        try:
+            while ready or running:
+                ready.sort(key=lambda step_id: (-steps[step_id].priority, steps[step_id].index))
+                launch = []
+                while ready and len(running) + len(launch) < limit:
+                    launch.append(steps[ready.pop(0)])
+                unsafe = [step for step in launch if not step.idempotent]
+                for step in unsafe:
+                    checkpoints[step.id] = {"status": "started", "key": f"{run_id}:{step.id}"}
+                if unsafe:
+                    # Durable before the step can take effect
+                    await self._checkpoint(run)
+                for step in launch:
+                    running[asyncio.ensure_future(self._execute(step, results, trigger, f"{run_id}:{step.id}"))] = step.id
+
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    step_id = running.pop(task)
+                    results[step_id] = task.result()
+                    checkpoints[step_id] = {"status": "completed", "key": f"{run_id}:{step_id}", "result": results[step_id]}
+                    self.steps_run += 1
+                    if on_step_done is not None:
+                        await on_step_done(steps[step_id], results[step_id])
+                    for dependent in dependents[step_id]:
+                        waiting[dependent].discard(step_id)
+                        if not waiting[dependent]:
+                            ready.append(dependent)
+                await self._checkpoint(run)
+        except asyncio.CancelledError:
+            # Shutting down: the run stays "running" and is resumed on restart
+            raise
+        except Exception as e:
+            await self._fail(run, e)
+            raise
+        finally:
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+        if self.persistence is not None:
+            await self.persistence.delete_workflow_run(run_id)
+        return results
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "runs": self.runs,
+            "failed_runs": self.failed_runs,
+            "steps_run": self.steps_run,
+            "step_retries": self.step_retries,
+            "step_timeouts": self.step_timeouts,
+            "resumed_runs": self.resumed_runs,
+            "steps_skipped": self.steps_skipped,
+            "checkpoints": self.checkpoints,
+        }
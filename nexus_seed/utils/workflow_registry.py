@@ -0,0 +1,355 @@
+import asyncio
+import copy
+import operator
+import os
+import re
+import threading
+import yaml
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+WORKFLOW_EXTENSIONS = (".yaml", ".yml", ".json")
+
+# Params each step type needs before a workflow is accepted
+REQUIRED_STEP_PARAMS: Dict[str, Tuple[str, ...]] = {
+    "event": ("event_type",),
+    "service_call": ("service_name", "method_name"),
+    "decision": ("type",),
+    "log": (),
+}
+
+
+# Comparisons a rule_based decision's rules may use: {"field": ..., "op": ..., "value": ...}
+RULE_OPERATORS: Dict[str, Callable[[Any, Any], bool]] = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "in": lambda left, right: left in right,
+}
+
+# Step types that can be repeated without side effects, unless a step says otherwise
+IDEMPOTENT_STEP_TYPES = ("decision", "log")
+
+DEFAULT_CONCURRENCY = 4
+
+# "${steps.<id>}" or "${steps.<id>.<key>...}" refers to an earlier step's result,
+# "${trigger.<key>...}" to the event that triggered the workflow
+REFERENCE_PATTERN = re.compile(r"\$\{((?:steps|trigger)(?:\.[\w-]+)*)\}")
+
+
+class WorkflowError(ValueError):
+    pass
+
+
+class CompiledStep:
+    """
+    A validated workflow step, with its service method resolved ahead of time
+    for service calls, and the ids of the steps it waits for.
+    """
+    __slots__ = (
+        "index", "id", "type", "params", "handle", "depends_on",
+        "retries", "retry_delay_sec", "timeout_sec", "priority", "idempotent",
+    )
+
+    def __init__(
+        self,
+        index: int,
+        step_id: str,
+        step_type: str,
+        params: Dict[str, Any],
+        handle: Optional[Callable] = None,
+        depends_on: Tuple[str, ...] = (),
+        retries: int = 0,
+        retry_delay_sec: float = 0.5,
+        timeout_sec: Optional[float] = None,
+        priority: int = 0,
+        idempotent: bool = False,
+    ):
+        self.index = index
+        self.id = step_id
+        self.type = step_type
+        self.params = params
+        self.handle = handle
+        self.depends_on = depends_on
+        self.retries = retries
+        self.retry_delay_sec = retry_delay_sec
+        self.timeout_sec = timeout_sec
+        self.priority = priority
+        # Safe to run again if a run was interrupted while it was executing
+        self.idempotent = idempotent
+
+
+class CompiledWorkflow:
+    __slots__ = ("name", "path", "version", "definition", "steps", "alignment", "concurrency")
+
+    def __init__(self, name: str, path: str, version: Tuple[float, int], definition: Dict[str, Any], steps: List[CompiledStep]):
+        self.name = name
+        self.path = path
+        # (mtime, size) of the file it was compiled from
+        self.version = version
+        self.definition = definition
+        self.steps = tuple(steps)
+        self.alignment = definition.get("alignment", [])
+        self.concurrency = int(definition.get("concurrency", DEFAULT_CONCURRENCY))
+
+
+def references(value: Any) -> Iterator[str]:
+    """
+    Every "${...}" reference path in a (nested) step parameter value.
+    """
+    if isinstance(value, str):
+        yield from REFERENCE_PATTERN.findall(value)
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from references(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from references(item)
+
+
+def _check_acyclic(name: str, steps: List[CompiledStep]) -> None:
+    remaining = {step.id: set(step.depends_on) for step in steps}
+    while remaining:
+        ready = [step_id for step_id, deps in remaining.items() if not deps]
+        if not ready:
+            raise WorkflowError(f"Workflow '{name}' has a dependency cycle among steps {sorted(remaining)}.")
+        for step_id in ready:
+            remaining.pop(step_id)
+        for deps in remaining.values():
+            deps.difference_update(ready)
+
+
+def _check_rules(name: str, index: int, rules: Any) -> None:
+    if not isinstance(rules, list):
+        raise WorkflowError(f"Workflow '{name}' step {index} rules must be a list.")
+    for rule in rules:
+        when = rule.get("when") if isinstance(rule, dict) else None
+        if (
+            not isinstance(when, dict)
+            or "action" not in rule
+            or not isinstance(when.get("field"), str)
+            or when.get("op") not in RULE_OPERATORS
+            or "value" not in when
+        ):
+            raise WorkflowError(
+                f"Workflow '{name}' step {index} has an invalid rule {rule!r}: expected"
+                f" {{'when': {{'field', 'op', 'value'}}, 'action'}} with op one of {list(RULE_OPERATORS)}."
+            )
+
+
+def compile_workflow(
+    name: str,
+    definition: Any,
+    path: str = "",
+    version: Tuple[float, int] = (0.0, 0),
+    resolve_service: Optional[Callable[[str], Any]] = None,
+) -> CompiledWorkflow:
+    """
+    Validate a parsed workflow definition and compile its steps.
+
+    Steps may name the steps they wait for in `depends_on`; a step that refers
+    to another's result also waits for it. If no step declares `depends_on`,
+    the workflow runs sequentially in list order, as before. Raises
+    WorkflowError if the definition is malformed or its dependencies form a cycle.
+    """
+    if not isinstance(definition, dict) or not isinstance(definition.get("steps"), list):
+        raise WorkflowError(f"Workflow '{name}' must be a mapping with a 'steps' list.")
+    sequential = not any(isinstance(step, dict) and "depends_on" in step for step in definition["steps"])
+    steps: List[CompiledStep] = []
+    for index, step in enumerate(definition["steps"]):
+        if not isinstance(step, dict):
+            raise WorkflowError(f"Workflow '{name}' step {index} is not a mapping.")
+        step_type = step.get("type")
+        if step_type not in REQUIRED_STEP_PARAMS:
+            raise WorkflowError(f"Workflow '{name}' step {index} has unknown type '{step_type}'.")
+        params = step.get("params") or {}
+        missing = [key for key in REQUIRED_STEP_PARAMS[step_type] if key not in params]
+        if missing:
+            raise WorkflowError(f"Workflow '{name}' step {index} ({step_type}) is missing params {missing}.")
+        if step_type == "decision" and params["type"] == "rule_based":
+            _check_rules(name, index, params.get("rules", []))
+        handle = None
+        if step_type == "service_call" and resolve_service is not None:
+            service = resolve_service(params["service_name"])
+            handle = getattr(service, params["method_name"], None) if service is not None else None
+
+        step_id = str(step.get("id", f"step_{index}"))
+        if any(existing.id == step_id for existing in steps):
+            raise WorkflowError(f"Workflow '{name}' has more than one step with id '{step_id}'.")
+        depends_on = step.get("depends_on") or []
+        if isinstance(depends_on, str):
+            depends_on = [depends_on]
+        if sequential and steps:
+            depends_on = [steps[-1].id]
+        depends_on = list(dict.fromkeys(
+            [str(dep) for dep in depends_on]
+            + [path.split(".")[1] for path in references(params) if path.startswith("steps.") and "." in path]
+        ))
+        try:
+            steps.append(CompiledStep(
+                index,
+                step_id,
+                step_type,
+                params,
+                handle,
+                depends_on=tuple(depends_on),
+                retries=int(step.get("retries", 0)),
+                retry_delay_sec=float(step.get("retry_delay_sec", 0.5)),
+                timeout_sec=float(step["timeout_sec"]) if step.get("timeout_sec") is not None else None,
+                priority=int(step.get("priority", 0)),
+                idempotent=bool(step.get("idempotent", step_type in IDEMPOTENT_STEP_TYPES)),
+            ))
+        except (TypeError, ValueError) as e:
+            raise WorkflowError(f"Workflow '{name}' step '{step_id}' has an invalid setting: {e}")
+
+    ids = {step.id for step in steps}
+    for step in steps:
+        unknown = [dep for dep in step.depends_on if dep not in ids]
+        if unknown:
+            raise WorkflowError(f"Workflow '{name}' step '{step.id}' depends on unknown steps {unknown}.")
+    _check_acyclic(name, steps)
+    return CompiledWorkflow(name, path, version, definition, steps)
+
+
+def workflow_name(filename: str) -> str:
+    """
+    Registry name of a workflow file, e.g. "system_monitoring" for "system_monitoring.yaml".
+    """
+    root, extension = os.path.splitext(filename)
+    return root if extension in WORKFLOW_EXTENSIONS else filename
+
+
+class WorkflowRegistry:
+    """
+    Workflow definitions from `workflows_dir`, parsed and compiled once.
+
+    Lookups never touch the filesystem. `refresh()` re-stats the directory and
+    recompiles only files whose mtime or size changed; `watch()` does so every
+    `poll_interval_sec`. A new set of workflows is built aside and swapped in
+    with a single assignment, so a lookup sees either the old or the new
+    version, never a mix. A file that fails to parse or validate keeps its
+    previous compiled version. Refreshes and recompiles are serialized, so the
+    watcher thread and direct calls (e.g. after saving a workflow) do not race.
+    """
+    def __init__(
+        self,
+        workflows_dir: str,
+        resolve_service: Optional[Callable[[str], Any]] = None,
+        poll_interval_sec: float = 2.0,
+    ):
+        self.workflows_dir = workflows_dir
+        self.resolve_service = resolve_service
+        self.poll_interval_sec = poll_interval_sec
+        self._workflows: Optional[Dict[str, CompiledWorkflow]] = None
+        self.generation = 0
+        self.compiled = 0
+        self.errors: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def _scan(self) -> Dict[str, Tuple[str, Tuple[float, int]]]:
+        files = {}
+        try:
+            entries = list(os.scandir(self.workflows_dir))
+        except FileNotFoundError:
+            print(f"Workflows directory not found: {self.workflows_dir}")
+            return files
+        for entry in entries:
+            if entry.name.endswith(WORKFLOW_EXTENSIONS) and entry.is_file():
+                stat = entry.stat()
+                files[workflow_name(entry.name)] = (entry.path, (stat.st_mtime, stat.st_size))
+        return files
+
+    def refresh(self) -> bool:
+        """
+        Recompile changed workflow files; returns True if anything changed.
+        """
+        with self._lock:
+            return self._refresh()
+
+    def _refresh(self) -> bool:
+        current = self._workflows or {}
+        updated: Dict[str, CompiledWorkflow] = {}
+        changed = self._workflows is None
+        files = self._scan()
+        for name in set(self.errors) - set(files):
+            self.errors.pop(name)
+        for name, (path, version) in files.items():
+            previous = current.get(name)
+            if previous is not None and previous.path == path and previous.version == version:
+                updated[name] = previous
+                continue
+            try:
+                with open(path, "r") as file:
+                    definition = yaml.safe_load(file)
+                updated[name] = compile_workflow(name, definition, path, version, self.resolve_service)
+                self.errors.pop(name, None)
+                self.compiled += 1
+                changed = True
+            except (OSError, yaml.YAMLError, ValueError, TypeError) as e:
+                if self.errors.get(name) != str(e):
+                    print(f"Error loading workflow '{name}': {e}")
+                self.errors[name] = str(e)
+                if previous is not None:
+                    updated[name] = previous
+        if set(updated) != set(current):
+            changed = True
+        if changed:
+            self._workflows = updated
+            self.generation += 1
+        return changed
+
+    def _loaded(self) -> Dict[str, CompiledWorkflow]:
+        if self._workflows is None:
+            self.refresh()
+        return self._workflows
+
+    def get(self, name: str) -> Optional[CompiledWorkflow]:
+        """
+        The compiled workflow called `name` (the file extension is optional).
+        """
+        return self._loaded().get(workflow_name(name))
+
+    def names(self) -> List[str]:
+        return sorted(self._loaded())
+
+    def definitions(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Copies of the parsed definitions by name, safe for callers to modify.
+        """
+        return {name: copy.deepcopy(workflow.definition) for name, workflow in self._loaded().items()}
+
+    def recompile(self) -> None:
+        """
+        Recompile every workflow, e.g. once the services they call are available.
+        """
+        with self._lock:
+            if self._workflows is None:
+                self._refresh()
+            self._workflows = {
+                name: compile_workflow(name, workflow.definition, workflow.path, workflow.version, self.resolve_service)
+                for name, workflow in self._workflows.items()
+            }
+            self.generation += 1
+
+    async def watch(self) -> None:
+        """
+        Poll `workflows_dir` for changes until cancelled.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                if await loop.run_in_executor(None, self.refresh):
+                    print(f"Workflows reloaded (generation {self.generation}): {self.names()}")
+            except Exception as e:
+                print(f"Error watching workflows: {e}")
+            await asyncio.sleep(self.poll_interval_sec)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "workflows": len(self._workflows or {}),
+            "generation": self.generation,
+            "compiled": self.compiled,
+            "errors": dict(self.errors),
+        }
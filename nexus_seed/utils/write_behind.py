@@ -0,0 +1,209 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+
+class PartialWriteError(Exception):
+    """
+    Raised by a flush function that wrote only the first `written` items of a
+    group before failing, so the retry resumes after them.
+    """
+    def __init__(self, written: int, cause: BaseException):
+        super().__init__(f"Wrote {written} items before failing: {cause}")
+        self.written = written
+        self.cause = cause
+
+
+class WriteBehindError(RuntimeError):
+    pass
+
+
+class WriteBehindBuffer:
+    """
+    Collects writes in memory and hands them to `flush_fn` in groups from a
+    background thread, so callers never wait on disk.
+
+    A group is flushed when `max_pending` writes are waiting or
+    `flush_interval_sec` has passed since the first one. With `coalesce_key`,
+    a pending write is replaced by a newer one with the same key, and
+    `pending_value(key)` lets readers see writes that are not yet on disk.
+    `flush()` blocks until everything submitted before it has been written,
+    at most `flush_timeout_sec` by default. If `flush_fn` fails, the group is
+    kept and retried on the next interval; a `flush()` that runs out of time
+    while writes are still failing raises WriteBehindError with the failure as
+    its cause. A flush function that raises PartialWriteError has the items it
+    did write dropped from the retry.
+    """
+    def __init__(
+        self,
+        flush_fn: Callable[[List[Any]], None],
+        name: str = "write-behind",
+        max_pending: int = 256,
+        flush_interval_sec: float = 0.5,
+        coalesce_key: Optional[Callable[[Any], Hashable]] = None,
+        flush_timeout_sec: float = 30.0,
+    ):
+        self.flush_fn = flush_fn
+        self.name = name
+        self.max_pending = max_pending
+        self.flush_interval_sec = flush_interval_sec
+        self.coalesce_key = coalesce_key
+        self.flush_timeout_sec = flush_timeout_sec
+        self._pending: "OrderedDict[Hashable, Any]" = OrderedDict()
+        # The group being written; still visible to pending_value() until it is on disk
+        self._in_flight: Dict[Hashable, Any] = {}
+        self._condition = threading.Condition()
+        self._submitted_seq = 0
+        self._flushed_seq = 0
+        self._first_pending_at: Optional[float] = None
+        self._flush_requested = False
+        self._closed = False
+
+        self.submitted = 0
+        self.coalesced = 0
+        self.written = 0
+        self.group_commits = 0
+        self.failed_commits = 0
+        self.last_commit_sec = 0.0
+        self.max_commit_sec = 0.0
+        self.last_error: Optional[BaseException] = None
+
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, item: Any) -> None:
+        with self._condition:
+            if self._closed:
+                raise RuntimeError(f"{self.name} is closed.")
+            self._submitted_seq += 1
+            self.submitted += 1
+            if self.coalesce_key is not None:
+                key = self.coalesce_key(item)
+                if key in self._pending:
+                    self.coalesced += 1
+                    # Keep the original position so the write order of other keys is preserved
+                    self._pending[key] = item
+                    return
+            else:
+                key = self._submitted_seq
+            self._pending[key] = item
+            if self._first_pending_at is None:
+                self._first_pending_at = time.monotonic()
+            if len(self._pending) >= self.max_pending:
+                self._condition.notify_all()
+
+    def pending_value(self, key: Hashable, default: Any = None) -> Any:
+        with self._condition:
+            if key in self._pending:
+                return self._pending[key]
+            return self._in_flight.get(key, default)
+
+    def pending_items(self) -> List[Any]:
+        with self._condition:
+            return list(self._pending.values())
+
+    def _due(self) -> bool:
+        if not self._pending:
+            return False
+        if self._flush_requested or self._closed or len(self._pending) >= self.max_pending:
+            return True
+        return time.monotonic() - self._first_pending_at >= self.flush_interval_sec
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._due():
+                    if self._closed and not self._pending:
+                        return
+                    timeout = None
+                    if self._pending:
+                        timeout = max(0.0, self._first_pending_at + self.flush_interval_sec - time.monotonic())
+                    self._condition.wait(timeout)
+                batch: List[Tuple[Hashable, Any]] = list(self._pending.items())
+                self._in_flight = dict(batch)
+                self._pending.clear()
+                self._first_pending_at = None
+                seq = self._submitted_seq
+            started = time.monotonic()
+            try:
+                self.flush_fn([item for _, item in batch])
+            except Exception as e:
+                written = e.written if isinstance(e, PartialWriteError) else 0
+                print(f"{self.name}: failed to write {len(batch) - written} pending items, will retry: {e}")
+                with self._condition:
+                    self._in_flight = {}
+                    self.failed_commits += 1
+                    self.last_error = e
+                    self.written += written
+                    # Items already written are not written again
+                    batch = batch[written:]
+                    # Put the group back in front of anything submitted meanwhile
+                    for key, item in reversed(batch):
+                        if key not in self._pending:
+                            self._pending[key] = item
+                            self._pending.move_to_end(key, last=False)
+                    self._first_pending_at = time.monotonic()
+                    if self._closed:
+                        # Do not spin on a persistent failure during shutdown
+                        self._condition.notify_all()
+                        return
+                    self._flush_requested = False
+                    self._condition.notify_all()
+                continue
+            elapsed = time.monotonic() - started
+            with self._condition:
+                self._in_flight = {}
+                self.written += len(batch)
+                self.group_commits += 1
+                self.last_commit_sec = elapsed
+                self.max_commit_sec = max(self.max_commit_sec, elapsed)
+                self.last_error = None
+                self._flushed_seq = max(self._flushed_seq, seq)
+                if not self._pending:
+                    self._flush_requested = False
+                self._condition.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Write everything submitted so far and wait for it, at most `timeout`
+        (default `flush_timeout_sec`). Returns False on timeout, or raises
+        WriteBehindError if the writes were still failing when it expired.
+        """
+        if timeout is None:
+            timeout = self.flush_timeout_sec
+        with self._condition:
+            target = self._submitted_seq
+            if not self._pending and self._flushed_seq >= target:
+                return True
+            self._flush_requested = True
+            self._condition.notify_all()
+            if self._condition.wait_for(lambda: self._flushed_seq >= target or not self._thread.is_alive(), timeout):
+                if self._flushed_seq >= target:
+                    return True
+            if self.last_error is not None:
+                raise WriteBehindError(
+                    f"{self.name}: {len(self._pending)} items could not be written: {self.last_error}"
+                ) from self.last_error
+            return False
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join(timeout)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._condition:
+            return {
+                "pending": len(self._pending),
+                "submitted": self.submitted,
+                "coalesced": self.coalesced,
+                "written": self.written,
+                "group_commits": self.group_commits,
+                "failed_commits": self.failed_commits,
+                "avg_group_size": self.written / self.group_commits if self.group_commits else 0.0,
+                "last_commit_sec": self.last_commit_sec,
+                "max_commit_sec": self.max_commit_sec,
+                "last_error": str(self.last_error) if self.last_error is not None else None,
+            }
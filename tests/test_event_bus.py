@@ -1,6 +1,7 @@
 import pytest
 import asyncio
 from nexus_seed.utils.event_bus import EventBus
+from nexus_seed.utils.event_transports import SharedMemoryTransport, transport_from_peer_spec
 
 @pytest.fixture
 def event_bus():
@@ -19,3 +20,151 @@ async def test_event_subscription_and_publish(event_bus):
     await asyncio.sleep(0.1)  # Allow time for async callback
     assert len(results) == 1
     assert results[0] == {"key": "value"}
+
+@pytest.mark.asyncio
+async def test_wildcard_subscriptions(event_bus):
+    single, multi = [], []
+
+    async def on_single(event):
+        single.append(event)
+
+    async def on_multi(event):
+        multi.append(event)
+
+    await event_bus.subscribe("core.*", on_single)
+    await event_bus.subscribe("agent.#", on_multi)
+    await event_bus.publish("core.cpu", {"n": 1})
+    await event_bus.publish("core.cpu.high", {"n": 2})
+    await event_bus.publish("agent", {"n": 3})
+    await event_bus.publish("agent.tony.status", {"n": 4})
+
+    assert single == [{"n": 1}]
+    assert multi == [{"n": 3}, {"n": 4}]
+
+@pytest.mark.asyncio
+async def test_unsubscribe_invalidates_resolution(event_bus):
+    results = []
+
+    async def callback(event):
+        results.append(event)
+
+    await event_bus.subscribe("core.#", callback)
+    await event_bus.publish("core.event", {"n": 1})
+    await event_bus.unsubscribe("core.#", callback)
+    await event_bus.publish("core.event", {"n": 2})
+
+    assert results == [{"n": 1}]
+
+@pytest.mark.asyncio
+async def test_queued_subscriber_does_not_block_publisher(event_bus):
+    release = asyncio.Event()
+    results = []
+
+    async def slow_callback(event):
+        await release.wait()
+        results.append(event["n"])
+
+    await event_bus.subscribe("slow", slow_callback, mode="queued", queue_size=2, overflow="drop_oldest")
+    for n in range(5):
+        await asyncio.wait_for(event_bus.publish("slow", {"n": n}), timeout=1)
+    await asyncio.sleep(0)
+    release.set()
+    await event_bus.drain()
+
+    metrics = event_bus.get_metrics()["slow"][0]
+    assert results == [0, 3, 4]
+    assert metrics["dropped"] == 2
+    assert metrics["delivered"] == 3
+    await event_bus.close()
+
+@pytest.mark.asyncio
+async def test_queued_subscriber_coalesces_by_key(event_bus):
+    release = asyncio.Event()
+    results = []
+
+    async def callback(event):
+        await release.wait()
+        results.append(event)
+
+    await event_bus.subscribe("metrics", callback, mode="queued", overflow="coalesce", coalesce_key="name")
+    await event_bus.publish("metrics", {"name": "cpu", "value": 1})
+    await asyncio.sleep(0)
+    await event_bus.publish("metrics", {"name": "cpu", "value": 2})
+    await event_bus.publish("metrics", {"name": "cpu", "value": 3})
+    await event_bus.publish("metrics", {"name": "mem", "value": 4})
+    release.set()
+    await event_bus.drain()
+
+    assert results == [{"name": "cpu", "value": 1}, {"name": "cpu", "value": 3}, {"name": "mem", "value": 4}]
+    await event_bus.close()
+
+@pytest.mark.asyncio
+async def test_publish_many_delivers_batches(event_bus):
+    batches = []
+    singles = []
+
+    async def on_batch(events):
+        batches.append([event["n"] for event in events])
+
+    async def on_single(event):
+        singles.append(event["n"])
+
+    await event_bus.subscribe("metrics", on_batch, batch=True, max_batch_size=3, max_linger_sec=0.01)
+    await event_bus.subscribe("metrics", on_single)
+    await event_bus.publish_many("metrics", [{"n": n} for n in range(5)])
+    await event_bus.drain()
+
+    assert batches == [[0, 1, 2], [3, 4]]
+    assert singles == [0, 1, 2, 3, 4]
+    await event_bus.close()
+
+@pytest.mark.asyncio
+async def test_shared_memory_transport_forwards_by_interest():
+    hub_transport = SharedMemoryTransport(channel_capacity=64 * 1024)
+    hub = EventBus(transport=hub_transport)
+    await hub.start()
+    peer = EventBus(transport=transport_from_peer_spec(hub_transport.peer_spec()))
+    await peer.start()
+    received = []
+
+    async def on_peer_event(event):
+        received.append(event)
+
+    await peer.subscribe("agent.#", on_peer_event)
+    for _ in range(100):
+        if hub_transport.channels[0].interest.matches("agent.tony"):
+            break
+        await asyncio.sleep(0.01)
+
+    await hub.publish("agent.tony", {"status": "ready"})
+    await hub.publish("core.ignored", {"status": "not forwarded"})
+    for _ in range(100):
+        if received:
+            break
+        await asyncio.sleep(0.01)
+
+    assert received == [{"status": "ready"}]
+    await peer.close()
+    await hub.close()
+
+@pytest.mark.asyncio
+async def test_subscribers_run_concurrently_by_default(event_bus):
+    started = []
+
+    async def slow(event):
+        started.append(event["n"])
+        await asyncio.sleep(0.1)
+
+    for _ in range(3):
+        await event_bus.subscribe("work", slow)
+    began = asyncio.get_running_loop().time()
+    await event_bus.publish("work", {"n": 1})
+    assert started == [1, 1, 1]
+    assert asyncio.get_running_loop().time() - began < 0.2
+
+    # Inline delivery is opt-in and runs one subscriber after another
+    await event_bus.subscribe("inline_work", slow, mode="inline")
+    await event_bus.subscribe("inline_work", slow, mode="inline")
+    began = asyncio.get_running_loop().time()
+    await event_bus.publish("inline_work", {"n": 2})
+    assert asyncio.get_running_loop().time() - began >= 0.2
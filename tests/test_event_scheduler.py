@@ -0,0 +1,60 @@
+import pytest
+import asyncio
+from nexus_seed.utils.event_scheduler import EventScheduler
+
+async def drain(scheduler):
+    events = []
+    while not scheduler.empty():
+        events.append(await scheduler.get())
+        scheduler.task_done()
+    return events
+
+@pytest.mark.asyncio
+async def test_control_events_overtake_bulk_traffic():
+    scheduler = EventScheduler()
+    for i in range(3):
+        await scheduler.put({"type": "workflow_backup", "params": {"i": i}})
+    await scheduler.put({"type": "core_shutdown"})
+    await scheduler.put({"type": "metrics_sample"})
+
+    events = await drain(scheduler)
+    assert [event["type"] for event in events] == [
+        "core_shutdown", "metrics_sample", "workflow_backup", "workflow_backup", "workflow_backup",
+    ]
+    await scheduler.join()
+
+@pytest.mark.asyncio
+async def test_deadlines_and_fair_turns_within_a_class():
+    scheduler = EventScheduler()
+    await scheduler.put({"type": "core_a", "id": "late", "deadline_sec": 5})
+    await scheduler.put({"type": "core_a", "id": "urgent", "deadline_sec": 0.01})
+    await scheduler.put({"type": "core_a", "id": "third"})
+    await scheduler.put({"type": "core_b", "id": "other"})
+
+    assert [event["id"] for event in await drain(scheduler)] == ["urgent", "other", "third", "late"]
+
+@pytest.mark.asyncio
+async def test_waiting_bulk_events_age_past_control_traffic():
+    scheduler = EventScheduler(aging_sec=0.05)
+    await scheduler.put({"type": "workflow_report"})
+    await asyncio.sleep(0.15)
+    await scheduler.put({"type": "core_tick"})
+
+    assert (await scheduler.get())["type"] == "workflow_report"
+    assert scheduler.get_stats()["aged_dispatches"] == 1
+
+@pytest.mark.asyncio
+async def test_far_deadlines_age_within_a_type():
+    scheduler = EventScheduler(aging_sec=0.05)
+    await scheduler.put({"type": "core_a", "id": "patient", "deadline_sec": 3600})
+    await asyncio.sleep(0.1)
+    await scheduler.put({"type": "core_a", "id": "urgent", "deadline_sec": 0.01})
+    assert (await scheduler.get())["id"] == "patient"
+
+@pytest.mark.asyncio
+async def test_malformed_deadline_does_not_leak_a_slot():
+    scheduler = EventScheduler(maxsize=1)
+    with pytest.raises(ValueError):
+        await scheduler.put({"type": "core_a", "deadline_sec": "soon"})
+    await asyncio.wait_for(scheduler.put({"type": "core_a"}), 0.1)
+    assert scheduler.qsize() == 1
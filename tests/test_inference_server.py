@@ -0,0 +1,101 @@
+import asyncio
+import pytest
+from nexus_seed.services.inference_server import InferenceServer
+from nexus_seed.utils.model_registry import ModelRegistry
+from nexus_seed.utils.response_cache import ResponseCache
+
+class RecordingInferenceServer(InferenceServer):
+    """
+    Replaces the model call so batching can be tested without loading weights.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.batch_sizes = []
+
+    def _generate_batch(self, tokenizer, model, prompts, params):
+        self.batch_sizes.append(len(prompts))
+        return [f"{prompt} -> {params['max_length']}" for prompt in prompts]
+
+    def _generate_streaming(self, tokenizer, model, prompt, max_length, params, on_text, cancelled):
+        for piece in ("Hello", ", ", "world"):
+            if cancelled.is_set():
+                return
+            on_text(piece)
+
+@pytest.fixture
+def registry():
+    registry = ModelRegistry()
+    registry.register("causal_lm:fake", lambda: (None, None))
+    return registry
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_are_batched(registry):
+    server = RecordingInferenceServer(registry, max_batch_size=4, max_wait_sec=0.05)
+    results = await asyncio.gather(*(server.generate("causal_lm:fake", f"p{i}", max_length=20) for i in range(6)))
+
+    assert results == [f"p{i} -> 20" for i in range(6)]
+    assert server.batch_sizes == [4, 2]
+    await server.stop()
+
+@pytest.mark.asyncio
+async def test_requests_with_different_settings_are_not_mixed(registry):
+    server = RecordingInferenceServer(registry, max_batch_size=8, max_wait_sec=0.05)
+    results = await asyncio.gather(
+        server.generate("causal_lm:fake", "a", max_length=50),
+        server.generate("causal_lm:fake", "b", max_length=100),
+        server.generate("causal_lm:fake", "c", max_length=50),
+    )
+
+    assert results == ["a -> 50", "b -> 100", "c -> 50"]
+    assert sorted(server.batch_sizes) == [1, 2]
+    assert server.get_stats()["requests"] == 3
+    await server.stop()
+
+@pytest.mark.asyncio
+async def test_repeated_prompts_are_served_from_cache(registry):
+    server = RecordingInferenceServer(registry, cache=ResponseCache(max_entries=10))
+    first = await server.generate("causal_lm:fake", "status?", max_length=20)
+    second = await server.generate("causal_lm:fake", "status?", max_length=20)
+    await server.generate("causal_lm:fake", "status?", max_length=20, do_sample=True)
+
+    assert first == second
+    assert server.batch_sizes == [1, 1]
+    assert server.cache.get_stats()["hits"] == 1
+    await server.stop()
+
+@pytest.mark.asyncio
+async def test_stream_yields_pieces_as_generated(registry):
+    server = RecordingInferenceServer(registry)
+    pieces = [piece async for piece in server.stream("causal_lm:fake", "hi")]
+
+    assert pieces == ["Hello", ", ", "world"]
+    assert server.get_stats()["streams"] == 1
+
+def test_batched_prompts_generate_as_if_alone():
+    torch = pytest.importorskip("torch")
+
+    class Tokenizer:
+        pad_token_id = None
+        eos_token_id = 0
+        padding_side = "right"
+
+        def __call__(self, prompt, truncation=True):
+            return {"input_ids": [len(word) for word in prompt.split()]}
+
+        def batch_decode(self, rows, skip_special_tokens=True):
+            return [" ".join(str(token) for token in row) for row in rows]
+
+    class Model:
+        def __init__(self):
+            self.calls = []
+
+        def generate(self, input_ids, attention_mask, max_new_tokens, **params):
+            self.calls.append((input_ids.tolist(), attention_mask.tolist(), max_new_tokens))
+            return torch.cat([input_ids, torch.full((input_ids.shape[0], max_new_tokens), 9)], dim=1)
+
+    tokenizer, model = Tokenizer(), Model()
+    texts = InferenceServer._generate_batch(tokenizer, model, ["a bb", "ccc dd eeee", "f g"], {"max_length": 5})
+    # One call for the whole batch; each text keeps its own max_length
+    assert model.calls == [([[0, 1, 2], [3, 2, 4], [0, 1, 1]], [[0, 1, 1], [1, 1, 1], [0, 1, 1]], 3)]
+    assert texts == ["1 2 9 9 9", "3 2 4 9 9", "1 1 9 9 9"]
+    assert tokenizer.padding_side == "right"
@@ -0,0 +1,50 @@
+import time
+import threading
+from nexus_seed.utils.memory_aggregates import MemoryAggregates
+from nexus_seed.utils.memory_manager import MemoryManager
+
+def test_empty_memory_has_zero_averages():
+    aggregates = MemoryAggregates()
+    assert aggregates.count() == 0
+    assert aggregates.mean("efficiency") == 0.0
+
+def test_counts_and_means_by_type_and_window():
+    aggregates = MemoryAggregates(bucket_sec=60)
+    now = time.time()
+    aggregates.add({"type": "execute_task", "efficiency": 1.0, "timestamp": now})
+    aggregates.add({"type": "execute_task", "efficiency": 0.5, "accuracy": 1.0, "timestamp": now - 7200})
+    aggregates.add({"type": "web_scrape", "timestamp": now})
+
+    assert aggregates.type_counts() == {"execute_task": 2, "web_scrape": 1}
+    assert aggregates.mean("efficiency") == 0.5
+    assert aggregates.mean("efficiency", entry_type="execute_task") == 0.75
+    assert aggregates.count(window_sec=3600) == 2
+    assert aggregates.query("execute_task", window_sec=3600) == {"count": 1, "efficiency": 1.0, "accuracy": 0.0}
+
+def test_memory_manager_rebuilds_aggregates_from_journal(tmp_path):
+    manager = MemoryManager(str(tmp_path / "memory.json"))
+    manager.append({"type": "ai_agent", "efficiency": 0.9})
+    manager.close()
+
+    reopened = MemoryManager(str(tmp_path / "memory.json"))
+    reopened.append({"type": "ai_agent", "efficiency": 0.7})
+    assert reopened.aggregates.count("ai_agent", window_sec=60) == 2
+    assert abs(reopened.aggregates.mean("efficiency") - 0.8) < 1e-9
+    reopened.close()
+
+def test_concurrent_adds_and_queries_are_consistent():
+    aggregates = MemoryAggregates(bucket_sec=1)
+    now = time.time()
+
+    def record(offset):
+        for i in range(2000):
+            aggregates.add({"type": "execute_task", "efficiency": 1.0, "timestamp": now + offset + i * 0.001})
+            aggregates.query(window_sec=60)
+
+    threads = [threading.Thread(target=record, args=(offset,)) for offset in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert aggregates.count() == 8000
+    assert aggregates.total("efficiency") == 8000.0
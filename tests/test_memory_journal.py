@@ -0,0 +1,81 @@
+import json
+import os
+import pytest
+from nexus_seed.utils.memory_journal import MemoryJournal
+from nexus_seed.utils.memory_manager import MemoryManager
+from nexus_seed.utils.write_behind import PartialWriteError
+
+def test_entries_survive_reopen_in_order(tmp_path):
+    journal = MemoryJournal(str(tmp_path / "journal"), fsync="always")
+    for i in range(5):
+        journal.append({"type": "task", "n": i})
+    journal.close()
+
+    reopened = MemoryJournal(str(tmp_path / "journal"))
+    assert [entry["n"] for entry in reopened] == [0, 1, 2, 3, 4]
+    reopened.close()
+
+def test_segments_rotate_and_compact(tmp_path):
+    journal = MemoryJournal(str(tmp_path / "journal"), segment_max_bytes=64, compact_after_segments=100)
+    for i in range(20):
+        journal.append({"type": "task", "n": i})
+    assert journal.get_stats()["segments"] > 2
+
+    journal.compact()
+    assert journal.get_stats()["segments"] == 2
+    assert [entry["n"] for entry in journal] == list(range(20))
+    journal.close()
+
+class FailingFile:
+    """
+    Writes the first `limit` bytes it is given to the real segment, then fails.
+    """
+    def __init__(self, file, limit):
+        self.file = file
+        self.limit = limit
+
+    def write(self, data):
+        self.file.write(data[:self.limit])
+        self.file.flush()
+        raise OSError("disk full")
+
+    def close(self):
+        self.file.close()
+
+def test_failed_append_keeps_whole_entries_only(tmp_path):
+    journal = MemoryJournal(str(tmp_path / "journal"))
+    journal.append({"n": 0})
+    line = len(b'{"n":1}\n')
+    journal._file = FailingFile(journal._file, line + 3)
+    with pytest.raises(PartialWriteError) as error:
+        journal.append_many([{"n": 1}, {"n": 2}, {"n": 3}])
+    assert error.value.written == 1
+
+    # The retry writes only what is missing
+    journal.append_many([{"n": 2}, {"n": 3}])
+    assert [entry["n"] for entry in journal] == [0, 1, 2, 3]
+    journal.close()
+
+def test_torn_tail_is_discarded_on_open(tmp_path):
+    directory = tmp_path / "journal"
+    journal = MemoryJournal(str(directory))
+    journal.append({"type": "complete"})
+    journal.close()
+    segment = directory / "segment-00000001.jsonl"
+    with open(segment, "ab") as file:
+        file.write(b'{"type": "tor')
+
+    reopened = MemoryJournal(str(directory))
+    reopened.append({"type": "after_crash"})
+    assert [entry["type"] for entry in reopened] == ["complete", "after_crash"]
+    reopened.close()
+
+def test_legacy_memory_file_is_migrated(tmp_path):
+    legacy = tmp_path / "memory.json"
+    legacy.write_text(json.dumps([{"type": "os_info"}, {"type": "self_debug"}]))
+
+    manager = MemoryManager(str(legacy))
+    manager.append({"type": "web_scrape"})
+    assert [entry["type"] for entry in manager.iter_memory()] == ["os_info", "self_debug", "web_scrape"]
+    assert os.path.isdir(tmp_path / "memory.journal")
+    manager.close()
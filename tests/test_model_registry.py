@@ -0,0 +1,54 @@
+import pytest
+from nexus_seed.utils.model_registry import ModelRegistry
+
+class FakeModel:
+    def __init__(self, nbytes: int):
+        self.nbytes = nbytes
+
+def test_models_are_loaded_lazily_and_shared():
+    registry = ModelRegistry()
+    loads = []
+    key = registry.register("causal_lm:fake", lambda: loads.append(1) or FakeModel(10))
+    # Registering the same checkpoint again keeps the first loader
+    assert registry.register("causal_lm:fake", lambda: FakeModel(99)) == key
+    assert loads == []
+
+    assert registry.get(key) is registry.get(key)
+    assert loads == [1]
+    assert registry.get_stats()["loaded_bytes"] == 10
+
+def test_memory_budget_evicts_least_recently_used():
+    registry = ModelRegistry(memory_budget_bytes=25)
+    for name in ("a", "b", "c"):
+        registry.register(name, lambda: FakeModel(10))
+
+    registry.get("a")
+    registry.get("b")
+    registry.get("a")
+    registry.get("c")
+
+    assert registry.is_loaded("a") and registry.is_loaded("c")
+    assert not registry.is_loaded("b")
+    assert registry.evictions == 1
+
+@pytest.mark.asyncio
+async def test_idle_models_are_evicted():
+    registry = ModelRegistry(max_idle_sec=60)
+    registry.register("a", lambda: FakeModel(10))
+    await registry.load("a")
+
+    assert registry.evict_idle() == []
+    assert registry.evict_idle(max_idle_sec=0) == ["a"]
+    assert not registry.is_loaded("a")
+
+def test_pinned_models_are_never_evicted():
+    registry = ModelRegistry(memory_budget_bytes=15, max_idle_sec=60)
+    registry.register("random", lambda: FakeModel(10), pinned=True)
+    registry.register("a", lambda: FakeModel(10))
+    pinned = registry.get("random")
+    registry.get("a")
+
+    assert registry.evict_idle(max_idle_sec=0) == ["a"]
+    registry.get("a")
+    assert registry.get("random") is pinned
+    assert registry.get_stats()["pinned"] == ["random"]
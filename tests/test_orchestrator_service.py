@@ -0,0 +1,55 @@
+import pytest
+import asyncio
+import time
+from nexus_seed.services.orchestrator_service import OrchestratorService
+
+class SlowBus:
+    def __init__(self, delay_sec):
+        self.delay_sec = delay_sec
+        self.published = []
+
+    async def publish(self, event_type, data):
+        await asyncio.sleep(self.delay_sec)
+        self.published.append(event_type)
+
+@pytest.mark.asyncio
+async def test_events_are_handled_by_a_worker_pool(tmp_path):
+    bus = SlowBus(0.05)
+    orchestrator = OrchestratorService(bus, None, str(tmp_path), workers=10, queue_maxsize=5)
+    orchestrator.running = True
+    workers = asyncio.create_task(orchestrator.process_events())
+
+    started = time.monotonic()
+    # The queue holds five events; publishing the rest waits for free slots
+    await asyncio.wait_for(
+        asyncio.gather(*(orchestrator.publish_event({"type": "core_tick"}) for _ in range(20))),
+        timeout=1.0,
+    )
+    await asyncio.wait_for(orchestrator.event_queue.join(), timeout=1.0)
+    # One worker would need a full second
+    assert time.monotonic() - started < 0.5
+    stats = orchestrator.get_stats()
+    assert len(bus.published) == 20
+    assert stats["events_processed"] == 20 and stats["queue_depth"] == 0
+    assert stats["max_queue_depth"] <= 5 and stats["throughput_per_sec"] > 0
+
+    await orchestrator.stop()
+    await asyncio.gather(workers, return_exceptions=True)
+
+@pytest.mark.asyncio
+async def test_shipped_monitoring_workflow_reaches_a_decision():
+    from nexus_seed.services.stats_aggregator_service import StatsAggregatorService
+    stats = StatsAggregatorService()
+    stats.add_samples([70.0, 90.0, 95.0])
+    bus = SlowBus(0)
+    orchestrator = OrchestratorService(
+        bus, None, "config/workflows", resolve_service={"stats_aggregator": stats}.get
+    )
+    workflow = orchestrator.workflows.get("system_monitoring")
+    results = await orchestrator.engine.run(workflow)
+    assert results["aggregate_stats"]["cpu_percent"] == 85.0
+    assert results["evaluate_load"] == "Trigger optimization"
+
+    stats.samples.clear()
+    results = await orchestrator.engine.run(workflow)
+    assert results["evaluate_load"] == "No decision made."
@@ -0,0 +1,59 @@
+import time
+import pytest
+from nexus_seed.utils.response_cache import DiskResponseCache, ResponseCache, response_cache_key
+
+def test_key_depends_on_generation_params():
+    assert response_cache_key("gpt2", "hi", {"max_length": 50}) == response_cache_key("gpt2", "hi", {"max_length": 50})
+    assert response_cache_key("gpt2", "hi", {"max_length": 50}) != response_cache_key("gpt2", "hi", {"max_length": 100})
+
+def test_lru_eviction_and_ttl():
+    cache = ResponseCache(max_entries=2, ttl_sec=None)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    cache.get("a")
+    cache.put("c", "3")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.evictions == 1
+
+    expiring = ResponseCache(ttl_sec=0.01)
+    expiring.put("a", "1")
+    time.sleep(0.02)
+    assert expiring.get("a") is None
+    assert expiring.expirations == 1
+
+def test_disk_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "responses.db")
+    cache = ResponseCache(disk=DiskResponseCache(path))
+    cache.put("a", "cached")
+    cache.disk.close()
+
+    restarted = ResponseCache(disk=DiskResponseCache(path))
+    assert restarted.get("a") == "cached"
+    assert restarted.get_stats()["disk_hits"] == 1
+    assert restarted.get("a") == "cached"
+    assert restarted.hits == 1
+    restarted.disk.close()
+
+def test_disk_tier_expires_with_the_cache_ttl(tmp_path):
+    cache = ResponseCache(ttl_sec=0.01, disk=DiskResponseCache(str(tmp_path / "responses.db")))
+    assert cache.disk.ttl_sec == 0.01
+    cache.put("a", "cached")
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    assert len(cache.disk) == 0
+    cache.disk.close()
+
+@pytest.mark.asyncio
+async def test_async_lookups_read_the_disk_tier(tmp_path):
+    path = str(tmp_path / "responses.db")
+    cache = ResponseCache(disk=DiskResponseCache(path))
+    await cache.put_async("a", "cached")
+    cache.disk.close()
+
+    restarted = ResponseCache(disk=DiskResponseCache(path))
+    assert await restarted.get_async("a") == "cached"
+    assert await restarted.get_async("missing") is None
+    assert (restarted.disk_hits, restarted.misses) == (1, 1)
+    restarted.disk.close()
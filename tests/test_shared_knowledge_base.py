@@ -0,0 +1,148 @@
+import json
+import threading
+import pytest
+from nexus_seed.utils.shared_knowledge_base import SharedKnowledgeBase
+
+def test_entries_persist_and_query_by_keyword(tmp_path):
+    knowledge = SharedKnowledgeBase(str(tmp_path / "shared_knowledge.json"))
+    knowledge.add_entries({
+        "round_1_Yoda": {"agenda": "resilience", "response": "Guide you, I will."},
+        "round_2_Yoda": {"agenda": "scaling", "response": "Patience you must have."},
+        "round_1_Makima": {"agenda": "resilience", "response": "Keep things in order."},
+    })
+    knowledge.close()
+
+    reopened = SharedKnowledgeBase(str(tmp_path / "shared_knowledge.json"))
+    assert reopened.list_entries(prefix="round_1_") == ["round_1_Makima", "round_1_Yoda"]
+    assert reopened.query_knowledge("resilien") == [
+        {"round_1_Makima": {"agenda": "resilience", "response": "Keep things in order."}},
+        {"round_1_Yoda": {"agenda": "resilience", "response": "Guide you, I will."}},
+    ]
+    assert [list(entry)[0] for entry in reopened.query_knowledge("patience you")] == ["round_2_Yoda"]
+    # Substring semantics: a query may start or end mid-word
+    assert [list(entry)[0] for entry in reopened.query_knowledge("silien")] == ["round_1_Makima", "round_1_Yoda"]
+    assert [list(entry)[0] for entry in reopened.query_knowledge("ience you mu")] == ["round_2_Yoda"]
+    assert reopened.query_knowledge("ience you mx") == []
+    reopened.close()
+
+def test_updates_reindex_and_failed_transactions_roll_back(tmp_path):
+    knowledge = SharedKnowledgeBase(str(tmp_path / "shared_knowledge.json"))
+    knowledge.add_entry("status", {"state": "degraded"})
+    knowledge.add_entry("status", {"state": "healthy"})
+    assert knowledge.query_knowledge("degraded") == []
+
+    try:
+        with knowledge.transaction():
+            knowledge.add_entry("partial", {"state": "written"})
+            raise RuntimeError("abort")
+    except RuntimeError:
+        pass
+    assert knowledge.get_entry("partial") == {}
+    knowledge.close()
+
+def test_legacy_json_is_migrated(tmp_path):
+    legacy = tmp_path / "shared_knowledge.json"
+    legacy.write_text(json.dumps({"intent_logs": [{"intent": "scan", "task": "nmap", "outcome": "ok"}]}))
+
+    knowledge = SharedKnowledgeBase(str(legacy))
+    knowledge.log_intent("heal", "self_heal", "Pending")
+    assert [log["intent"] for log in knowledge.get_intent_logs()] == ["scan", "heal"]
+    knowledge.close()
+
+def test_each_intent_is_its_own_entry(tmp_path):
+    knowledge = SharedKnowledgeBase(str(tmp_path / "shared_knowledge.json"))
+    for i in range(3):
+        knowledge.log_intent(f"intent_{i}", "task", "ok")
+    assert knowledge.list_entries(prefix="intent_logs/") == [f"intent_logs/{i:012d}" for i in range(3)]
+    knowledge.close()
+
+    # Numbering continues after a restart
+    reopened = SharedKnowledgeBase(str(tmp_path / "shared_knowledge.json"))
+    reopened.log_intent("intent_3", "task", "ok")
+    assert [log["intent"] for log in reopened.get_intent_logs()] == [f"intent_{i}" for i in range(4)]
+    reopened.close()
+
+def test_search_ranks_by_bm25_and_follows_updates(tmp_path):
+    knowledge = SharedKnowledgeBase(str(tmp_path / "shared_knowledge.json"))
+    knowledge.add_entries({
+        "incident_1": {"summary": "disk full on the database host"},
+        "incident_2": {"summary": "database failover, database replica lagging, database restarted"},
+        "incident_3": {"summary": "certificate expired"},
+    })
+    assert [hit["key"] for hit in knowledge.search("database", k=2)] == ["incident_2", "incident_1"]
+
+    knowledge.add_entry("incident_3", {"summary": "database certificate expired"})
+    assert [hit["key"] for hit in knowledge.search("certificate database")][0] == "incident_3"
+    assert knowledge.search("certificate")[0]["value"] == {"summary": "database certificate expired"}
+    knowledge.close()
+
+    reopened = SharedKnowledgeBase(str(tmp_path / "shared_knowledge.json"))
+    assert [hit["key"] for hit in reopened.search("replica")] == ["incident_2"]
+    reopened.close()
+
+def test_databases_without_term_frequencies_are_upgraded(tmp_path):
+    import sqlite3
+    conn = sqlite3.connect(str(tmp_path / "shared_knowledge.db"))
+    conn.execute("CREATE TABLE entries (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+    conn.execute("CREATE TABLE terms (term TEXT NOT NULL, key TEXT NOT NULL, PRIMARY KEY (term, key)) WITHOUT ROWID")
+    conn.execute("INSERT INTO entries VALUES ('note', ?)", (json.dumps({"text": "scaling scaling plan"}),))
+    conn.commit()
+    conn.close()
+
+    knowledge = SharedKnowledgeBase(str(tmp_path / "shared_knowledge.json"))
+    assert [hit["key"] for hit in knowledge.search("scaling")] == ["note"]
+    knowledge.close()
+
+def test_semantic_search_uses_the_embedder(tmp_path):
+    np = pytest.importorskip("numpy")
+    topics = ["network", "storage", "memory"]
+    def embed(texts):
+        return np.array([[float(topic in text) for topic in topics] + [0.1] for text in texts])
+
+    knowledge = SharedKnowledgeBase(str(tmp_path / "shared_knowledge.json"), embedder=embed)
+    knowledge.add_entries({"a": "network outage", "b": "storage quota", "c": "memory leak"})
+    assert knowledge.search("storage", k=1, mode="semantic")[0]["key"] == "b"
+    assert knowledge.search("memory", k=1, mode="hybrid")[0]["key"] == "c"
+    knowledge.close()
+
+    reopened = SharedKnowledgeBase(str(tmp_path / "shared_knowledge.json"), embedder=embed)
+    assert reopened.get_stats()["vectors"]["vectors"] == 3
+    reopened.close()
+
+def test_embedder_runs_without_holding_the_database_lock(tmp_path):
+    np = pytest.importorskip("numpy")
+    knowledge = None
+    lock_free = []
+    def embed(texts):
+        # Another thread must be able to take the lock while embedding
+        probe = threading.Thread(target=lambda: lock_free.append(knowledge._lock.acquire(timeout=1) and knowledge._lock.release() is None))
+        probe.start()
+        probe.join()
+        return np.ones((len(texts), 2))
+
+    knowledge = SharedKnowledgeBase(str(tmp_path / "shared_knowledge.json"), embedder=embed)
+    knowledge.add_entries({"a": "network outage", "b": "storage quota"})
+    knowledge.add_entry("c", "memory leak")
+    knowledge.flush()
+    assert knowledge.wait_for_embeddings(timeout=5)
+    assert lock_free and all(lock_free)
+    assert knowledge.get_stats()["vectors"]["vectors"] == 3
+    knowledge.close()
+
+
+def test_writes_do_not_wait_for_the_embedder(tmp_path):
+    np = pytest.importorskip("numpy")
+    release = threading.Event()
+
+    def embed(texts):
+        release.wait(5)
+        return np.ones((len(texts), 2))
+
+    knowledge = SharedKnowledgeBase(str(tmp_path / "shared_knowledge.json"), embedder=embed)
+    knowledge.add_entries({"a": "network outage"})
+    assert knowledge.get_entry("a") == "network outage"
+    assert not knowledge.wait_for_embeddings(timeout=0.1)
+    release.set()
+    assert knowledge.wait_for_embeddings(timeout=5)
+    assert knowledge.get_stats()["vectors"]["vectors"] == 1
+    knowledge.close()
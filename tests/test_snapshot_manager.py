@@ -0,0 +1,197 @@
+import pytest
+import asyncio
+import time
+from nexus_seed.interfaces.events import EventTypes
+from nexus_seed.kernel.snapshot_manager import SnapshotManager, serve_snapshot_requests
+from nexus_seed.services.persistence import PersistenceOverseer
+from nexus_seed.utils.event_bus import EventBus
+
+class MemoryPersistence:
+    def __init__(self):
+        self.snapshots = []
+        self.chunks = {}
+
+    async def save_global_snapshot(self, snapshot):
+        self.snapshots.append(snapshot)
+
+    async def load_global_snapshot(self):
+        return self.snapshots[-1] if self.snapshots else {}
+
+    async def save_snapshot_chunks(self, chunks):
+        self.chunks.update(chunks)
+
+class SlowService:
+    def __init__(self, state, delay_sec, restore_log=None):
+        self.state = state
+        self.delay_sec = delay_sec
+        self.restore_log = restore_log
+
+    async def get_snapshot_state(self):
+        await asyncio.sleep(self.delay_sec)
+        return self.state
+
+    async def restore_snapshot_state(self, state):
+        self.restore_log.append(("start", self))
+        await asyncio.sleep(self.delay_sec)
+        self.state = state
+        self.restore_log.append(("done", self))
+
+@pytest.mark.asyncio
+async def test_snapshot_commits_as_soon_as_all_states_arrive():
+    event_bus = EventBus()
+    persistence = MemoryPersistence()
+    signals = []
+    async def record(data):
+        signals.append(data)
+    await event_bus.subscribe(EventTypes.SNAPSHOT_COMMIT_SIGNAL.value, record)
+
+    manager = SnapshotManager(event_bus, persistence, service_deadline_sec=2.0)
+    manager.register_participant("security", SlowService({"alerts": 0}, 0.05))
+    manager.register_participant("task_domain", SlowService({"goals": {}}, 0.1))
+    await serve_snapshot_requests(event_bus, "remote_optimizer", SlowService({"guidance": "hold"}, 0.05))
+    manager.register_remote_participant("remote_optimizer")
+
+    started = time.monotonic()
+    snapshot = await manager.request_snapshot()
+    assert time.monotonic() - started < 1.0
+    assert snapshot["services"] == {
+        "security": {"alerts": 0},
+        "task_domain": {"goals": {}},
+        "remote_optimizer": {"guidance": "hold"},
+    }
+    assert [s["snapshot_id"] for s in persistence.snapshots] == [snapshot["snapshot_id"]]
+    assert persistence.snapshots[0]["kind"] == "full"
+    assert signals[0]["snapshot_id"] == snapshot["snapshot_id"]
+
+@pytest.mark.asyncio
+async def test_snapshot_aborts_when_a_service_misses_its_deadline():
+    event_bus = EventBus()
+    persistence = MemoryPersistence()
+    aborts = []
+    async def record(data):
+        aborts.append(data)
+    await event_bus.subscribe(EventTypes.SNAPSHOT_ABORT_SIGNAL.value, record)
+
+    manager = SnapshotManager(event_bus, persistence, service_deadline_sec=0.1)
+    manager.register_participant("security", SlowService({}, 0.01))
+    manager.register_participant("stuck", SlowService({}, 5))
+
+    assert await manager.request_snapshot() is None
+    assert persistence.snapshots == []
+    assert aborts[0]["failed"] == {"stuck": "deadline exceeded"}
+
+@pytest.mark.asyncio
+async def test_delta_snapshots_store_only_changed_chunks(tmp_path):
+    event_bus = EventBus()
+    persistence = PersistenceOverseer(f"sqlite:///{tmp_path}/nexus.sqlite", snapshot_max_age_sec=None)
+    await persistence.initialize()
+    history = SlowService({"events": list(range(1000)), "mode": "idle"}, 0)
+    security = SlowService({"alerts": 0}, 0)
+    manager = SnapshotManager(event_bus, persistence, full_snapshot_every=3, list_chunk_size=100)
+    manager.register_participant("history", history)
+    manager.register_participant("security", security)
+
+    first = await manager.request_snapshot()
+    written = manager.get_stats()["chunks_written"]
+    history.state = {"events": list(range(1050)), "mode": "idle"}
+    second = await manager.request_snapshot()
+    assert manager.get_stats()["chunks_written"] == written + 1
+    manifest = await persistence.load_global_snapshot()
+    assert manifest["kind"] == "delta" and list(manifest["changed"]) == ["history"]
+
+    security.state = {"alerts": 2}
+    await manager.request_snapshot()
+    history.state = {"events": [], "mode": "busy"}
+    await manager.request_snapshot()
+    stats = manager.get_stats()
+    assert stats["full_snapshots"] == 2 and stats["delta_snapshots"] == 2
+
+    # A fresh manager (e.g. after a restart) rebuilds any retained point in time
+    restarted = SnapshotManager(event_bus, persistence)
+    assert (await restarted.load_snapshot_view(first["snapshot_id"]))["services"] == first["services"]
+    assert (await restarted.load_snapshot_view(second["snapshot_id"]))["services"]["history"]["events"][-1] == 1049
+    assert (await restarted.load_snapshot_view())["services"] == {
+        "history": {"events": [], "mode": "busy"},
+        "security": {"alerts": 2},
+    }
+
+    persistence.snapshot_keep_last = 1
+    await persistence.prune_snapshots()
+    assert await manager.collect_garbage() == 0  # still within the grace period
+    manager.chunk_gc_grace_sec = 0
+    assert await manager.collect_garbage() > 0
+    assert (await restarted.load_snapshot_view())["services"]["security"] == {"alerts": 2}
+    await persistence.close()
+
+@pytest.mark.asyncio
+async def test_compaction_spares_chunks_of_a_snapshot_being_saved(tmp_path):
+    event_bus = EventBus()
+    persistence = PersistenceOverseer(f"sqlite:///{tmp_path}/nexus.sqlite", snapshot_max_age_sec=None)
+    await persistence.initialize()
+    history = SlowService({"events": list(range(500))}, 0)
+    manager = SnapshotManager(event_bus, persistence, list_chunk_size=100)
+    manager.register_participant("history", history)
+    await manager.request_snapshot()
+
+    # Another node compacts after this snapshot's chunks commit but before its manifest does
+    other_node = SnapshotManager(event_bus, persistence)
+    save_manifest = persistence.save_global_snapshot
+    collected = []
+    async def compact_then_save(manifest):
+        collected.append(await other_node.collect_garbage())
+        await save_manifest(manifest)
+    persistence.save_global_snapshot = compact_then_save
+
+    history.state = {"events": list(range(600))}
+    await manager.request_snapshot()
+    assert collected == [0]
+    assert (await other_node.load_snapshot_view())["services"]["history"]["events"][-1] == 599
+    await persistence.close()
+
+@pytest.mark.asyncio
+async def test_restore_runs_concurrently_in_dependency_order(tmp_path):
+    event_bus = EventBus()
+    persistence = PersistenceOverseer(f"sqlite:///{tmp_path}/nexus.sqlite")
+    await persistence.initialize()
+    saved = SnapshotManager(event_bus, persistence)
+    for name in ("goals", "security", "optimizer", "history"):
+        saved.register_participant(name, SlowService({"name": name}, 0))
+    await saved.request_snapshot()
+
+    log = []
+    services = {name: SlowService({}, 0.1, log) for name in ("goals", "security", "optimizer", "history")}
+    manager = SnapshotManager(event_bus, persistence)
+    manager.register_participant("goals", services["goals"])
+    manager.register_participant("security", services["security"])
+    manager.register_participant("optimizer", services["optimizer"], depends_on=["goals"])
+    manager.register_participant("history", services["history"], depends_on=["optimizer"], lazy_restore=True)
+    assert manager.restore_levels(services) == [["goals", "security"], ["optimizer"], ["history"]]
+
+    started = time.monotonic()
+    results = await manager.restore_seed_state()
+    assert time.monotonic() - started < 0.3
+    assert results == {"goals": "restored", "security": "restored", "optimizer": "restored"}
+    assert log.index(("start", services["optimizer"])) > log.index(("done", services["goals"]))
+    assert services["security"].state == {"name": "security"}
+
+    assert await manager.restore_service("history") == "restored"
+    assert services["history"].state == {"name": "history"}
+    await persistence.close()
+
+@pytest.mark.asyncio
+async def test_snapshot_waits_for_lazy_restore(tmp_path):
+    event_bus = EventBus()
+    persistence = PersistenceOverseer(f"sqlite:///{tmp_path}/nexus.sqlite")
+    await persistence.initialize()
+    saved = SnapshotManager(event_bus, persistence)
+    saved.register_participant("history", SlowService({"entries": [1, 2]}, 0))
+    await saved.request_snapshot()
+
+    history = SlowService({}, 0.1, [])
+    manager = SnapshotManager(event_bus, persistence)
+    manager.register_participant("history", history, lazy_restore=True)
+    assert await manager.restore_seed_state() == {}
+    # Taken while the background restore is still running: must not capture the empty state
+    snapshot = await manager.request_snapshot()
+    assert snapshot["services"]["history"] == {"entries": [1, 2]}
+    await persistence.close()
@@ -0,0 +1,180 @@
+import pytest
+import asyncio
+import time
+from nexus_seed.services.persistence import PersistenceOverseer
+from nexus_seed.utils.workflow_engine import WorkflowEngine, WorkflowStepError
+from nexus_seed.utils.workflow_registry import WorkflowError, compile_workflow
+
+class Services:
+    def __init__(self):
+        self.calls = []
+        self.flaky_failures = 1
+
+    async def slow(self, name):
+        self.calls.append(("start", name))
+        await asyncio.sleep(0.1)
+        self.calls.append(("done", name))
+        return {"name": name, "load": 42}
+
+    async def flaky(self):
+        if self.flaky_failures:
+            self.flaky_failures -= 1
+            raise ConnectionError("try again")
+        return "ok"
+
+    async def stuck(self):
+        await asyncio.sleep(5)
+
+def service_call(step_id, method, depends_on=None, args=None, **extra):
+    params = {"service_name": "services", "method_name": method, "args": args or {}}
+    step = {"id": step_id, "type": "service_call", "params": params}
+    if depends_on is not None:
+        step["depends_on"] = depends_on
+    step.update(extra)
+    return step
+
+def engine_for(services):
+    return WorkflowEngine(None, resolve_service=lambda name: services)
+
+@pytest.mark.asyncio
+async def test_independent_steps_run_concurrently_and_pass_results():
+    services = Services()
+    steps = [service_call(name, "slow", [], args={"name": name}) for name in ("a", "b", "c")]
+    steps.append({"id": "report", "type": "log", "params": {"message": "load ${steps.b.load} from ${trigger.source}"}})
+    workflow = compile_workflow("monitoring", {"concurrency": 2, "steps": steps}, resolve_service=lambda name: services)
+    assert workflow.steps[3].depends_on == ("b",)
+
+    started = time.monotonic()
+    results = await engine_for(services).run(workflow, {"source": "cron"})
+    elapsed = time.monotonic() - started
+    # Three 0.1s steps, two at a time
+    assert 0.15 < elapsed < 0.3
+    assert results["report"] == "load 42 from cron"
+    assert services.calls[:2] == [("start", "a"), ("start", "b")]
+
+@pytest.mark.asyncio
+async def test_steps_without_dependencies_stay_sequential():
+    services = Services()
+    steps = [
+        {"type": "service_call", "params": {"service_name": "services", "method_name": "slow", "args": {"name": name}}}
+        for name in ("a", "b")
+    ]
+    workflow = compile_workflow("legacy", {"steps": steps})
+    await engine_for(services).run(workflow)
+    assert services.calls == [("start", "a"), ("done", "a"), ("start", "b"), ("done", "b")]
+
+@pytest.mark.asyncio
+async def test_failed_steps_are_retried_then_time_out():
+    services = Services()
+    engine = engine_for(services)
+    workflow = compile_workflow("retry", {"steps": [service_call("flaky", "flaky", retries=1, retry_delay_sec=0)]})
+    assert await engine.run(workflow) == {"flaky": "ok"}
+
+    workflow = compile_workflow("timeout", {"steps": [
+        service_call("stuck", "stuck", [], timeout_sec=0.05),
+        service_call("after", "slow", ["stuck"], args={"name": "after"}),
+    ]})
+    with pytest.raises(WorkflowStepError) as error:
+        await engine.run(workflow)
+    assert error.value.step_id == "stuck"
+    assert ("start", "after") not in services.calls
+    assert engine.get_stats()["step_retries"] == 1 and engine.get_stats()["step_timeouts"] == 1
+
+def test_dependency_cycles_are_rejected():
+    with pytest.raises(WorkflowError):
+        compile_workflow("cycle", {"steps": [
+            {"id": "a", "type": "log", "depends_on": ["b"]},
+            {"id": "b", "type": "log", "depends_on": ["a"]},
+        ]})
+
+@pytest.mark.asyncio
+async def test_interrupted_runs_resume_from_checkpoints(tmp_path):
+    persistence = PersistenceOverseer(f"sqlite:///{tmp_path}/nexus.sqlite")
+    await persistence.initialize()
+    services = Services()
+    workflow = compile_workflow("backup", {"steps": [
+        service_call("first", "slow", args={"name": "first"}),
+        service_call("second", "stuck"),
+        {"id": "report", "type": "log", "params": {"message": "${steps.first.name} done"}},
+    ]}, resolve_service=lambda name: services)
+
+    # Crash while "second" is running
+    run = asyncio.ensure_future(WorkflowEngine(None, persistence=persistence).run(workflow, run_id="run-1"))
+    await asyncio.sleep(0.2)
+    run.cancel()
+    await asyncio.gather(run, return_exceptions=True)
+    [checkpoint] = await persistence.load_workflow_runs()
+    assert checkpoint["steps"]["first"]["status"] == "completed"
+    assert checkpoint["steps"]["second"] == {"status": "started", "key": "run-1:second"}
+
+    # "second" may already have taken effect, so it is not executed again
+    engine = WorkflowEngine(None, persistence=persistence)
+    with pytest.raises(WorkflowStepError):
+        await engine.run(workflow, resume=checkpoint)
+    assert (await persistence.load_workflow_runs("failed"))[0]["run_id"] == "run-1"
+
+    # Once a step is idempotent, the run picks up after the last completed step
+    services.stuck = services.flaky
+    services.flaky_failures = 0
+    workflow = compile_workflow("backup", {"steps": [
+        service_call("first", "slow", args={"name": "first"}),
+        service_call("second", "stuck", idempotent=True),
+        {"id": "report", "type": "log", "params": {"message": "${steps.first.name} done"}},
+    ]}, resolve_service=lambda name: services)
+    checkpoint["status"] = "running"
+    services.calls.clear()
+    results = await engine.run(workflow, resume=checkpoint)
+    assert results == {"first": {"name": "first", "load": 42}, "second": "ok", "report": "first done"}
+    assert services.calls == []
+    assert engine.get_stats()["steps_skipped"] == 1
+    assert await persistence.load_workflow_runs() == []
+    await persistence.close()
+
+@pytest.mark.asyncio
+async def test_steps_receive_their_idempotency_key():
+    class Recorder(Services):
+        async def charge(self, amount, idempotency_key):
+            self.calls.append((amount, idempotency_key))
+            return "charged"
+
+    services = Recorder()
+    workflow = compile_workflow("billing", {"steps": [
+        service_call("charge", "charge", args={"amount": 5}),
+        service_call("plain", "slow", args={"name": "plain"}),
+    ]}, resolve_service=lambda name: services)
+    results = await engine_for(services).run(workflow, run_id="run-7")
+    assert results["charge"] == "charged"
+    assert services.calls[0] == (5, "run-7:charge")
+
+@pytest.mark.asyncio
+async def test_interrupted_runs_are_claimed_by_one_node(tmp_path):
+    url = f"sqlite:///{tmp_path}/nexus.sqlite"
+    node_a = PersistenceOverseer(url, run_lease_sec=0.2)
+    node_b = PersistenceOverseer(url, run_lease_sec=0.2)
+    await node_a.initialize()
+    await node_b.initialize()
+    services = Services()
+    workflow = compile_workflow("backup", {"steps": [service_call("second", "stuck")]}, resolve_service=lambda name: services)
+    run = asyncio.ensure_future(WorkflowEngine(None, persistence=node_a).run(workflow, run_id="run-1"))
+    await asyncio.sleep(0.1)
+
+    # Node a holds the lease while the run is in flight
+    assert await node_b.claim_workflow_runs() == []
+
+    # Once node a stops, exactly one node takes the run over
+    run.cancel()
+    await asyncio.gather(run, return_exceptions=True)
+    await node_a.close()
+    claims = await asyncio.gather(node_b.claim_workflow_runs(), node_b.claim_workflow_runs())
+    assert sorted(len(runs) for runs in claims) == [0, 1]
+    assert [run["run_id"] for runs in claims for run in runs] == ["run-1"]
+    await node_b.close()
+
+def test_decision_rules_are_checked_at_compile_time():
+    def decision(rules):
+        return {"steps": [{"type": "decision", "params": {"type": "rule_based", "rules": rules}}]}
+    compile_workflow("ok", decision([{"when": {"field": "stats.cpu", "op": ">=", "value": 80}, "action": "scale"}]))
+    with pytest.raises(WorkflowError):
+        compile_workflow("code", decision([{"condition": "lambda x: x['cpu'] > 80", "action": "scale"}]))
+    with pytest.raises(WorkflowError):
+        compile_workflow("op", decision([{"when": {"field": "cpu", "op": "=~", "value": 80}, "action": "scale"}]))
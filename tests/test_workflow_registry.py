@@ -0,0 +1,66 @@
+import os
+import threading
+from nexus_seed.utils.workflow_registry import WorkflowRegistry
+
+MONITORING = """
+steps:
+  - type: event
+    params:
+      event_type: system_metrics
+  - type: service_call
+    params:
+      service_name: stats
+      method_name: aggregate
+"""
+
+class Stats:
+    async def aggregate(self):
+        return {}
+
+def write(path, text, mtime):
+    path.write_text(text)
+    os.utime(path, (mtime, mtime))
+
+def test_workflows_are_compiled_once_and_swapped_on_change(tmp_path):
+    stats = Stats()
+    write(tmp_path / "monitoring.yaml", MONITORING, 1000)
+    write(tmp_path / "broken.yaml", "steps:\n  - type: teleport\n", 1000)
+    registry = WorkflowRegistry(str(tmp_path), resolve_service=lambda name: stats if name == "stats" else None)
+
+    workflow = registry.get("monitoring.yaml")
+    assert registry.get("monitoring") is workflow
+    assert [step.type for step in workflow.steps] == ["event", "service_call"]
+    assert workflow.steps[1].handle == stats.aggregate
+    assert registry.get("broken") is None and "broken" in registry.errors
+
+    assert not registry.refresh()
+    assert registry.get_stats()["compiled"] == 1
+
+    write(tmp_path / "monitoring.yaml", MONITORING + "  - type: log\n    params: {}\n", 2000)
+    assert registry.refresh()
+    assert len(registry.get("monitoring").steps) == 3
+    assert len(workflow.steps) == 2
+
+    # An invalid edit keeps the last good version
+    write(tmp_path / "monitoring.yaml", "steps: oops\n", 3000)
+    registry.refresh()
+    assert len(registry.get("monitoring").steps) == 3
+
+    os.remove(tmp_path / "monitoring.yaml")
+    registry.refresh()
+    assert registry.names() == []
+
+def test_concurrent_refreshes_compile_a_change_once(tmp_path):
+    write(tmp_path / "monitoring.yaml", MONITORING, 1000)
+    registry = WorkflowRegistry(str(tmp_path))
+    registry.get("monitoring")
+    write(tmp_path / "monitoring.yaml", MONITORING + "  - type: log\n    params: {}\n", 2000)
+    generation, compiled = registry.generation, registry.compiled
+
+    threads = [threading.Thread(target=registry.refresh) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert (registry.generation, registry.compiled) == (generation + 1, compiled + 1)
+    assert len(registry.get("monitoring").steps) == 3
@@ -0,0 +1,86 @@
+import threading
+import pytest
+from nexus_seed.utils.memory_manager import MemoryManager
+from nexus_seed.utils.shared_knowledge_base import SharedKnowledgeBase
+from nexus_seed.utils.write_behind import PartialWriteError, WriteBehindBuffer, WriteBehindError
+
+def test_writes_are_grouped_and_coalesced():
+    groups = []
+    buffer = WriteBehindBuffer(groups.append, max_pending=1000, flush_interval_sec=60, coalesce_key=lambda item: item[0])
+    for i in range(10):
+        buffer.submit(("counter", i))
+    buffer.submit(("other", 1))
+    assert buffer.pending_value("counter") == ("counter", 9)
+    assert buffer.flush(timeout=5)
+    assert groups == [[("counter", 9), ("other", 1)]]
+    stats = buffer.get_stats()
+    assert stats["coalesced"] == 9 and stats["group_commits"] == 1 and stats["pending"] == 0
+    buffer.close()
+
+def test_failed_group_is_retried():
+    attempts = []
+    def flaky(items):
+        attempts.append(list(items))
+        if len(attempts) == 1:
+            raise OSError("disk full")
+    buffer = WriteBehindBuffer(flaky, flush_interval_sec=0.01)
+    buffer.submit("a")
+    assert buffer.flush(timeout=5)
+    assert attempts == [["a"], ["a"]]
+    assert buffer.get_stats()["failed_commits"] == 1
+    buffer.close()
+
+def test_persistent_failure_is_raised_by_flush():
+    def broken(items):
+        raise OSError("disk full")
+    buffer = WriteBehindBuffer(broken, flush_interval_sec=0.01, flush_timeout_sec=0.1)
+    buffer.submit("a")
+    with pytest.raises(WriteBehindError) as error:
+        buffer.flush()
+    assert isinstance(error.value.__cause__, OSError)
+    assert buffer.get_stats()["pending"] == 1 and buffer.get_stats()["last_error"] == "disk full"
+    buffer.close(timeout=1)
+
+def test_partially_written_group_resumes_after_written_items():
+    attempts = []
+    def partial(items):
+        attempts.append(list(items))
+        if len(attempts) == 1:
+            raise PartialWriteError(2, OSError("disk full"))
+    buffer = WriteBehindBuffer(partial, flush_interval_sec=0.01)
+    for item in "abcd":
+        buffer.submit(item)
+    assert buffer.flush(timeout=5)
+    assert attempts == [["a", "b", "c", "d"], ["c", "d"]]
+    assert buffer.get_stats()["written"] == 4
+    buffer.close()
+
+def test_knowledge_reads_its_own_buffered_writes(tmp_path):
+    knowledge = SharedKnowledgeBase(str(tmp_path / "shared_knowledge.json"), flush_interval_sec=60)
+    knowledge.add_entry("status", {"state": "healthy"})
+    knowledge.log_intent("scan", "nmap", "ok")
+    assert knowledge.get_entry("status") == {"state": "healthy"}
+    assert knowledge.query_knowledge("healthy") == [{"status": {"state": "healthy"}}]
+    knowledge.close()
+
+    reopened = SharedKnowledgeBase(str(tmp_path / "shared_knowledge.json"))
+    assert reopened.get_intent_logs() == [{"intent": "scan", "task": "nmap", "outcome": "ok"}]
+    reopened.close()
+
+def test_memory_appends_from_many_threads_are_all_durable(tmp_path):
+    memory = MemoryManager(str(tmp_path / "memory.json"), flush_interval_sec=60)
+    threads = [
+        threading.Thread(target=lambda n=n: [memory.append({"type": "task", "n": n, "i": i}) for i in range(50)])
+        for n in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    memory.flush()
+    assert memory.get_stats()["write_behind"]["written"] == 200
+    memory.close()
+
+    reopened = MemoryManager(str(tmp_path / "memory.json"))
+    assert reopened.aggregates.count("task") == 200
+    reopened.close()